@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Batch, ClassSession, AttendanceRecord
+from .models import Batch, ClassSession, AttendanceRecord, Holiday
 
 admin.site.register(Batch)
 admin.site.register(ClassSession)
-admin.site.register(AttendanceRecord)
\ No newline at end of file
+admin.site.register(AttendanceRecord)
+admin.site.register(Holiday)
\ No newline at end of file
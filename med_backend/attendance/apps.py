@@ -1,5 +1,30 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed
 
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'attendance'
\ No newline at end of file
+    name = 'attendance'
+
+    def ready(self):
+        from core.changes import track_deletions
+        from .today import session_teacher_id
+        AttendanceRecord = self.get_model('AttendanceRecord')
+
+        def record_owners(record):
+            # Teachers see records through the sessions they teach
+            return [record.student_id, session_teacher_id(record)]
+
+        track_deletions(AttendanceRecord, record_owners)
+
+        from core.cache import bump_generation, invalidate_on_change
+        Batch = self.get_model('Batch')
+        invalidate_on_change(Batch, self.get_model('Holiday'))
+        # A teacher's day (attendance.today) is cached per teacher
+        invalidate_on_change(self.get_model('ClassSession'), scope='teacher_id')
+        invalidate_on_change(AttendanceRecord, scope=session_teacher_id)
+
+        def roster_changed(sender, action, **kwargs):
+            if action.startswith('post_'):
+                bump_generation(Batch)
+
+        m2m_changed.connect(roster_changed, sender=Batch.students.through, dispatch_uid='attendance.batch_roster', weak=False)
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from attendance.materializer import materialize_sessions
+
+
+class Command(BaseCommand):
+    help = 'Generate attendance class sessions from the weekly timetable (idempotent, skips holidays)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=str, help='First date (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--end', type=str, help='Last date (YYYY-MM-DD). Defaults to start + --days - 1.')
+        parser.add_argument('--days', type=int, default=7, help='Number of days to generate when --end is omitted')
+        parser.add_argument('--batch', type=int, action='append', dest='batch_ids', help='Limit to a batch id (repeatable)')
+
+    def handle(self, *args, **options):
+        start = self.parse(options['start'], '--start') if options['start'] else timezone.localdate()
+        if options['end']:
+            end = self.parse(options['end'], '--end')
+        else:
+            end = start + timedelta(days=options['days'] - 1)
+
+        try:
+            summary = materialize_sessions(start, end, batch_ids=options['batch_ids'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['created']} sessions created for {start} to {end} "
+            f"({summary['scheduled']} scheduled, {summary['skipped_holidays']} skipped for holidays, "
+            f"{summary['skipped_unassigned']} timetable slots without a teacher, "
+            f"{summary['removed_on_holidays']} removed on holidays)"
+        ))
+
+    def parse(self, value, option):
+        try:
+            day = parse_date(value)
+        except ValueError:
+            # Well-formed but impossible, like 2025-13-45
+            day = None
+        if day is None:
+            raise CommandError(f'{option} must be a valid date in YYYY-MM-DD format.')
+        return day
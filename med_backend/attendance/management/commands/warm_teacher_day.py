@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from attendance.today import warm_teacher_days
+
+
+class Command(BaseCommand):
+    help = "Precompute every teacher's day (GET /api/attendance/teacher/today/); run at day start after materialize_sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Day to precompute (YYYY-MM-DD). Defaults to today.')
+
+    def handle(self, *args, **options):
+        day = parse_date(options['date']) if options['date'] else timezone.localdate()
+        if day is None:
+            raise CommandError('--date must be in YYYY-MM-DD format.')
+
+        teachers = warm_teacher_days(day)
+        self.stdout.write(self.style.SUCCESS(f"Precomputed the day of {teachers} teachers for {day}"))
@@ -0,0 +1,113 @@
+# attendance/materializer.py
+
+"""
+Generates attendance ClassSession rows ahead of time from the weekly timetable.
+
+Every timetable.ClassSchedule slot becomes one ClassSession per matching weekday in
+the requested date range, so students can mark attendance without a teacher first
+creating the session by hand. Re-running over the same range creates nothing new:
+the (schedule, date) unique constraint plus bulk_create(ignore_conflicts=True)
+makes the operation idempotent.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from core.cache import bump_generations
+from timetable.models import ClassSchedule
+from .models import ClassSession, Holiday
+
+WEEKDAYS = [day for day, _ in ClassSchedule.DAYS_OF_WEEK]
+
+
+def materialize_sessions(start_date, end_date, batch_ids=None):
+    """
+    Create ClassSession rows for every scheduled class between start_date and end_date (inclusive).
+    Holidays are skipped, and previously generated sessions that now fall on a holiday are
+    removed as long as no attendance has been recorded against them.
+    Returns a summary dict with counts.
+    """
+    if start_date > end_date:
+        raise ValueError("start_date cannot be after end_date.")
+
+    schedules = ClassSchedule.objects.all()
+    if batch_ids:
+        schedules = schedules.filter(batch_id__in=batch_ids)
+
+    slots_by_day = defaultdict(list)
+    unassigned = 0
+    for slot in schedules.values('id', 'batch_id', 'teacher_id', 'day', 'subject'):
+        # ClassSession.teacher is required, so slots without a teacher cannot be materialized
+        if slot['teacher_id'] is None:
+            unassigned += 1
+            continue
+        slots_by_day[slot['day']].append(slot)
+
+    holidays = Holiday.objects.filter(date__range=(start_date, end_date))
+    if batch_ids:
+        holidays = holidays.filter(Q(batch__isnull=True) | Q(batch_id__in=batch_ids))
+    college_holidays = set()
+    batch_holidays = set()
+    for date, batch_id in holidays.values_list('date', 'batch_id'):
+        if batch_id is None:
+            college_holidays.add(date)
+        else:
+            batch_holidays.add((batch_id, date))
+
+    sessions = []
+    skipped_holidays = 0
+    day = start_date
+    while day <= end_date:
+        for slot in slots_by_day.get(WEEKDAYS[day.weekday()], ()):
+            if day in college_holidays or (slot['batch_id'], day) in batch_holidays:
+                skipped_holidays += 1
+                continue
+            sessions.append(ClassSession(
+                batch_id=slot['batch_id'],
+                teacher_id=slot['teacher_id'],
+                date=day,
+                topic=slot['subject'],
+                schedule_id=slot['id'],
+            ))
+        day += timedelta(days=1)
+
+    generated = ClassSession.objects.filter(schedule__isnull=False, date__range=(start_date, end_date))
+    if batch_ids:
+        generated = generated.filter(batch_id__in=batch_ids)
+
+    with transaction.atomic():
+        existing = generated.count()
+        ClassSession.objects.bulk_create(sessions, ignore_conflicts=True, batch_size=500)
+        # bulk_create() sends no signals: refresh the cached days of the teachers (attendance.today)
+        bump_generations(ClassSession, [session.teacher_id for session in sessions])
+        created = generated.count() - existing
+        removed = prune_holiday_sessions(generated, college_holidays, batch_holidays)
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'scheduled': len(sessions),
+        'created': created,
+        'skipped_holidays': skipped_holidays,
+        'skipped_unassigned': unassigned,
+        'removed_on_holidays': removed,
+    }
+
+
+def prune_holiday_sessions(generated, college_holidays, batch_holidays):
+    """Delete generated sessions on holidays that have no attendance recorded yet."""
+    if not college_holidays and not batch_holidays:
+        return 0
+    holiday_dates = college_holidays | {date for _, date in batch_holidays}
+    candidates = generated.filter(date__in=holiday_dates, attendance_records__isnull=True)
+    stale = [
+        session_id
+        for session_id, batch_id, date in candidates.values_list('id', 'batch_id', 'date')
+        if date in college_holidays or (batch_id, date) in batch_holidays
+    ]
+    if stale:
+        ClassSession.objects.filter(id__in=stale).delete()
+    return len(stale)
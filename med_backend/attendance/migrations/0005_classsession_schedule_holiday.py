@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_alter_attendancerecord_unique_together_and_more'),
+        ('timetable', '0006_weeklytimetable'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='classsession',
+            name='schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='timetable.classschedule'),
+        ),
+        migrations.AddConstraint(
+            model_name='classsession',
+            constraint=models.UniqueConstraint(fields=('schedule', 'date'), name='unique_session_per_schedule_date'),
+        ),
+        migrations.AddField(
+            model_name='holiday',
+            name='batch',
+            field=models.ForeignKey(blank=True, help_text='Leave empty for a college-wide holiday.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='attendance.batch'),
+        ),
+    ]
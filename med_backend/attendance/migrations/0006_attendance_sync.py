@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_classsession_schedule_holiday'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='attendancerecord',
+            name='marked_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='AttendanceSyncMutation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.UUIDField(unique=True)),
+                ('outcome', models.CharField(choices=[('applied', 'Applied'), ('superseded', 'Superseded'), ('rejected', 'Rejected')], max_length=10)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('client_marked_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_mutations', to='attendance.attendancerecord')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_sync_mutations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
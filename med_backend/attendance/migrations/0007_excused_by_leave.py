@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_attendance_sync'),
+        ('leaves', '0003_leaverequest_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='excused_by_leave',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='excused_attendance', to='leaves.leaverequest'),
+        ),
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='status_before_leave',
+            field=models.CharField(blank=True, choices=[('present', 'Present'), ('absent', 'Absent'), ('late', 'Late'), ('excused', 'Excused')], max_length=10),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
@@ -17,10 +18,37 @@ class ClassSession(models.Model):
     date = models.DateField()
     topic = models.CharField(max_length=255, blank=True, null=True)
     teacher_attendance_marked = models.BooleanField(default=False)  # New field
+    # Set when the session was generated from the weekly timetable (see attendance.materializer)
+    schedule = models.ForeignKey(
+        'timetable.ClassSchedule', on_delete=models.SET_NULL, null=True, blank=True, related_name='sessions'
+    )
+
+    class Meta:
+        constraints = [
+            # One materialized session per timetable slot per day; lets bulk_create(ignore_conflicts=True) be idempotent
+            models.UniqueConstraint(fields=['schedule', 'date'], name='unique_session_per_schedule_date'),
+        ]
 
     def __str__(self):
         return f"{self.batch.name} - {self.date} - {self.teacher.username}"
 
+
+class Holiday(models.Model):
+    """A day without classes, either college-wide (no batch) or for a single batch."""
+    date = models.DateField(db_index=True)
+    name = models.CharField(max_length=100)
+    batch = models.ForeignKey(
+        Batch, on_delete=models.CASCADE, null=True, blank=True, related_name='holidays',
+        help_text="Leave empty for a college-wide holiday."
+    )
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        scope = self.batch.name if self.batch else 'All batches'
+        return f"{self.name} - {self.date} ({scope})"
+
 class AttendanceRecord(models.Model):
     STATUS_CHOICES = [
         ('present', 'Present'),
@@ -35,8 +63,16 @@ class AttendanceRecord(models.Model):
     subject = models.CharField(max_length=100, null=True, blank=True)  # For direct attendance marking
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='present')
     marked_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='marked_attendance')
-    marked_at = models.DateTimeField(auto_now=True)
+    # When the mark was made (client time for offline sync); used for last-writer-wins
+    marked_at = models.DateTimeField(default=timezone.now)
     is_confirmed = models.BooleanField(default=False)  # New field
+    # Server-side change time, drives sync deltas. Set explicitly in queryset.update() calls.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Set while an approved leave excuses this record (see leaves.services), with the status it replaced
+    excused_by_leave = models.ForeignKey(
+        'leaves.LeaveRequest', on_delete=models.SET_NULL, null=True, blank=True, related_name='excused_attendance'
+    )
+    status_before_leave = models.CharField(max_length=10, choices=STATUS_CHOICES, blank=True)
 
     class Meta:
         unique_together = ('student', 'class_session', 'date', 'subject')
@@ -45,4 +81,27 @@ class AttendanceRecord(models.Model):
         if self.class_session:
             return f"{self.student.username} - {self.class_session} - {self.status} - Confirmed: {self.is_confirmed}"
         else:
-            return f"{self.student.username} - {self.date} - {self.subject} - {self.status} - Confirmed: {self.is_confirmed}"
\ No newline at end of file
+            return f"{self.student.username} - {self.date} - {self.subject} - {self.status} - Confirmed: {self.is_confirmed}"
+
+
+class AttendanceSyncMutation(models.Model):
+    """
+    Record of an attendance mutation received through the offline sync API.
+    The client-generated id makes retried batches idempotent.
+    """
+    OUTCOME_CHOICES = [
+        ('applied', 'Applied'),
+        ('superseded', 'Superseded'),
+        ('rejected', 'Rejected'),
+    ]
+
+    client_id = models.UUIDField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_sync_mutations')
+    record = models.ForeignKey(AttendanceRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name='sync_mutations')
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+    error = models.CharField(max_length=255, blank=True)
+    client_marked_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.client_id} - {self.user.username} - {self.outcome}"
\ No newline at end of file
@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from users.capabilities import Capability, FACULTY, capabilities, has_any, is_faculty, is_management
 
 
 class IsAdminPrincipalOrTeacher(BasePermission):
@@ -12,7 +13,7 @@ class IsAdminPrincipalOrTeacher(BasePermission):
         if not user or not user.is_authenticated:
             return False
         # Explicitly check for 'admin', 'principal' roles or is_staff/is_hidden_superuser
-        return user.is_staff or getattr(user, 'role', None) in ['teacher', 'admin', 'principal'] or getattr(user, 'is_hidden_superuser', False)
+        return is_faculty(user)
 
 
 class IsStudentOrAdminOrTeacher(BasePermission):
@@ -27,7 +28,7 @@ class IsStudentOrAdminOrTeacher(BasePermission):
         if not user or not user.is_authenticated:
             return False
         # Check for admin, principal, hidden superuser or student/teacher role
-        return user.is_staff or getattr(user, 'role', None) in ['teacher', 'student', 'admin', 'principal'] or getattr(user, 'is_hidden_superuser', False)
+        return has_any(user, FACULTY | Capability.STUDENT)
 
 
 class IsOwnerOrAdminOrTeacher(BasePermission):
@@ -40,18 +41,20 @@ class IsOwnerOrAdminOrTeacher(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         user = request.user
-        role = getattr(user, 'role', None)
+        caps = capabilities(user)
 
-        if user.is_staff or role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False): # Include principal
+        if is_management(user): # Include principal
             return True
 
-        if role == 'teacher':
-            # Teachers can interact with records for sessions they teach
-            return obj.class_session.teacher == user
+        if caps & Capability.TEACHER:
+            # Teachers can interact with records for sessions they teach.
+            # Compare ids so neither the session's teacher nor the student is loaded.
+            session = obj.class_session
+            return session is not None and session.teacher_id == user.id
 
-        if role == 'student':
+        if caps & Capability.STUDENT:
             if request.method in SAFE_METHODS: # Students can only read their own records
-                return obj.student == user
+                return obj.student_id == user.id
             return False # Students cannot modify/delete records
 
         return False
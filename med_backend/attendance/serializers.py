@@ -71,5 +71,25 @@ class AttendanceRecordSerializer(serializers.ModelSerializer):
             'marked_by',
             'marked_at',
             'is_confirmed', # This field tells whether teacher marked session
+            'excused_by_leave', # Approved leave that excused an absence
         ]
-        read_only_fields = ['marked_at', 'is_confirmed', 'marked_by'] # These fields are set by the system or specific roles
+        read_only_fields = ['marked_at', 'is_confirmed', 'marked_by', 'excused_by_leave'] # These fields are set by the system or specific roles
+
+
+class AttendanceMutationSerializer(serializers.Serializer):
+    """
+    Validates one attendance mutation sent by an offline client.
+    A mutation targets either a class session (class_session_id) or a direct record (date + subject).
+    """
+    client_id = serializers.UUIDField()
+    student_id = serializers.IntegerField()
+    class_session_id = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateField(required=False, allow_null=True)
+    subject = serializers.CharField(max_length=100, required=False, allow_null=True, allow_blank=False)
+    status = serializers.ChoiceField(choices=AttendanceRecord.STATUS_CHOICES)
+    marked_at = serializers.DateTimeField()
+
+    def validate(self, data):
+        if not data.get('class_session_id') and not (data.get('date') and data.get('subject')):
+            raise serializers.ValidationError("Either class_session_id or both date and subject are required.")
+        return data
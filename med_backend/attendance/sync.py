@@ -0,0 +1,242 @@
+# attendance/sync.py
+
+"""
+Offline-first attendance sync.
+
+Clients queue attendance marks while offline and push them as one batch of mutations,
+each carrying a client-generated UUID and the time the mark was made. The batch is
+applied in a single transaction:
+
+- Mutations whose client_id was already seen are not re-applied (idempotent retries).
+- Conflicts on the same record are resolved by (writer rank, marked_at): a teacher's or
+  admin's mark always beats a student's, and between equal ranks the later mark wins.
+
+The response also carries every record the caller can see that changed on the server
+since the client's last sync token, so the client only pulls what changed. Tokens overlap
+(CHANGES_SYNC_OVERLAP_SECONDS, see core.changes): records changed just before a token may
+be sent twice, always in their current state, so the client simply replaces records by id.
+"""
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.cache import bump_generations
+from leaves.services import excuse_on_leave
+from users.capabilities import Capability, capabilities, is_faculty, is_management
+from users.models import User
+from .models import AttendanceRecord, AttendanceSyncMutation, ClassSession
+from .serializers import AttendanceMutationSerializer
+
+MAX_MUTATIONS_PER_SYNC = 500
+
+STUDENT_RANK = 0
+STAFF_RANK = 1
+
+
+def writer_rank(user):
+    """Teachers, admins and principals outrank students when marks conflict."""
+    if user is not None and is_faculty(user):
+        return STAFF_RANK
+    return STUDENT_RANK
+
+
+def changes_since(user, since):
+    """Compact rows for every record visible to the user that changed at or after `since`."""
+    queryset = AttendanceRecord.objects.filter(updated_at__gte=since)
+    caps = capabilities(user)
+    if is_management(user):
+        pass
+    elif caps & Capability.TEACHER:
+        queryset = queryset.filter(Q(class_session__teacher=user) | Q(marked_by=user))
+    elif caps & Capability.STUDENT:
+        queryset = queryset.filter(student=user)
+    else:
+        return []
+    return list(
+        queryset.annotate(record_date=Coalesce('date', 'class_session__date'))
+        .order_by('updated_at', 'id')
+        .values(
+            'id', 'student_id', 'class_session_id', 'record_date', 'subject',
+            'status', 'is_confirmed', 'marked_at', 'marked_by_id',
+        )
+    )
+
+
+class AttendanceSync:
+    """Applies one batch of attendance mutations on behalf of a user."""
+
+    def __init__(self, user):
+        self.user = user
+        self.rank = writer_rank(user)
+        self.now = timezone.now()
+        self.records = {}
+        self.to_create = []
+        self.to_update = {}
+
+    def apply(self, raw_mutations):
+        """Validate and apply mutations in one transaction. Returns one result dict per mutation."""
+        results = [None] * len(raw_mutations)
+        valid = []
+        for index, raw in enumerate(raw_mutations):
+            serializer = AttendanceMutationSerializer(data=raw)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {
+                    'client_id': raw.get('client_id') if isinstance(raw, dict) else None,
+                    'outcome': 'rejected',
+                    'error': serializer.errors,
+                }
+
+        with transaction.atomic():
+            seen = {
+                mutation.client_id: mutation
+                for mutation in AttendanceSyncMutation.objects.filter(
+                    client_id__in=[data['client_id'] for _, data in valid]
+                )
+            }
+            fresh = []
+            batch_ids = set()
+            for index, data in valid:
+                previous = seen.get(data['client_id'])
+                if previous is not None:
+                    results[index] = self.result(data, previous.outcome, previous.record_id, previous.error, duplicate=True)
+                elif data['client_id'] in batch_ids:
+                    results[index] = self.result(data, 'rejected', None, 'Duplicate client_id within batch.')
+                else:
+                    batch_ids.add(data['client_id'])
+                    fresh.append((index, data))
+
+            if fresh:
+                self.preload(data for _, data in fresh)
+            log = []
+            for index, data in fresh:
+                outcome, record, error = self.apply_one(data)
+                log.append((index, data, outcome, record, error))
+
+            # bulk_create skips the pre_save hook that excuses new absences on approved leave;
+            # updates are re-marks, kept as sent
+            excuse_on_leave(self.to_create)
+            AttendanceRecord.objects.bulk_create(self.to_create)
+            if self.to_update:
+                AttendanceRecord.objects.bulk_update(
+                    self.to_update.values(), ['status', 'marked_by', 'marked_at', 'is_confirmed', 'updated_at']
+                )
+            # Neither bulk write sends signals: the students' dashboards are invalidated here,
+            # and the days of the teachers whose sessions gained records (attendance.today)
+            bump_generations(AttendanceRecord, [
+                record.student_id for record in [*self.to_create, *self.to_update.values()]
+            ])
+            bump_generations(AttendanceRecord, [
+                self.sessions[record.class_session_id].teacher_id
+                for record in self.to_create if record.class_session_id in self.sessions
+            ])
+
+            mutations = []
+            for index, data, outcome, record, error in log:
+                mutations.append(AttendanceSyncMutation(
+                    client_id=data['client_id'],
+                    user=self.user,
+                    record=record,
+                    outcome=outcome,
+                    error=error,
+                    client_marked_at=data['marked_at'],
+                ))
+                results[index] = self.result(data, outcome, record.id if record else None, error)
+            AttendanceSyncMutation.objects.bulk_create(mutations)
+
+        return results
+
+    def result(self, data, outcome, record_id, error, duplicate=False):
+        result = {'client_id': str(data['client_id']), 'outcome': outcome, 'record_id': record_id}
+        if error:
+            result['error'] = error
+        if duplicate:
+            result['duplicate'] = True
+        return result
+
+    def preload(self, mutations):
+        """Load every student, session and existing record the batch touches in a few queries."""
+        mutations = list(mutations)
+        student_ids = {data['student_id'] for data in mutations}
+        session_ids = {data['class_session_id'] for data in mutations if data.get('class_session_id')}
+        dates = {data['date'] for data in mutations if not data.get('class_session_id')}
+
+        self.students = set(User.objects.filter(id__in=student_ids, role='student').values_list('id', flat=True))
+        self.sessions = ClassSession.objects.in_bulk(session_ids)
+        self.member_batches = set()
+        if self.rank == STUDENT_RANK:
+            self.member_batches = set(self.user.batches.values_list('id', flat=True))
+            if self.user.batch_id:
+                self.member_batches.add(self.user.batch_id)
+
+        existing = (
+            AttendanceRecord.objects.select_for_update(of=('self',))
+            .select_related('marked_by')
+            .filter(student_id__in=student_ids)
+            .filter(Q(class_session_id__in=session_ids) | Q(class_session__isnull=True, date__in=dates))
+        )
+        for record in existing:
+            self.records[self.record_key(record.student_id, record.class_session_id, record.date, record.subject)] = record
+
+    def record_key(self, student_id, session_id, date, subject):
+        if session_id:
+            return ('session', student_id, session_id)
+        return ('direct', student_id, date, subject)
+
+    def apply_one(self, data):
+        """Apply one validated mutation. Returns (outcome, record, error)."""
+        student_id = data['student_id']
+        session = None
+        if data.get('class_session_id'):
+            session = self.sessions.get(data['class_session_id'])
+            if session is None:
+                return 'rejected', None, 'Class session not found.'
+
+        if student_id not in self.students:
+            return 'rejected', None, 'Student not found.'
+        if self.rank == STUDENT_RANK:
+            if student_id != self.user.id:
+                return 'rejected', None, 'Students can only mark their own attendance.'
+            if session is None:
+                return 'rejected', None, 'Students must mark attendance against a class session.'
+            if session.batch_id not in self.member_batches:
+                return 'rejected', None, 'Session does not belong to your batch.'
+
+        # A device clock running ahead must not win every future conflict
+        marked_at = min(data['marked_at'], self.now)
+        if self.rank == STAFF_RANK:
+            is_confirmed = True
+        else:
+            is_confirmed = session.teacher_attendance_marked
+
+        key = self.record_key(student_id, session.id if session else None, data.get('date'), data.get('subject'))
+        record = self.records.get(key)
+        if record is None:
+            record = AttendanceRecord(
+                student_id=student_id,
+                class_session=session,
+                date=None if session else data['date'],
+                subject=None if session else data['subject'],
+                status=data['status'],
+                marked_by=self.user,
+                marked_at=marked_at,
+                is_confirmed=is_confirmed,
+            )
+            self.records[key] = record
+            self.to_create.append(record)
+            return 'applied', record, ''
+
+        if (self.rank, marked_at) <= (writer_rank(record.marked_by), record.marked_at):
+            return 'superseded', record, ''
+
+        record.status = data['status']
+        record.marked_by = self.user
+        record.marked_at = marked_at
+        record.is_confirmed = is_confirmed
+        record.updated_at = self.now
+        if record.pk:
+            self.to_update[record.pk] = record
+        return 'applied', record, ''
@@ -0,0 +1,240 @@
+import uuid
+from datetime import date, time, timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from users.models import User
+from timetable.models import ClassSchedule
+from .models import Batch, ClassSession, Holiday, AttendanceRecord
+from .materializer import WEEKDAYS, materialize_sessions
+from .today import compute_teacher_day, teacher_day
+
+
+class SessionMaterializerTests(TestCase):
+    def setUp(self):
+        self.batch = Batch.objects.create(name='MBBS 1st Year A')
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        # 2025-06-02 is a Monday
+        self.monday = ClassSchedule.objects.create(
+            batch=self.batch, day='Monday', start_time=time(9), end_time=time(10), subject='Anatomy', teacher=self.teacher
+        )
+        ClassSchedule.objects.create(
+            batch=self.batch, day='Wednesday', start_time=time(9), end_time=time(10), subject='Physiology', teacher=self.teacher
+        )
+
+    def test_expands_weekly_schedule_into_sessions(self):
+        summary = materialize_sessions(date(2025, 6, 2), date(2025, 6, 15))
+        self.assertEqual(summary['created'], 4)
+        session = ClassSession.objects.get(schedule=self.monday, date=date(2025, 6, 9))
+        self.assertEqual(session.topic, 'Anatomy')
+        self.assertEqual(session.teacher, self.teacher)
+
+    def test_is_idempotent(self):
+        materialize_sessions(date(2025, 6, 2), date(2025, 6, 15))
+        summary = materialize_sessions(date(2025, 6, 2), date(2025, 6, 15))
+        self.assertEqual(summary['created'], 0)
+        self.assertEqual(ClassSession.objects.count(), 4)
+
+    def test_skips_and_prunes_holidays(self):
+        materialize_sessions(date(2025, 6, 2), date(2025, 6, 8))
+        Holiday.objects.create(date=date(2025, 6, 2), name='Founders Day')
+        Holiday.objects.create(date=date(2025, 6, 4), name='Batch trip', batch=self.batch)
+        summary = materialize_sessions(date(2025, 6, 2), date(2025, 6, 8))
+        self.assertEqual(summary['skipped_holidays'], 2)
+        self.assertEqual(summary['removed_on_holidays'], 2)
+        self.assertFalse(ClassSession.objects.exists())
+
+    def test_keeps_holiday_sessions_with_attendance(self):
+        materialize_sessions(date(2025, 6, 2), date(2025, 6, 2))
+        session = ClassSession.objects.get()
+        student = User.objects.create_user(username='student001', password='pass123', role='student')
+        AttendanceRecord.objects.create(student=student, class_session=session)
+        Holiday.objects.create(date=date(2025, 6, 2), name='Founders Day')
+        materialize_sessions(date(2025, 6, 2), date(2025, 6, 2))
+        self.assertTrue(ClassSession.objects.filter(id=session.id).exists())
+
+    def test_materialize_endpoint_requires_admin(self):
+        client = APIClient()
+        url = reverse('materialize-class-sessions')
+        payload = {'start_date': '2025-06-02', 'end_date': '2025-06-08'}
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.teacher)}')
+        self.assertEqual(client.post(url, payload, format='json').status_code, 403)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        response = client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+
+
+    def test_materialize_rejects_impossible_dates_and_malformed_batches(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        url = reverse('materialize-class-sessions')
+        for payload in [
+            {'start_date': '2025-13-45', 'end_date': '2025-06-08'},
+            {'start_date': '2025-06-02', 'end_date': '2025-06-08', 'batch_ids': '1'},
+            {'start_date': '2025-06-02', 'end_date': '2025-06-08', 'batch_ids': [1, 'two']},
+        ]:
+            self.assertEqual(client.post(url, payload, format='json').status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('materialize_sessions', start='2025-02-30', stdout=StringIO())
+
+class AttendanceSyncTests(TestCase):
+    def setUp(self):
+        self.batch = Batch.objects.create(name='MBBS 1st Year A')
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student', batch=self.batch)
+        self.session = ClassSession.objects.create(batch=self.batch, teacher=self.teacher, date=date(2025, 6, 2))
+        self.url = reverse('attendance-sync')
+        self.client = APIClient()
+
+    def sync(self, user, mutations, token=None):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        payload = {'mutations': mutations}
+        if token:
+            payload['sync_token'] = token
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def mutation(self, status_value, marked_at, **extra):
+        data = {
+            'client_id': str(uuid.uuid4()),
+            'student_id': self.student.id,
+            'class_session_id': self.session.id,
+            'status': status_value,
+            'marked_at': marked_at.isoformat(),
+        }
+        data.update(extra)
+        return data
+
+    def test_retried_batch_is_idempotent(self):
+        mutation = self.mutation('present', timezone.now())
+        first = self.sync(self.student, [mutation])
+        second = self.sync(self.student, [mutation])
+        self.assertEqual(first['results'][0]['outcome'], 'applied')
+        self.assertTrue(second['results'][0]['duplicate'])
+        self.assertEqual(AttendanceRecord.objects.count(), 1)
+
+    def test_later_mark_wins_between_equal_ranks(self):
+        now = timezone.now()
+        self.sync(self.student, [self.mutation('late', now - timedelta(minutes=5))])
+        results = self.sync(self.student, [self.mutation('present', now - timedelta(minutes=10))])['results']
+        self.assertEqual(results[0]['outcome'], 'superseded')
+        self.assertEqual(AttendanceRecord.objects.get().status, 'late')
+
+    def test_teacher_mark_beats_later_student_mark(self):
+        now = timezone.now()
+        self.sync(self.teacher, [self.mutation('absent', now - timedelta(minutes=10))])
+        results = self.sync(self.student, [self.mutation('present', now)])['results']
+        self.assertEqual(results[0]['outcome'], 'superseded')
+        record = AttendanceRecord.objects.get()
+        self.assertEqual(record.status, 'absent')
+        self.assertTrue(record.is_confirmed)
+
+    def test_student_cannot_mark_for_someone_else(self):
+        other = User.objects.create_user(username='student002', password='pass123', role='student')
+        results = self.sync(self.student, [self.mutation('present', timezone.now(), student_id=other.id)])['results']
+        self.assertEqual(results[0]['outcome'], 'rejected')
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+    def test_returns_server_changes_since_token(self):
+        token = self.sync(self.student, [])['sync_token']
+        self.sync(self.teacher, [self.mutation('absent', timezone.now())])
+        data = self.sync(self.student, [], token=token)
+        self.assertEqual(len(data['changes']), 1)
+        self.assertEqual(data['changes'][0]['status'], 'absent')
+        with override_settings(CHANGES_SYNC_OVERLAP_SECONDS=0):
+            token = self.sync(self.student, [])['sync_token']
+            self.assertEqual(self.sync(self.student, [], token=token)['changes'], [])
+
+    def test_records_committed_after_a_sync_reach_the_next_one(self):
+        token = self.sync(self.student, [])['sync_token']
+        # Stamped before that sync read, by a transaction that only committed after it
+        record = AttendanceRecord.objects.create(
+            student=self.student, class_session=self.session, status='absent', is_confirmed=True,
+        )
+        AttendanceRecord.objects.filter(pk=record.pk).update(updated_at=timezone.now() - timedelta(seconds=5))
+        changes = self.sync(self.student, [], token=token)['changes']
+        self.assertEqual([change['id'] for change in changes], [record.id])
+
+
+class TeacherTodayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.today = timezone.localdate()
+        weekday = WEEKDAYS[self.today.weekday()]
+        self.batch = Batch.objects.create(name='MBBS 1st Year A')
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.other_teacher = User.objects.create_user(username='teacher002', password='pass123', role='teacher')
+        self.students = [
+            User.objects.create_user(username=f'student00{index}', password='pass123', role='student', batch=self.batch)
+            for index in range(2)
+        ]
+        member = User.objects.create_user(username='student009', password='pass123', role='student')
+        self.batch.students.add(member, self.students[0])
+        self.morning = ClassSchedule.objects.create(
+            batch=self.batch, day=weekday, start_time=time(9), end_time=time(10), subject='Anatomy', teacher=self.teacher,
+        )
+        self.afternoon = ClassSchedule.objects.create(
+            batch=self.batch, day=weekday, start_time=time(14), end_time=time(15), subject='Physiology', teacher=self.teacher,
+        )
+        ClassSchedule.objects.create(
+            batch=self.batch, day=weekday, start_time=time(11), end_time=time(12), subject='Biochemistry', teacher=self.other_teacher,
+        )
+        materialize_sessions(self.today, self.today)
+        ClassSession.objects.filter(schedule=self.afternoon).delete()
+        self.session = ClassSession.objects.get(schedule=self.morning)
+        self.extra = ClassSession.objects.create(batch=self.batch, teacher=self.teacher, date=self.today, topic='Revision')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.teacher)}')
+
+    def test_joins_slots_sessions_and_marking_counts(self):
+        AttendanceRecord.objects.create(student=self.students[0], class_session=self.session, status='present')
+        AttendanceRecord.objects.create(student=self.students[1], class_session=self.session, status='absent')
+
+        with self.assertNumQueries(4):
+            data = compute_teacher_day(self.teacher.id, self.today)
+
+        self.assertEqual([entry['subject'] for entry in data['classes']], ['Anatomy', 'Physiology', 'Revision'])
+        morning, afternoon, extra = data['classes']
+        self.assertEqual(morning['session']['id'], self.session.id)
+        self.assertEqual((morning['session']['students'], morning['session']['marked'], morning['session']['unmarked']), (3, 2, 1))
+        self.assertIsNone(afternoon['session'])
+        self.assertEqual(extra['session']['id'], self.extra.id)
+        self.assertEqual(data['totals'], {'classes': 3, 'sessions': 2, 'students': 6, 'marked': 2, 'unmarked': 4})
+
+    def test_precomputed_day_is_kept_current_by_attendance_writes(self):
+        out = StringIO()
+        call_command('warm_teacher_day', stdout=out)
+        self.assertIn('2 teachers', out.getvalue())
+
+        response = self.client.get(reverse('teacher-today'))
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['totals']['marked'], 0)
+
+        # Marked through the offline sync, whose bulk_create() sends no signals
+        self.client.post(reverse('attendance-sync'), {'mutations': [{
+            'client_id': str(uuid.uuid4()), 'student_id': self.students[0].id,
+            'class_session_id': self.session.id, 'status': 'present', 'marked_at': timezone.now().isoformat(),
+        }]}, format='json')
+
+        response = self.client.get(reverse('teacher-today'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['totals']['marked'], 1)
+        # Only the teacher of the session is recomputed
+        self.assertEqual(teacher_day(self.other_teacher.id, self.today)[1], 'hit')
+
+        self.client.post(reverse('teacher-mark-attendance'), {'class_session_id': self.session.id}, format='json')
+        response = self.client.get(reverse('teacher-today'))
+        self.assertTrue(response.data['classes'][0]['session']['teacher_attendance_marked'])
+
+    def test_only_teachers_have_a_day(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.students[0])}')
+        self.assertEqual(self.client.get(reverse('teacher-today')).status_code, 403)
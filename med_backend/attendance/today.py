@@ -0,0 +1,152 @@
+# attendance/today.py
+
+"""
+A teacher's day in one read: today's timetable slots, the attendance sessions for them,
+and how many students of each session are marked.
+
+compute_teacher_day() takes a fixed number of queries whatever the timetable looks like:
+
+- the teacher's ClassSchedule slots for the weekday
+- their ClassSession rows on the date, with the number of students marked in each from one
+  aggregate over their attendance records (sessions generated from a slot are joined to it
+  by schedule_id; sessions created by hand are listed after the slots)
+- the roster size of each batch involved, members and users assigned to it alike
+- the holidays of the date
+
+teacher_day() caches the result per (teacher, date) until the day is over, and the
+warm_teacher_day command computes it for every teacher with classes at day start, so the
+first load of the morning is a hit as well. The key embeds the teacher's own generations of
+ClassSession and AttendanceRecord (scoped by AttendanceConfig.ready(), see core.cache):
+marking a student rebuilds only the day of the teacher of that session. Timetable, holiday,
+batch and user changes rebuild every teacher's day.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.cache import generations, get_or_compute, make_key
+from timetable.models import ClassSchedule
+from users.models import User
+from .materializer import WEEKDAYS
+from .models import AttendanceRecord, Batch, ClassSession, Holiday
+
+NAMESPACE = 'teacher-day'
+
+
+def session_teacher_id(record):
+    """The teacher of an attendance record's session; None for direct records."""
+    if record.class_session_id is None:
+        return None
+    if AttendanceRecord.class_session.is_cached(record):
+        return record.class_session.teacher_id
+    return ClassSession.objects.filter(id=record.class_session_id).values_list('teacher_id', flat=True).first()
+
+
+def roster_sizes(batch_ids):
+    """{batch id: number of students}, counting members and users assigned to the batch once."""
+    members = Batch.students.through.objects.filter(batch_id__in=batch_ids, user__role='student').values_list('user_id', 'batch_id')
+    assigned = User.objects.filter(batch_id__in=batch_ids, role='student').values_list('id', 'batch_id')
+    sizes = {}
+    for _, batch_id in members.union(assigned):
+        sizes[batch_id] = sizes.get(batch_id, 0) + 1
+    return sizes
+
+
+def _session_data(session, students):
+    return {
+        'id': session.id,
+        'topic': session.topic,
+        'teacher_attendance_marked': session.teacher_attendance_marked,
+        'students': students,
+        'marked': session.marked,
+        'unmarked': max(students - session.marked, 0),
+    }
+
+
+def compute_teacher_day(teacher_id, day):
+    slots = list(
+        ClassSchedule.objects.filter(teacher_id=teacher_id, day=WEEKDAYS[day.weekday()])
+        .select_related('batch').order_by('start_time', 'id')
+    )
+    sessions = list(
+        ClassSession.objects.filter(teacher_id=teacher_id, date=day)
+        .select_related('batch')
+        .annotate(marked=Count('attendance_records__student', distinct=True))
+        .order_by('id')
+    )
+    batch_ids = {slot.batch_id for slot in slots} | {session.batch_id for session in sessions}
+    sizes = roster_sizes(batch_ids) if batch_ids else {}
+    holidays = {}
+    if batch_ids:
+        for batch_id, name in Holiday.objects.filter(
+            Q(batch__isnull=True) | Q(batch_id__in=batch_ids), date=day,
+        ).values_list('batch_id', 'name'):
+            holidays[batch_id] = name
+
+    by_schedule = {session.schedule_id: session for session in sessions if session.schedule_id}
+    classes = []
+    for slot in slots:
+        session = by_schedule.pop(slot.id, None)
+        classes.append({
+            'schedule_id': slot.id,
+            'start_time': slot.start_time,
+            'end_time': slot.end_time,
+            'subject': slot.subject,
+            'room': slot.room,
+            'batch_id': slot.batch_id,
+            'batch': slot.batch.name,
+            'holiday': holidays.get(slot.batch_id, holidays.get(None)),
+            'session': _session_data(session, sizes.get(slot.batch_id, 0)) if session else None,
+        })
+    # Sessions created by hand, or generated from a slot since given to another teacher
+    scheduled = {id(session) for session in by_schedule.values()}
+    for session in sessions:
+        if session.schedule_id is None or id(session) in scheduled:
+            classes.append({
+                'schedule_id': None, 'start_time': None, 'end_time': None,
+                'subject': session.topic, 'room': None,
+                'batch_id': session.batch_id, 'batch': session.batch.name,
+                'holiday': holidays.get(session.batch_id, holidays.get(None)),
+                'session': _session_data(session, sizes.get(session.batch_id, 0)),
+            })
+
+    held = [entry['session'] for entry in classes if entry['session']]
+    return {
+        'date': day,
+        'teacher_id': teacher_id,
+        'classes': classes,
+        'totals': {
+            'classes': len(classes),
+            'sessions': len(held),
+            'students': sum(session['students'] for session in held),
+            'marked': sum(session['marked'] for session in held),
+            'unmarked': sum(session['unmarked'] for session in held),
+        },
+    }
+
+
+def _until_end_of(day):
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), timezone.get_current_timezone())
+    return max(int((end - timezone.now()).total_seconds()), 60)
+
+
+def teacher_day(teacher_id, day):
+    """compute_teacher_day(), cached. Returns (data, cache outcome)."""
+    key = make_key(
+        NAMESPACE,
+        (teacher_id, day, generations([ClassSession, AttendanceRecord], scope=teacher_id)),
+        models=[ClassSchedule, Holiday, Batch, User],
+    )
+    return get_or_compute(NAMESPACE, key, lambda: compute_teacher_day(teacher_id, day), _until_end_of(day))
+
+
+def warm_teacher_days(day):
+    """Cache the day of every teacher with a slot or a session on `day`. Returns how many."""
+    teacher_ids = set(
+        ClassSchedule.objects.filter(day=WEEKDAYS[day.weekday()], teacher__isnull=False).values_list('teacher_id', flat=True)
+    ) | set(ClassSession.objects.filter(date=day).values_list('teacher_id', flat=True))
+    for teacher_id in teacher_ids:
+        teacher_day(teacher_id, day)
+    return len(teacher_ids)
@@ -1,9 +1,12 @@
 from django.urls import path
 from .views import (
     ClassSessionCreateView,
+    ClassSessionMaterializeView,
     TeacherMarkAttendanceView,
     TeacherBulkAttendanceView,
+    TeacherTodayView,
     MarkAttendanceView,
+    AttendanceSyncView,
     ViewMyAttendance,
     AttendanceRecordDetailView,
     AttendanceListByBatchView,
@@ -14,9 +17,12 @@ from .views import (
 
 urlpatterns = [
     path('classsession/create/', ClassSessionCreateView.as_view(), name='create-class-session'),
+    path('classsession/materialize/', ClassSessionMaterializeView.as_view(), name='materialize-class-sessions'),
     path('teacher/mark/', TeacherMarkAttendanceView.as_view(), name='teacher-mark-attendance'),
+    path('teacher/today/', TeacherTodayView.as_view(), name='teacher-today'),
     path('teacher/bulk-mark/', TeacherBulkAttendanceView.as_view(), name='teacher-bulk-mark-attendance'),
     path('attendance/mark/', MarkAttendanceView.as_view(), name='mark-attendance'),
+    path('attendance/sync/', AttendanceSyncView.as_view(), name='attendance-sync'),
     path('attendance/my/', ViewMyAttendance.as_view(), name='view-my-attendance'),
     path('attendance/batch/<int:batch_id>/', AttendanceListByBatchView.as_view(), name='attendance-by-batch'),
     path('attendance/student/<int:student_id>/', AttendanceListByStudentView.as_view(), name='attendance-by-student'),
@@ -5,11 +5,21 @@ from rest_framework import status, generics
 from rest_framework.exceptions import PermissionDenied # Import PermissionDenied
 from django.shortcuts import get_object_or_404
 from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import Batch, ClassSession, AttendanceRecord
 from .serializers import BatchSerializer, ClassSessionSerializer, AttendanceRecordSerializer
 # Updated import for renamed permission
 from .permissions import IsAdminPrincipalOrTeacher, IsStudentOrAdminOrTeacher, IsOwnerOrAdminOrTeacher 
 from users.models import User 
+from users.capabilities import is_faculty, is_management
+from .materializer import materialize_sessions
+from .sync import AttendanceSync, MAX_MUTATIONS_PER_SYNC, changes_since
+from .today import teacher_day
+from core.cache import CACHE_STATUS_HEADER, bump_generations
+from core.changes import ChangeFeed, next_sync_token, parse_sync_token
+from core.events import publish_on_commit
+from core.routing import ReplicaReadMixin
 # from users.serializers import UserSimpleSerializer # No need to import here, already imported in serializers.py
 
 
@@ -22,6 +32,54 @@ class ClassSessionCreateView(generics.CreateAPIView):
         serializer.save(teacher=self.request.user)
 
 
+class ClassSessionMaterializeView(APIView):
+    """
+    Generates ClassSession rows from the weekly timetable for a date range,
+    so students can mark attendance without a teacher creating each session first.
+    Safe to repeat: sessions that already exist are left untouched.
+    """
+    permission_classes = [IsAuthenticated, IsAdminPrincipalOrTeacher]
+    max_range_days = 120
+
+    def post(self, request):
+        user = request.user
+        if not is_management(user):
+            return Response({"error": "Only admins and principals can generate class sessions."},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        example = {"start_date": "2025-08-04", "end_date": "2025-08-10", "batch_ids": [1, 2]}
+        try:
+            # parse_date() raises ValueError for well-formed but impossible dates (2025-13-45)
+            start_date = parse_date(str(request.data.get('start_date', '')))
+            end_date = parse_date(str(request.data.get('end_date', '')))
+        except ValueError:
+            start_date = end_date = None
+        batch_ids = request.data.get('batch_ids') or None
+
+        if not start_date or not end_date:
+            return Response({
+                "error": "Validation failed",
+                "details": "start_date and end_date are required as valid dates in YYYY-MM-DD format",
+                "example": example,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if batch_ids is not None and not (
+            isinstance(batch_ids, list) and all(type(batch_id) is int for batch_id in batch_ids)
+        ):
+            return Response({
+                "error": "Validation failed",
+                "details": "batch_ids must be a list of batch ids",
+                "example": example,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if start_date > end_date:
+            return Response({"error": "start_date cannot be after end_date."}, status=status.HTTP_400_BAD_REQUEST)
+        if (end_date - start_date).days >= self.max_range_days:
+            return Response({"error": f"Date range cannot exceed {self.max_range_days} days."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        summary = materialize_sessions(start_date, end_date, batch_ids=batch_ids)
+        return Response(summary, status=status.HTTP_200_OK)
+
+
 class TeacherMarkAttendanceView(APIView):
     permission_classes = [IsAuthenticated, IsAdminPrincipalOrTeacher] # Updated permission
 
@@ -33,7 +91,7 @@ class TeacherMarkAttendanceView(APIView):
         session = get_object_or_404(ClassSession, id=session_id)
 
         # Ensure only assigned teacher, admin, principal, or hidden superuser can mark
-        if not (request.user.is_staff or getattr(request.user, 'is_hidden_superuser', False) or request.user.role in ['admin', 'principal'] or session.teacher == request.user):
+        if not (is_management(request.user) or session.teacher_id == request.user.id):
             return Response({"error": "Not authorized to mark teacher attendance for this session."},
                             status=status.HTTP_403_FORBIDDEN)
 
@@ -41,11 +99,41 @@ class TeacherMarkAttendanceView(APIView):
         session.save()
 
         # Confirm all student attendance records for this session
-        AttendanceRecord.objects.filter(class_session=session).update(is_confirmed=True)
+        newly_confirmed = list(
+            AttendanceRecord.objects.filter(class_session=session, is_confirmed=False)
+            .values('id', 'student_id', 'status')
+        )
+        AttendanceRecord.objects.filter(class_session=session).update(is_confirmed=True, updated_at=timezone.now())
+        bump_generations(AttendanceRecord, [record['student_id'] for record in newly_confirmed])
+
+        # Let each student whose record was just confirmed know without polling
+        for record in newly_confirmed:
+            publish_on_commit([record['student_id']], 'attendance.confirmed', {
+                'record_id': record['id'],
+                'class_session_id': session.id,
+                'date': session.date,
+                'status': record['status'],
+            })
 
         return Response({"message": "Teacher attendance marked; student records confirmed."})
 
 
+class TeacherTodayView(APIView):
+    """
+    A teacher's classes today, with the attendance session of each and how many of its
+    students are marked (attendance.today). Precomputed by warm_teacher_day.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'teacher':
+            return Response({"error": "Only teachers have a today view."}, status=status.HTTP_403_FORBIDDEN)
+        data, outcome = teacher_day(request.user.id, timezone.localdate())
+        response = Response(data)
+        response[CACHE_STATUS_HEADER] = outcome.upper()
+        return response
+
+
 class TeacherBulkAttendanceView(APIView):
     """
     New view for teachers to mark attendance for multiple students without requiring class sessions.
@@ -57,7 +145,7 @@ class TeacherBulkAttendanceView(APIView):
         user = request.user
         
         # Ensure only teachers, admins, principals can use this endpoint
-        if not (user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal', 'teacher']):
+        if not is_faculty(user):
             return Response({"error": "Only teachers, admins, and principals can mark attendance."}, 
                           status=status.HTTP_403_FORBIDDEN)
 
@@ -139,7 +227,7 @@ class MarkAttendanceView(generics.CreateAPIView):
 
         is_confirmed_status = False
         # If admin, principal, teacher, or hidden superuser marks, it's confirmed
-        if user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal', 'teacher']:
+        if is_faculty(user):
             is_confirmed_status = True
         elif user.role == 'student':
             # Student's mark is confirmed only if the teacher has marked the session
@@ -167,6 +255,47 @@ class MarkAttendanceView(generics.CreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
+class AttendanceSyncView(APIView):
+    """
+    Offline-first sync for attendance marking.
+    Accepts a batch of client mutations (idempotent by client_id), applies them in one
+    transaction with last-writer-wins plus teacher-over-student precedence, and returns the
+    server-side changes since the client's last sync token.
+    """
+    permission_classes = [IsAuthenticated, IsStudentOrAdminOrTeacher]
+
+    def post(self, request):
+        mutations = request.data.get('mutations', [])
+        since_token = request.data.get('sync_token')
+
+        if not isinstance(mutations, list):
+            return Response({"error": "mutations must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(mutations) > MAX_MUTATIONS_PER_SYNC:
+            return Response({
+                "error": "Too many mutations",
+                "details": f"At most {MAX_MUTATIONS_PER_SYNC} mutations can be sent per sync; split the batch.",
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        since = None
+        if since_token:
+            try:
+                since = parse_sync_token(since_token)
+            except (TypeError, ValueError, OverflowError):
+                return Response({"error": "Invalid sync_token."}, status=status.HTTP_400_BAD_REQUEST)
+
+        sync = AttendanceSync(request.user)
+        # Taken before applying and backed off by the overlap (core.changes), so anything
+        # written during this request, or committed by others after it reads, is in the next delta
+        token = next_sync_token(sync.now)
+        results = sync.apply(mutations)
+
+        return Response({
+            "results": results,
+            "changes": changes_since(request.user, since) if since else [],
+            "sync_token": token,
+        }, status=status.HTTP_200_OK)
+
+
 class ViewMyAttendance(generics.ListAPIView):
     serializer_class = AttendanceRecordSerializer
     permission_classes = [IsAuthenticated] # Permissions are handled in get_queryset
@@ -180,7 +309,7 @@ class ViewMyAttendance(generics.ListAPIView):
             'student', 'class_session__batch', 'class_session__teacher', 'marked_by'
         )
 
-        if user.is_staff or role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_management(user):
             # Admins/Principals/Hidden Superusers see all confirmed records
             return base_queryset.filter(is_confirmed=True).order_by('-class_session__date')
         elif role == 'teacher':
@@ -193,6 +322,20 @@ class ViewMyAttendance(generics.ListAPIView):
             # For other roles or unauthenticated, return nothing
             return AttendanceRecord.objects.none()
 
+    def list(self, request, *args, **kwargs):
+        # ?since=<token> returns only records changed or deleted after the token
+        feed = ChangeFeed(request)
+        if feed.since is None:
+            return feed.full(super().list(request, *args, **kwargs))
+        user = request.user
+        privileged = is_management(user)
+        return feed.delta(
+            self.get_queryset(),
+            self.get_serializer_class(),
+            owners=None if privileged else [user.id],
+            context=self.get_serializer_context(),
+        )
+
 
 class AttendanceListByBatchView(generics.ListAPIView):
     serializer_class = AttendanceRecordSerializer
@@ -210,7 +353,7 @@ class AttendanceListByBatchView(generics.ListAPIView):
             'student', 'class_session__batch', 'class_session__teacher', 'marked_by'
         ).order_by('-date', 'student__username')
 
-        if user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_management(user):
             return base_queryset
         elif user.role == 'teacher':
             # Teachers can view any batch attendance (simplified for new system)
@@ -231,7 +374,7 @@ class AttendanceListByStudentView(generics.ListAPIView):
             'student', 'class_session__batch', 'class_session__teacher', 'marked_by'
         ).order_by('-date')
 
-        if user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_management(user):
             return base_queryset
         elif user.role == 'teacher':
             # Teachers can view any student attendance (simplified for new system)
@@ -239,14 +382,14 @@ class AttendanceListByStudentView(generics.ListAPIView):
         return AttendanceRecord.objects.none()
 
 
-class AttendanceListAllView(generics.ListAPIView):
+class AttendanceListAllView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = AttendanceRecordSerializer
     permission_classes = [IsAuthenticated, IsAdminPrincipalOrTeacher] # Updated permission
 
     def get_queryset(self):
         user = self.request.user
         # Only Admin or Principal or hidden superuser can view all attendance without filters
-        if user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_management(user):
             return AttendanceRecord.objects.all().select_related(
                 'student', 'class_session__batch', 'class_session__teacher', 'marked_by'
             ).order_by('-date', 'student__username')
@@ -273,13 +416,14 @@ class AttendanceRecordDetailView(generics.RetrieveUpdateDestroyAPIView):
 
         user = request.user
         # Only admin/principal/teacher/hidden superuser can change 'is_confirmed' status
-        if 'is_confirmed' in request.data and not (user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal', 'teacher']):
+        if 'is_confirmed' in request.data and not is_faculty(user):
             raise PermissionDenied("You do not have permission to change 'is_confirmed' status.")
         
         # If admin/teacher/principal/hidden superuser updates, they implicitly confirm and are the 'marked_by'
-        if user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal', 'teacher']:
+        if is_faculty(user):
             serializer.validated_data['is_confirmed'] = True
             serializer.validated_data['marked_by'] = user 
+            serializer.validated_data['marked_at'] = timezone.now()
 
         self.perform_update(serializer)
         return Response(serializer.data)
@@ -296,8 +440,8 @@ class ParentViewStudentAttendance(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        if user.role == 'parent' and user.child:
-            return AttendanceRecord.objects.filter(student=user.child).select_related(
+        if user.role == 'parent' and user.child_id:
+            return AttendanceRecord.objects.filter(student_id=user.child_id).select_related(
                 'student', 'class_session__batch', 'class_session__teacher', 'marked_by'
             ).order_by('-class_session__date')
         raise PermissionDenied("You are not authorized to view student attendance.")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college_in_out_log', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='collegeinoutlog',
+            name='entry_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
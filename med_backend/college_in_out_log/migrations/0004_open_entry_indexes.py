@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college_in_out_log', '0003_entry_time_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collegeinoutlog',
+            name='auto_closed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='collegeinoutlog',
+            index=models.Index(condition=models.Q(('exit_time__isnull', True)), fields=['entry_time'], name='college_open_age_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college_in_out_log', '0004_open_entry_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collegeinoutlog',
+            index=models.Index(fields=['entry_time'], name='college_entry_time_idx'),
+        ),
+    ]
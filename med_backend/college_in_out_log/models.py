@@ -8,12 +8,21 @@ User = settings.AUTH_USER_MODEL
 
 class CollegeInOutLog(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='college_logs')
-    entry_time = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: gate readers report the time of the tap, which may be a little in the past
+    entry_time = models.DateTimeField(default=timezone.now)
     exit_time = models.DateTimeField(null=True, blank=True)
     marked_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='college_log_marked')
+    # Closed by close_stale_entries with a synthetic exit time, not by a tap
+    auto_closed = models.BooleanField(default=False)
 
     def __str__(self):
         return f"{self.student.username} - Entry: {self.entry_time.strftime('%Y-%m-%d %H:%M')}"
 
     class Meta:
-        ordering = ['-entry_time']
\ No newline at end of file
+        ordering = ['-entry_time']
+        indexes = [
+            # Open rows only, for close_stale_entries
+            models.Index(fields=['entry_time'], condition=models.Q(exit_time__isnull=True), name='college_open_age_idx'),
+            # Date range scans of presence.dwell
+            models.Index(fields=['entry_time'], name='college_entry_time_idx'),
+        ]
\ No newline at end of file
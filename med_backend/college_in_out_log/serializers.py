@@ -16,5 +16,5 @@ class CollegeInOutLogSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CollegeInOutLog
-        fields = ['id', 'student', 'student_id', 'entry_time', 'exit_time', 'marked_by']
-        read_only_fields = ['entry_time', 'exit_time', 'marked_by'] # marked_by is set by view
+        fields = ['id', 'student', 'student_id', 'entry_time', 'exit_time', 'auto_closed', 'marked_by']
+        read_only_fields = ['entry_time', 'exit_time', 'auto_closed', 'marked_by'] # marked_by is set by view
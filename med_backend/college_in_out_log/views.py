@@ -3,10 +3,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
-from django.utils import timezone
 from .models import CollegeInOutLog
 from .serializers import CollegeInOutLogSerializer
 from users.models import User
+from presence.models import PresenceState
+from presence.services import AlreadyInside, NotInside, record_entry, record_exit
 from .permissions import IsAdminPrincipalOrHiddenSuperuser # Import permission
 
 
@@ -18,12 +19,11 @@ class CollegeEntryView(APIView):
         if user.role != 'student':
             return Response({"error": "Only students can mark entry."}, status=status.HTTP_403_FORBIDDEN)
 
-        # Prevent multiple open entries without exit
-        open_entries = CollegeInOutLog.objects.filter(student=user, exit_time__isnull=True)
-        if open_entries.exists():
+        # Prevent multiple open entries without exit; checked against the presence state, not the log
+        try:
+            entry = record_entry(user, PresenceState.CAMPUS, marked_by=user)
+        except AlreadyInside:
             return Response({"error": "You have already marked entry without exit. Please mark exit first."}, status=status.HTTP_400_BAD_REQUEST)
-
-        entry = CollegeInOutLog.objects.create(student=user, marked_by=user)
         serializer = CollegeInOutLogSerializer(entry)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -36,15 +36,11 @@ class CollegeExitView(APIView):
             return Response({"error": "Only students can mark exit."}, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            # Get the latest entry that doesn't have an exit time for the current student
-            entry = CollegeInOutLog.objects.filter(student=user, exit_time__isnull=True).latest('entry_time')
-        except CollegeInOutLog.DoesNotExist:
+            # Closes the open entry the presence state points at
+            entry = record_exit(user, PresenceState.CAMPUS, marked_by=user)
+        except NotInside:
             return Response({"error": "No open entry record found for you. Please mark entry first."}, status=status.HTTP_400_BAD_REQUEST)
 
-        entry.exit_time = timezone.now()
-        entry.marked_by = user # Ensure marked_by is the user who performs the action
-        entry.save()
-
         serializer = CollegeInOutLogSerializer(entry)
         return Response(serializer.data)
 
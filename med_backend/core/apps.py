@@ -0,0 +1,16 @@
+# core/apps.py
+
+from django.apps import AppConfig
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import configure_sqlite_connection
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='core.db.sqlite_pragmas')
+
+        from django.core import checks
+        from .routing import check_pin_cache
+        checks.register(check_pin_cache, checks.Tags.caches, checks.Tags.database)
@@ -0,0 +1,265 @@
+# core/cache.py
+
+"""
+Read-through caching for read-mostly endpoints.
+
+Keys are versioned instead of deleted. Every cached model has a generation counter in the
+cache, and each entry's key embeds the current generation of the models it was built from:
+
+    v1:<namespace>:<generation>-<generation>:<digest of the varying parts>
+
+Saving or deleting a row of a cached model bumps its generation, so later lookups build
+new keys and the old entries are never read again; they expire on their own. Models must
+be registered with invalidate_on_change() from their app's ready() so writes made
+anywhere (views, admin, commands) are seen. Caches of a single owner's rows (a student's
+dashboard) use generations scoped to the owner instead, so one student's new grade does not
+invalidate every other student's entries.
+
+get_or_compute() adds single-flight locking: on a miss, one caller computes the value
+while concurrent callers for the same key wait for it, instead of all hitting the
+database at once. Hits, misses and waits are counted per namespace in `metrics`.
+
+All of this runs on the default cache. With the local-memory backend each worker process
+has its own entries; the SQLite backend (core.cache_backends) shares them across workers.
+"""
+
+import functools
+import hashlib
+import operator
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.response import Response
+
+KEY_SCHEMA_VERSION = 1
+CACHE_STATUS_HEADER = 'X-Cache'
+
+_MISSING = object()
+
+
+class CacheMetrics:
+    """Per-process counters of cache outcomes, keyed by namespace."""
+
+    OUTCOMES = ('hit', 'miss', 'wait', 'lock_timeout')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, namespace, outcome):
+        with self._lock:
+            self._counts[namespace, outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        stats = {}
+        for (namespace, outcome), count in counts.items():
+            stats.setdefault(namespace, dict.fromkeys(self.OUTCOMES, 0))[outcome] = count
+        for entry in stats.values():
+            lookups = entry['hit'] + entry['miss'] + entry['wait']
+            entry['hit_ratio'] = round((entry['hit'] + entry['wait']) / lookups, 3) if lookups else None
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = CacheMetrics()
+
+
+def _generation_key(model, scope=None):
+    key = f'gen:{model._meta.label_lower}'
+    return key if scope is None else f'{key}:{scope}'
+
+
+def _fresh_generation():
+    # Time-based rather than 1: if a generation key is evicted, restarting from a small
+    # number could make keys of entries cached before the eviction valid again
+    return time.time_ns() // 1000
+
+
+def generations(models, scope=None):
+    """
+    Current generation of each model, in order (one cache round trip). With `scope`, the
+    generations of the models' rows belonging to that owner (see invalidate_on_change).
+    """
+    keys = [_generation_key(model, scope) for model in models]
+    found = cache.get_many(keys)
+    result = []
+    for key in keys:
+        generation = found.get(key)
+        if generation is None:
+            cache.add(key, _fresh_generation(), None)
+            generation = cache.get(key)
+        result.append(generation)
+    return result
+
+
+def bump_generation(model, scope=None):
+    """Invalidate every entry built from `model`, or only from the rows of owner `scope`."""
+    key = _generation_key(model, scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_generation(), None)
+
+
+def bump_generations(model, scopes):
+    """bump_generation() for each owner in `scopes`, now and again after commit."""
+    scopes = {scope for scope in scopes if scope is not None}
+
+    def bump():
+        for scope in scopes:
+            bump_generation(model, scope)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def _bump_on_change(sender, **kwargs):
+    bump_generation(sender)
+    # Bumped again after commit: a concurrent reader may have cached the pre-commit rows
+    # under the first new generation
+    transaction.on_commit(lambda: bump_generation(sender))
+
+
+def _scoped_bump(scope):
+    owner = scope if callable(scope) else operator.attrgetter(scope)
+
+    def bump_on_change(sender, instance, **kwargs):
+        bump_generations(sender, [owner(instance)])
+    return bump_on_change
+
+
+def invalidate_on_change(*models, scope=None):
+    """
+    Bump a model's generation whenever one of its rows is saved or deleted. With `scope`,
+    the name of an owner attribute such as 'student_id' or a function of the row returning
+    its owner, the generation bumped is the one of the row's owner instead, for caches of a
+    single owner's rows. Writes that send no signals (update(), bulk_create()) must call
+    bump_generations() themselves.
+    """
+    for model in models:
+        uid = f'core.cache.invalidate:{model._meta.label_lower}'
+        receiver = _bump_on_change
+        if scope is not None:
+            uid, receiver = f"{uid}:{getattr(scope, '__qualname__', scope)}", _scoped_bump(scope)
+        post_save.connect(receiver, sender=model, dispatch_uid=f'{uid}:save', weak=False)
+        post_delete.connect(receiver, sender=model, dispatch_uid=f'{uid}:delete', weak=False)
+
+
+def make_key(namespace, parts=(), models=()):
+    digest = hashlib.blake2b(repr(tuple(parts)).encode('utf-8'), digest_size=12).hexdigest()
+    versions = '-'.join(str(generation) for generation in generations(models)) or '0'
+    return f'v{KEY_SCHEMA_VERSION}:{namespace}:{versions}:{digest}'
+
+
+def _lock_timeout():
+    return getattr(settings, 'CACHE_LOCK_TIMEOUT_SECONDS', 10)
+
+
+class Uncacheable(Exception):
+    """Raised from a compute function to return a value without caching it."""
+
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+def get_or_compute(namespace, key, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for `key`, computing and storing it on a miss.
+    Returns (value, outcome) where outcome is 'hit', 'miss' or 'wait'.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        metrics.record(namespace, 'hit')
+        return value, 'hit'
+
+    lock_key = f'{key}:lock'
+    lock_timeout = _lock_timeout()
+    if not cache.add(lock_key, 1, lock_timeout):
+        # Someone else is computing this value; wait for it rather than repeating the work
+        deadline = time.monotonic() + lock_timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                metrics.record(namespace, 'wait')
+                return value, 'wait'
+        metrics.record(namespace, 'lock_timeout')
+
+    metrics.record(namespace, 'miss')
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+    except Uncacheable as uncacheable:
+        return uncacheable.value, 'miss'
+    finally:
+        cache.delete(lock_key)
+    return value, 'miss'
+
+
+def cached_view(namespace, models=(), timeout=DEFAULT_TIMEOUT, per_user=False, owned_models=(), owners=None):
+    """
+    Cache a DRF view method's 200 responses (their data) for GET requests.
+
+    The key varies on the full path including the query string, and on the user when
+    per_user is set. `owned_models` are keyed by their generations scoped to each owner
+    `owners(request)` returns (the requesting user by default), so only writes to those
+    owners' rows invalidate the entry; register them with invalidate_on_change(scope=).
+    Other responses are returned as computed and not cached. Responses carry an X-Cache
+    header with the outcome.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            parts = [request.get_full_path()]
+            if per_user:
+                parts.append(request.user.pk)
+            if owned_models:
+                for owner in (owners(request) if owners else [request.user.pk]):
+                    parts.append((owner, generations(owned_models, scope=owner)))
+            key = make_key(namespace, parts, models)
+
+            def compute():
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200 or not hasattr(response, 'data'):
+                    raise Uncacheable(response)
+                return response.data
+
+            value, outcome = get_or_compute(namespace, key, compute, timeout)
+            response = value if isinstance(value, Response) else Response(value)
+            response[CACHE_STATUS_HEADER] = outcome.upper()
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def cached_queryset(namespace, models=(), timeout=DEFAULT_TIMEOUT):
+    """
+    Cache the rows of a function returning a queryset, keyed by its arguments.
+    The decorated function returns a list of model instances.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            key = make_key(namespace, (args, sorted(kwargs.items())), models)
+            rows, _ = get_or_compute(namespace, key, lambda: list(function(*args, **kwargs)), timeout)
+            return rows
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,170 @@
+# core/cache_backends.py
+
+"""
+A cache backend stored in a local SQLite file.
+
+Every worker process on the host opens the same file, so entries, counters and locks are
+shared between gunicorn workers without running a cache server. The file is kept in WAL
+mode so readers never wait for a writer. add() and incr() run inside an immediate
+transaction, which makes them atomic across processes (the rate limiter and the
+single-flight locks in core.cache rely on that).
+
+    CACHES = {'default': {'BACKEND': 'core.cache_backends.SQLiteCache', 'LOCATION': '/path/cache.sqlite3'}}
+
+Keep LOCATION off the main database file: cache writes would otherwise contend with
+application writes for SQLite's single writer lock.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Expired rows and overflow are culled on every Nth write from a process
+CULL_EVERY = 200
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork (gunicorn forks after importing the app)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entry '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _live(self, connection, key):
+        row = connection.execute('SELECT value, expires FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row
+
+    def _store(self, connection, key, value, timeout):
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entry (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout)),
+        )
+        self._writes += 1
+        if self._writes % CULL_EVERY == 0:
+            self._cull(connection)
+
+    def _cull(self, connection):
+        connection.execute('DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count = connection.execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+        if count > self._max_entries:
+            # Same policy as Django's database cache: drop 1/cull_frequency of the entries,
+            # soonest to expire first
+            excess = count // self._cull_frequency if self._cull_frequency else count
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key IN '
+                '(SELECT key FROM cache_entry ORDER BY expires IS NULL, expires LIMIT ?)',
+                (excess,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._live(self._connection(), key)
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keyed = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keyed:
+            return {}
+        placeholders = ','.join('?' * len(keyed))
+        rows = self._connection().execute(
+            f'SELECT key, value, expires FROM cache_entry WHERE key IN ({placeholders})', list(keyed)
+        )
+        now = time.time()
+        return {
+            keyed[key]: pickle.loads(value)
+            for key, value, expires in rows
+            if expires is None or expires > now
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            self._store(connection, key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            if self._live(connection, key) is not None:
+                return False
+            self._store(connection, key, value, timeout)
+            return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            if self._live(connection, key) is None:
+                return False
+            connection.execute(
+                'UPDATE cache_entry SET expires = ? WHERE key = ?', (self.get_backend_timeout(timeout), key)
+            )
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            row = self._live(connection, key)
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache_entry SET value = ? WHERE key = ?', (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key)
+            )
+            return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            return connection.execute('DELETE FROM cache_entry WHERE key = ?', (key,)).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            placeholders = ','.join('?' * len(keys))
+            with self._write() as connection:
+                connection.execute(f'DELETE FROM cache_entry WHERE key IN ({placeholders})', keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._live(self._connection(), key) is not None
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache_entry')
+
+    def close(self, **kwargs):
+        # Connections are reused across requests; Django calls close() after each one
+        pass
@@ -0,0 +1,153 @@
+# core/changes.py
+
+"""
+Incremental "changes since" feeds for list endpoints.
+
+A full list response carries an X-Changes-Token header. Passing that token back as
+?since=<token> returns only the rows created or updated after it, the ids of rows
+deleted (or no longer listed) since then, and a fresh token for the next poll:
+
+    {"token": "...", "changed": [...], "deleted": [ids]}
+
+Tokens are backed off by CHANGES_SYNC_OVERLAP_SECONDS. A row's updated_at is stamped
+before its transaction commits, and some writes keep working after the stamp (approving
+a leave excuses attendance and debits the balance first). Without the overlap, a poll
+reading while such a write is still open would issue a token later than the row's stamp,
+and the next poll would skip the row for good. Rows changed inside the overlap are
+therefore sent again; clients drop the duplicates by id.
+
+Deletions are read from core.Tombstone, written by receivers registered with
+track_deletions(). Tombstones are kept for CHANGES_TOMBSTONE_RETENTION_DAYS; older
+tokens are answered with 410 Gone and the client must fetch the full list again.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .models import Tombstone
+
+CHANGES_TOKEN_HEADER = 'X-Changes-Token'
+
+
+class ChangesTokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = {
+        "error": "Changes token expired",
+        "details": "The token is older than the change history kept by the server. Fetch the full list again.",
+    }
+    default_code = 'changes_token_expired'
+
+
+def make_sync_token(moment):
+    """Encode a server timestamp as an opaque sync token (microseconds since the epoch)."""
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def sync_overlap():
+    return timedelta(seconds=getattr(settings, 'CHANGES_SYNC_OVERLAP_SECONDS', 30))
+
+
+def next_sync_token(now):
+    """The token to hand out at `now`: backed off so writes still in flight are read again."""
+    return make_sync_token(now - sync_overlap())
+
+
+def parse_sync_token(token):
+    """Decode a sync token. Raises ValueError for malformed tokens."""
+    micros = int(token)
+    if micros < 0:
+        raise ValueError("Sync token cannot be negative.")
+    return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'CHANGES_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def record_deletion(instance, owner_ids):
+    """Write one tombstone per owner of a deleted row (a single ownerless one if it has none)."""
+    owners = {owner_id for owner_id in owner_ids if owner_id is not None} or {None}
+    label = instance._meta.label_lower
+    Tombstone.objects.bulk_create([
+        Tombstone(model_label=label, object_id=instance.pk, owner_id=owner_id) for owner_id in owners
+    ])
+
+
+def track_deletions(model, owners):
+    """
+    Tombstone every deleted row of `model`.
+    `owners(instance)` returns the ids of the users whose feeds listed the row.
+    """
+    def tombstone(sender, instance, **kwargs):
+        record_deletion(instance, owners(instance))
+
+    post_delete.connect(
+        tombstone, sender=model, weak=False, dispatch_uid=f'tombstone:{model._meta.label_lower}'
+    )
+
+
+class ChangeFeed:
+    """
+    Answers one list request either in full or as a delta:
+
+        feed = ChangeFeed(request)
+        if feed.since is not None:
+            return feed.delta(queryset, SomeSerializer, owners=[request.user.id])
+        return feed.full(Response(SomeSerializer(queryset, many=True).data))
+    """
+
+    def __init__(self, request):
+        self.request = request
+        now = timezone.now()
+        # Taken before any query runs, and backed off by the overlap, so rows written while
+        # this response is built, or by transactions committing after it, are picked up
+        # again by the next poll rather than lost
+        self.token = next_sync_token(now)
+        self.since = None
+
+        raw = request.query_params.get('since')
+        if raw:
+            try:
+                self.since = parse_sync_token(raw)
+            except (TypeError, ValueError, OverflowError, OSError):
+                raise ValidationError({
+                    "error": "Invalid changes token",
+                    "details": "The 'since' parameter must be a token returned by a previous response.",
+                })
+            if self.since < now - tombstone_retention():
+                raise ChangesTokenExpired()
+
+    def delta(self, queryset, serializer_class, owners=None, departed=None, context=None):
+        """
+        Build the delta response.
+        queryset: the rows the caller can currently see (the same filter as the full list).
+        owners: ids of the users whose deletions to report; None means every deletion of the model.
+        departed: rows the caller could see before but which an update dropped from the list.
+        """
+        changed = queryset.filter(updated_at__gte=self.since)
+
+        tombstones = Tombstone.objects.filter(
+            model_label=queryset.model._meta.label_lower, deleted_at__gte=self.since
+        )
+        if owners is not None:
+            tombstones = tombstones.filter(owner_id__in=[owner for owner in owners if owner is not None])
+        deleted = set(tombstones.values_list('object_id', flat=True))
+        if departed is not None:
+            deleted.update(departed.filter(updated_at__gte=self.since).values_list('id', flat=True))
+
+        serializer = serializer_class(changed, many=True, context=context or {'request': self.request})
+        return Response(
+            {'token': self.token, 'changed': serializer.data, 'deleted': sorted(deleted)},
+            headers={CHANGES_TOKEN_HEADER: self.token},
+        )
+
+    def full(self, response):
+        """Stamp a full list response with the token to poll from next."""
+        response[CHANGES_TOKEN_HEADER] = self.token
+        return response
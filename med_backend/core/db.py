@@ -0,0 +1,137 @@
+# core/db.py
+
+"""
+Database configuration.
+
+database_settings() builds DATABASES['default'] from the environment:
+
+    DB_ENGINE        sqlite (default), postgresql or mysql
+    DB_NAME          database name, or the SQLite file path
+    DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+    DB_CONN_MAX_AGE  seconds a connection is kept open between requests (default 60; 0
+                     when served over ASGI, see med_backend/asgi.py)
+    DB_POOL          postgresql only: 1 to use a psycopg connection pool instead of
+                     persistent connections (DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+
+A read replica for report endpoints (see core.routing) is configured with DB_REPLICA_NAME
+and/or DB_REPLICA_HOST; every other setting is copied from the primary. It requires a
+cache shared by the workers (CACHE_BACKEND=sqlite), see core.routing. Locally, point
+DB_REPLICA_NAME at a second SQLite file and keep it current with `manage.py sync_replica`.
+
+Persistent connections are health-checked before reuse, so a connection dropped by the
+server is replaced instead of failing the request.
+
+SQLite connections are tuned on creation (see configure_sqlite_connection):
+- WAL journal, so readers never block the writer and the writer never blocks readers
+- synchronous=NORMAL, which is durable across application crashes in WAL mode
+- busy_timeout, so a writer waits for the lock instead of failing with "database is locked"
+- memory-mapped reads and a larger page cache
+Transactions also start with BEGIN IMMEDIATE: a deferred transaction that reads and then
+writes can fail at once, busy timeout or not, when another writer got the lock first.
+The db.sqlite3 committed with the project (sample data) keeps its rollback journal: WAL
+is recorded in the file itself, and would leave it modified, with -wal/-shm files beside
+it, after every run. Point DB_NAME at a file of your own to get WAL.
+"""
+
+import os
+from pathlib import Path
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # negative: KiB, so about 20 MB per connection
+    'temp_store': 'MEMORY',
+}
+
+# The SQLite file committed with the project, relative to BASE_DIR
+BUNDLED_DATABASE = 'db.sqlite3'
+
+SERVER_ENGINES = {
+    'postgresql': 'django.db.backends.postgresql',
+    'mysql': 'django.db.backends.mysql',
+}
+
+
+def database_settings(base_dir, environ=os.environ):
+    """Return the settings dict for the default database."""
+    engine = environ.get('DB_ENGINE', 'sqlite')
+    conn_max_age = int(environ.get('DB_CONN_MAX_AGE', 60))
+
+    if engine == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('DB_NAME') or base_dir / BUNDLED_DATABASE,
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+
+    if engine not in SERVER_ENGINES:
+        raise ValueError(f"Unsupported DB_ENGINE {engine!r}; use sqlite, postgresql or mysql.")
+    database = {
+        'ENGINE': SERVER_ENGINES[engine],
+        'NAME': environ.get('DB_NAME', 'med_backend'),
+        'USER': environ.get('DB_USER', ''),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', 'localhost'),
+        'PORT': environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if engine == 'postgresql' and environ.get('DB_POOL') == '1':
+        # The pool replaces persistent connections (Django refuses both); connections are
+        # checked by the pool before being handed out
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(environ.get('DB_POOL_MAX_SIZE', 10)),
+            'check': _pool_connection_check(),
+        }
+    return database
+
+
+def replica_settings(primary, environ=os.environ):
+    """Settings for the `replica` alias, or None when no replica is configured."""
+    name, host = environ.get('DB_REPLICA_NAME'), environ.get('DB_REPLICA_HOST')
+    if not name and not host:
+        return None
+    replica = {**primary, 'OPTIONS': dict(primary.get('OPTIONS', {}))}
+    if name:
+        replica['NAME'] = name
+    if host:
+        replica['HOST'] = host
+        replica['PORT'] = environ.get('DB_REPLICA_PORT', primary.get('PORT', ''))
+    # Tests run against one database; the replica alias reads it too
+    replica['TEST'] = {'MIRROR': 'default'}
+    return replica
+
+
+def _pool_connection_check():
+    from psycopg_pool import ConnectionPool
+    return ConnectionPool.check_connection
+
+
+def apply_sqlite_pragmas(cursor, pragmas=None):
+    for name, value in (SQLITE_PRAGMAS if pragmas is None else pragmas).items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def sqlite_pragmas(name, base_dir):
+    """SQLITE_PRAGMAS for the database file `name`, without WAL for the bundled database."""
+    if str(name) != ':memory:' and Path(name).resolve() == (Path(base_dir) / BUNDLED_DATABASE).resolve():
+        return {key: value for key, value in SQLITE_PRAGMAS.items() if key != 'journal_mode'}
+    return SQLITE_PRAGMAS
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver applying SQLITE_PRAGMAS to new SQLite connections."""
+    if connection.vendor == 'sqlite':
+        from django.conf import settings
+        with connection.cursor() as cursor:
+            apply_sqlite_pragmas(cursor, sqlite_pragmas(connection.settings_dict['NAME'], settings.BASE_DIR))
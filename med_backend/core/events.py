@@ -0,0 +1,178 @@
+# core/events.py
+
+"""
+Per-user server-sent events.
+
+Write paths call publish_on_commit(); once the transaction commits, the event is handed
+to the broker, which fans it out to every open stream of the target users. Streams are
+served by core.views.event_stream as text/event-stream and should run under the ASGI
+application so an idle connection does not hold a worker thread.
+
+Browsers' EventSource cannot send an Authorization header, and an access token in the
+URL would end up in access logs and browser history. A client therefore POSTs to
+/api/events/ticket/ with its token and opens the stream with ?ticket=: a random
+single-use ticket, valid for EVENTS_TICKET_SECONDS, kept in the default cache (which must
+be shared by the workers when there are several).
+
+The broker is pluggable through the EVENTS_BROKER setting (a dotted path to a class with
+publish() and subscribe()). The default InMemoryBroker only reaches streams held by the
+same process. A deployment with several worker processes needs a shared backend.
+"""
+
+import asyncio
+import itertools
+import json
+import secrets
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'core.events.InMemoryBroker'
+
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        """Render the event in the text/event-stream wire format."""
+        payload = json.dumps(self.data, separators=(',', ':'), default=str)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """One open stream. Events are delivered onto an asyncio queue owned by the stream's event loop."""
+
+    def __init__(self, broker, user_id, loop, maxsize):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        # Called from whichever thread committed the write
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind reconnects and catches up through the changes feeds
+            pass
+
+    async def get(self, timeout):
+        """Wait for the next event. Returns None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    Process-local broker. Keeps the last few events per user so a client reconnecting with
+    Last-Event-ID does not miss what was published while it was away.
+    """
+
+    def __init__(self):
+        self.replay_size = getattr(settings, 'EVENTS_REPLAY_BUFFER', 50)
+        self.queue_size = getattr(settings, 'EVENTS_QUEUE_SIZE', 100)
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._recent = defaultdict(lambda: deque(maxlen=self.replay_size))
+        # Seeded from the clock so ids keep increasing across restarts, which keeps Last-Event-ID meaningful
+        self._ids = itertools.count(int(timezone.now().timestamp() * 1000))
+
+    def publish(self, user_ids, event_type, data):
+        with self._lock:
+            event = Event(next(self._ids), event_type, data)
+            targets = []
+            for user_id in set(user_ids):
+                self._recent[user_id].append(event)
+                targets.extend(self._subscribers.get(user_id, ()))
+        for subscription in targets:
+            subscription.deliver(event)
+        return event
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Open a subscription for a user. Must be called from the stream's event loop."""
+        subscription = Subscription(self, user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+            if last_event_id is not None:
+                for event in self._recent.get(user_id, ()):
+                    if event.id > last_event_id:
+                        subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'EVENTS_BROKER', DEFAULT_BROKER))()
+    return _broker
+
+
+def reset_broker():
+    """Drop the broker instance so the next get_broker() builds a fresh one (used by tests)."""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def _ticket_key(ticket):
+    return f'events:ticket:{ticket}'
+
+
+def ticket_seconds():
+    return getattr(settings, 'EVENTS_TICKET_SECONDS', 30)
+
+
+def issue_stream_ticket(user_id):
+    """A single-use ticket opening one event stream for `user_id`."""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_key(ticket), user_id, ticket_seconds())
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """The user id a ticket was issued to, or None. A ticket is accepted once."""
+    key = _ticket_key(ticket)
+    user_id = cache.get(key)
+    # Of two requests redeeming the same ticket, only the one that deletes it wins
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def publish_on_commit(user_ids, event_type, data):
+    """Publish an event to the given users once the current transaction commits."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        transaction.on_commit(lambda: get_broker().publish(user_ids, event_type, data))
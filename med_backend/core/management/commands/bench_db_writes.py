@@ -0,0 +1,74 @@
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from core.db import SQLITE_PRAGMAS, apply_sqlite_pragmas
+
+# Django's SQLite defaults before core.db: rollback journal, deferred transactions and
+# the sqlite3 module's 5 second busy timeout
+MODES = {
+    'default': {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5.0},
+    'tuned': {'pragmas': SQLITE_PRAGMAS, 'begin': 'BEGIN IMMEDIATE', 'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000},
+}
+
+
+def run_writer(path, mode, worker, writes):
+    """Perform `writes` read-then-write transactions. Returns (committed, failed)."""
+    settings = MODES[mode]
+    connection = sqlite3.connect(path, timeout=settings['timeout'], isolation_level=None)
+    apply_sqlite_pragmas(connection, settings['pragmas'])
+    committed = failed = 0
+    for index in range(writes):
+        try:
+            connection.execute(settings['begin'])
+            # Like marking attendance: look at the existing rows, then write
+            connection.execute('SELECT COUNT(*) FROM mark WHERE worker = ?', (worker,)).fetchone()
+            connection.execute('INSERT INTO mark (worker, seq, payload) VALUES (?, ?, ?)', (worker, index, 'x' * 200))
+            connection.execute('COMMIT')
+            committed += 1
+        except sqlite3.OperationalError:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            failed += 1
+    connection.close()
+    return committed, failed
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent write throughput on a scratch SQLite file with the old default '
+        'settings and with the tuned pragmas from core.db. The project database is not touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent writer processes')
+        parser.add_argument('--writes', type=int, default=200, help='Transactions per writer')
+
+    def handle(self, *args, **options):
+        workers, writes = options['workers'], options['writes']
+        self.stdout.write(f"{workers} writers x {writes} transactions (read then insert)")
+        self.stdout.write(f"{'Mode':<10} {'Committed':>10} {'Locked':>8} {'Seconds':>9} {'Commits/s':>10}")
+        for mode in MODES:
+            with tempfile.TemporaryDirectory() as directory:
+                path = str(Path(directory) / 'bench.sqlite3')
+                setup = sqlite3.connect(path)
+                setup.execute('CREATE TABLE mark (id INTEGER PRIMARY KEY, worker INTEGER, seq INTEGER, payload TEXT)')
+                setup.execute('CREATE INDEX mark_worker ON mark (worker)')
+                setup.commit()
+                setup.close()
+
+                started = time.perf_counter()
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(run_writer, [path] * workers, [mode] * workers, range(workers), [writes] * workers))
+                elapsed = time.perf_counter() - started
+
+            committed = sum(result[0] for result in results)
+            failed = sum(result[1] for result in results)
+            self.stdout.write(
+                f"{mode:<10} {committed:>10} {failed:>8} {elapsed:>9.2f} {committed / elapsed:>10.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Locked = transactions that failed with 'database is locked'."))
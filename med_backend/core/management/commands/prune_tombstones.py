@@ -0,0 +1,16 @@
+# core/management/commands/prune_tombstones.py
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.changes import tombstone_retention
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete tombstones older than CHANGES_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - tombstone_retention()
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstone(s) older than {cutoff:%Y-%m-%d %H:%M}."))
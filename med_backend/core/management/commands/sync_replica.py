@@ -0,0 +1,50 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.routing import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into the replica file with the SQLite backup API. '
+        'A local stand-in for replication when DB_REPLICA_NAME points at a second SQLite file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep syncing every INTERVAL seconds (default: sync once and exit)',
+        )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        replica = settings.DATABASES.get(REPLICA_ALIAS)
+        if replica is None:
+            raise CommandError("No replica configured. Set DB_REPLICA_NAME to a SQLite file path.")
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError("sync_replica only copies SQLite files; server databases replicate themselves.")
+        if str(primary['NAME']) == str(replica['NAME']):
+            raise CommandError("The replica and the primary are the same file.")
+
+        while True:
+            started = time.perf_counter()
+            self.sync(str(primary['NAME']), str(replica['NAME']))
+            self.stdout.write(self.style.SUCCESS(
+                f"Replica synced in {(time.perf_counter() - started) * 1000:.0f} ms."
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, source_path, target_path):
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            # Copies a consistent snapshot; writers on the primary only wait between page batches
+            source.backup(target, pages=1024)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('owner_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model_label', 'owner_id', 'deleted_at'], name='tombstone_feed_idx')],
+            },
+        ),
+    ]
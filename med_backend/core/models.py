@@ -0,0 +1,24 @@
+# core/models.py
+
+from django.db import models
+from django.utils import timezone
+
+
+class Tombstone(models.Model):
+    """
+    Marks a deleted row so incremental "changes since" feeds can report the deletion.
+    One tombstone is written per owner (the user whose feed listed the row), so a feed
+    can fetch its deletions with a single indexed lookup.
+    """
+    model_label = models.CharField(max_length=100)  # e.g. 'grades.grade'
+    object_id = models.BigIntegerField()
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model_label', 'owner_id', 'deleted_at'], name='tombstone_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id} deleted at {self.deleted_at}"
@@ -0,0 +1,88 @@
+# core/ratelimit.py
+
+"""
+Sliding-window rate limiting on top of the Django cache.
+
+Each key costs two integers: the hit count of the current fixed window and of the one
+before it. The number of hits in the sliding window ending now is estimated by weighting
+the previous window by how much of it still overlaps:
+
+    estimate = previous * (1 - elapsed / window) + current
+
+This is much smaller than a log of timestamps per key, and close enough for throttling.
+Counters live in the default cache, so limits are shared by every process that shares it.
+
+Per-client limits key on client_ip(). Behind a reverse proxy every request comes from the
+proxy's address, so the client is read from X-Forwarded-For instead, counting
+TRUSTED_PROXY_COUNT hops from the right: entries further left are whatever the client sent
+and cannot be trusted.
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def client_ip(request):
+    """The address of the client, seen through TRUSTED_PROXY_COUNT reverse proxies."""
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+    if proxies and forwarded:
+        # The last proxy appended the address it saw; each one before it did the same
+        return forwarded[-min(proxies, len(forwarded))]
+    return request.META.get('REMOTE_ADDR')
+
+
+class SlidingWindowLimiter:
+    """Allows at most `limit` hits per `window` seconds for each identifier."""
+
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def _slots(self, ident, now):
+        index = int(now // self.window)
+        return (
+            f'ratelimit:{self.scope}:{ident}:{index}',
+            f'ratelimit:{self.scope}:{ident}:{index - 1}',
+            now - index * self.window,
+        )
+
+    def _estimate(self, ident, now):
+        current_key, previous_key, elapsed = self._slots(ident, now)
+        counts = cache.get_many([current_key, previous_key])
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+        return previous * (1 - elapsed / self.window) + current, previous, elapsed
+
+    def retry_after(self, ident):
+        """Seconds until `ident` may hit again; 0 if it is under the limit."""
+        now = time.time()
+        estimate, previous, elapsed = self._estimate(ident, now)
+        if estimate < self.limit:
+            return 0
+        # The estimate drops as the previous window slides out; if that is not enough,
+        # wait for the current window to become the previous one
+        if previous:
+            excess = estimate - self.limit + 1
+            wait = excess / previous * self.window
+            if elapsed + wait <= self.window:
+                return max(1, math.ceil(wait))
+        return max(1, math.ceil(self.window - elapsed))
+
+    def hit(self, ident):
+        current_key, _, _ = self._slots(ident, time.time())
+        # Kept for two windows: one as the current window, one as the previous
+        if not cache.add(current_key, 1, self.window * 2):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                # Expired between add() and incr()
+                cache.set(current_key, 1, self.window * 2)
+
+    def reset(self, ident):
+        current_key, previous_key, _ = self._slots(ident, time.time())
+        cache.delete_many([current_key, previous_key])
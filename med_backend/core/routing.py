@@ -0,0 +1,157 @@
+# core/routing.py
+
+"""
+Read-replica routing for report endpoints.
+
+Reads go to `default` unless a view opts in with ReplicaReadMixin (class-based views) or
+@replica_reads (function views). While such a view handles a GET/HEAD/OPTIONS request,
+ReplicaRouter sends its reads to the `replica` alias; writes always go to `default`.
+
+Replicas lag. After a user writes anything, ReplicaPinMiddleware pins that user to the
+primary for REPLICA_STICKY_SECONDS, so report pages never miss the user's own changes.
+The pin lives in the default cache, which every worker must see: the next read may land on
+another process. check_pin_cache() (a system check) refuses a replica with a per-process
+cache.
+
+Without a `replica` entry in DATABASES everything reads from `default`. See core/db.py for
+configuring one, and the sync_replica command for a local stand-in for replication.
+"""
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_ALIAS = 'replica'
+
+# Cache backends whose entries no other process sees
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_reading_from_replica = ContextVar('reading_from_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def check_pin_cache(app_configs=None, **kwargs):
+    """System check: a replica needs a cache shared by the workers to hold the pins."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if replica_configured() and backend in PROCESS_LOCAL_CACHES:
+        return [checks.Error(
+            f'A read replica is configured but the default cache ({backend}) is per process.',
+            hint=(
+                'Users pinned to the primary after a write would read stale data from other '
+                'workers. Set CACHE_BACKEND=sqlite, or use a cache all workers share.'
+            ),
+            id='core.E001',
+        )]
+    return []
+
+
+def _pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def _sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+
+def pin_to_primary(user_id):
+    """Serve this user's reads from the primary for a while (after they wrote something)."""
+    cache.set(_pin_key(user_id), True, _sticky_seconds())
+
+
+def pinned_to_primary(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def may_use_replica(request):
+    user = getattr(request, 'user', None)
+    return (
+        replica_configured()
+        and request.method in SAFE_METHODS
+        and not (user is not None and user.is_authenticated and pinned_to_primary(user.pk))
+    )
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    token = _reading_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _reading_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _reading_from_replica.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema from the primary
+        return db != REPLICA_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin: safe requests read from the replica (decided after authentication,
+    so users who just wrote stay on the primary).
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if may_use_replica(request):
+            self._replica_token = _reading_from_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _reading_from_replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_reads(view):
+    """
+    ReplicaReadMixin for function views; apply it under @api_view so the user is
+    authenticated first.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with read_from_replica(may_use_replica(request)):
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Pins users to the primary after a successful write request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_configured():
+            # DRF copies the authenticated user onto the underlying request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
@@ -0,0 +1,413 @@
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from attendance.models import AttendanceRecord, Batch, ClassSession
+from core.cache import get_or_compute, make_key, metrics
+from core.cache_backends import SQLiteCache
+from core.changes import make_sync_token
+from core.db import database_settings, sqlite_pragmas
+from core.routing import ReplicaPinMiddleware, ReplicaReadMixin, ReplicaRouter, check_pin_cache, pinned_to_primary
+from core.events import get_broker, reset_broker
+from core.models import Tombstone
+from grades.models import Grade
+from library.models import Book, Borrow
+from payments.models import Payment
+from users.models import User
+
+
+class RecordingBroker:
+    """Stand-in broker that keeps published events in memory."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, user_ids, event_type, data):
+        self.published.append((sorted(user_ids), event_type, data))
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student)}')
+
+    def add_grade(self, subject):
+        return Grade.objects.create(student=self.student, teacher=self.teacher, subject=subject, marks=80, grade='A')
+
+    def test_full_list_carries_changes_token(self):
+        self.add_grade('Anatomy')
+        response = self.client.get(reverse('my-grades'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertIn('X-Changes-Token', response)
+
+    @override_settings(CHANGES_SYNC_OVERLAP_SECONDS=0)
+    def test_delta_returns_only_changed_and_deleted_rows(self):
+        unchanged = self.add_grade('Anatomy')
+        removed = self.add_grade('Physiology')
+        token = self.client.get(reverse('my-grades'))['X-Changes-Token']
+
+        added = self.add_grade('Biochemistry')
+        removed_id = removed.id
+        removed.delete()
+        response = self.client.get(reverse('my-grades'), {'since': token})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([grade['id'] for grade in response.data['changed']], [added.id])
+        self.assertEqual(response.data['deleted'], [removed_id])
+        self.assertNotIn(unchanged.id, response.data['deleted'])
+
+        # Deletions are only reported to the owners of the row
+        self.assertEqual(
+            set(Tombstone.objects.filter(object_id=removed_id).values_list('owner_id', flat=True)),
+            {self.student.id, self.teacher.id},
+        )
+
+        response = self.client.get(reverse('my-grades'), {'since': response.data['token']})
+        self.assertEqual(response.data['changed'], [])
+        self.assertEqual(response.data['deleted'], [])
+
+    def test_rows_committed_after_a_poll_reach_the_next_one(self):
+        token = self.client.get(reverse('my-grades'))['X-Changes-Token']
+        # Stamped before that poll read, by a transaction that only committed after it
+        late = self.add_grade('Anatomy')
+        Grade.objects.filter(pk=late.pk).update(updated_at=timezone.now() - timedelta(seconds=5))
+        response = self.client.get(reverse('my-grades'), {'since': token})
+        self.assertEqual([grade['id'] for grade in response.data['changed']], [late.id])
+        # Sent again while inside the overlap; the client drops it by id
+        response = self.client.get(reverse('my-grades'), {'since': response.data['token']})
+        self.assertEqual([grade['id'] for grade in response.data['changed']], [late.id])
+
+    def test_returned_book_is_reported_as_deleted(self):
+        book = Book.objects.create(title='Gray\'s Anatomy', author='Henry Gray', isbn='9780443066849')
+        borrow = Borrow.objects.create(user=self.student, book=book, due_date=timezone.now() + timedelta(days=7))
+        token = self.client.get(reverse('my-borrowed-books'))['X-Changes-Token']
+
+        borrow.returned = True
+        borrow.save()
+        response = self.client.get(reverse('my-borrowed-books'), {'since': token})
+        self.assertEqual(response.data['changed'], [])
+        self.assertEqual(response.data['deleted'], [borrow.id])
+
+    def test_rejects_invalid_and_expired_tokens(self):
+        response = self.client.get(reverse('my-grades'), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+        expired = make_sync_token(timezone.now() - timedelta(days=365))
+        response = self.client.get(reverse('my-grades'), {'since': expired})
+        self.assertEqual(response.status_code, 410)
+
+
+@override_settings(EVENTS_BROKER='core.tests.RecordingBroker')
+class EventPublishingTests(TestCase):
+    def setUp(self):
+        reset_broker()
+        self.addCleanup(reset_broker)
+        self.batch = Batch.objects.create(name='MBBS 1st Year A')
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student', batch=self.batch)
+        self.client = APIClient()
+
+    def test_confirming_attendance_notifies_students(self):
+        session = ClassSession.objects.create(batch=self.batch, teacher=self.teacher, date=date(2025, 6, 2))
+        record = AttendanceRecord.objects.create(student=self.student, class_session=session, status='present')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.teacher)}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('teacher-mark-attendance'), {'class_session_id': session.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_broker().published, [([self.student.id], 'attendance.confirmed', {
+            'record_id': record.id, 'class_session_id': session.id, 'date': session.date, 'status': 'present',
+        })])
+
+    def test_receiving_payment_notifies_student_and_parent(self):
+        admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        parent = User.objects.create_user(username='parent001', password='pass123', role='parent', child=self.student)
+        payment = Payment.objects.create(student=self.student, type='tuition', amount=500, due_date=date(2025, 8, 15))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('payment-mark-received', args=[payment.id]))
+
+        self.assertEqual(response.status_code, 200)
+        [(user_ids, event_type, data)] = get_broker().published
+        self.assertEqual(user_ids, sorted([self.student.id, parent.id]))
+        self.assertEqual(event_type, 'payment.status')
+        self.assertEqual(data['status'], 'received')
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        reset_broker()
+        self.addCleanup(reset_broker)
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+
+    async def test_rejects_missing_token(self):
+        response = await self.async_client.get(reverse('event-stream'))
+        self.assertEqual(response.status_code, 401)
+
+    def issue_ticket(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student)}')
+        response = client.post(reverse('event-stream-ticket'))
+        self.assertEqual(response.status_code, 200)
+        return response.data['ticket']
+
+    async def test_access_tokens_are_not_accepted_in_the_url(self):
+        token = await sync_to_async(AccessToken.for_user)(self.student)
+        response = await self.async_client.get(reverse('event-stream'), {'token': str(token)})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_tickets_are_single_use(self):
+        ticket = await sync_to_async(self.issue_ticket)()
+        response = await self.async_client.get(reverse('event-stream'), {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        await response.streaming_content.aclose()
+        response = await self.async_client.get(reverse('event-stream'), {'ticket': ticket})
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse('event-stream'), {'ticket': 'made-up'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_streams_events_for_the_user(self):
+        ticket = await sync_to_async(self.issue_ticket)()
+        response = await self.async_client.get(reverse('event-stream'), {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        get_broker().publish([self.student.id + 1], 'leave.status', {'status': 'approved'})
+        get_broker().publish([self.student.id], 'leave.status', {'status': 'approved'})
+        chunk = await asyncio.wait_for(anext(chunks), 5)
+        self.assertIn(b'event: leave.status', chunk)
+        self.assertIn(b'"status":"approved"', chunk)
+        await chunks.aclose()
+
+
+class ReadThroughCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.addCleanup(cache.clear)
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        self.client = self.client_for(self.student)
+        self.book = Book.objects.create(title='Anatomy', author='Gray', total_copies=2)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_cached_view_hits_until_the_model_changes(self):
+        url = reverse('available-books')
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(1):  # Authentication only
+            second = self.client.get(url)
+        self.assertEqual((second['X-Cache'], second.data), ('HIT', first.data))
+
+        self.book.currently_borrowed_count = 2
+        self.book.save()
+        third = self.client.get(url)
+        self.assertEqual((third['X-Cache'], third.data), ('MISS', []))
+        self.assertEqual(metrics.snapshot()['available-books']['hit'], 1)
+
+    def test_per_user_entries_are_not_shared(self):
+        self.assertEqual(self.client.get('/api/users/me/').data['username'], 'student001')
+        self.assertEqual(self.client_for(self.admin).get('/api/users/me/').data['username'], 'admin001')
+        self.assertEqual(self.client.get('/api/users/me/')['X-Cache'], 'HIT')
+
+    def test_owned_models_are_keyed_by_their_owners(self):
+        other = User.objects.create_user(username='student002', password='pass123', role='student')
+        parent = User.objects.create_user(username='parent001', password='pass123', role='parent', child=self.student)
+        for client in (self.client, self.client_for(parent)):
+            self.assertEqual(client.get('/api/users/me/')['X-Cache'], 'MISS')
+
+        # Another student's fee leaves both entries alone
+        Payment.objects.create(student=other, type='academic', amount=300, due_date=date(2025, 8, 15))
+        self.assertEqual(self.client.get('/api/users/me/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client_for(parent).get('/api/users/me/')['X-Cache'], 'HIT')
+
+        Payment.objects.create(student=self.student, type='academic', amount=500, due_date=date(2025, 8, 15))
+        self.assertEqual(self.client.get('/api/users/me/').data['academic_fee'], 500)
+        response = self.client_for(parent).get('/api/users/me/')
+        self.assertEqual((response['X-Cache'], response.data['child_info']['academic_fee']), ('MISS', 500))
+
+    def test_single_flight_computes_once(self):
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'value'
+
+        key = make_key('single-flight', ['key'])
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('single-flight', key, compute)))
+        ]
+        threads[0].start()
+        started.wait()
+        threads += [
+            threading.Thread(target=lambda: results.append(get_or_compute('single-flight', key, compute)))
+            for _ in range(3)
+        ]
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(outcome for _, outcome in results), ['miss', 'wait', 'wait', 'wait'])
+
+    def test_cache_stats_is_management_only(self):
+        self.assertEqual(self.client.get(reverse('cache-stats')).status_code, 403)
+        response = self.client_for(self.admin).get(reverse('cache-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('namespaces', response.data)
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {})
+
+    def test_entries_are_shared_through_the_file(self):
+        # A second backend instance stands in for another worker process
+        other = SQLiteCache(self.path, {})
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(other.get('key'), {'a': 1})
+        self.assertEqual(other.get_many(['key', 'missing']), {'key': {'a': 1}})
+        self.assertTrue(other.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+        self.assertEqual(self.cache.get('key'), 'fresh')
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_the_bundled_database_keeps_its_journal(self):
+        self.assertNotIn('journal_mode', sqlite_pragmas(Path('/srv/db.sqlite3'), Path('/srv')))
+        self.assertEqual(sqlite_pragmas('/srv/college.sqlite3', Path('/srv'))['journal_mode'], 'WAL')
+
+    def test_server_database_from_environment(self):
+        database = database_settings(Path('/srv'), {
+            'DB_ENGINE': 'postgresql', 'DB_NAME': 'college', 'DB_HOST': 'db', 'DB_CONN_MAX_AGE': '120',
+        })
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((database['NAME'], database['HOST'], database['CONN_MAX_AGE']), ('college', 'db', 120))
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        with self.assertRaises(ValueError):
+            database_settings(Path('/srv'), {'DB_ENGINE': 'oracle'})
+
+
+class ReportView(ReplicaReadMixin, APIView):
+    """Reports which database a read would use while the view runs."""
+
+    def get(self, request):
+        return Response({'db': ReplicaRouter().db_for_read(Book)})
+
+    def post(self, request):
+        return Response({'db': ReplicaRouter().db_for_read(Book)})
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        databases = {**settings.DATABASES, 'replica': settings.DATABASES['default']}
+        patcher = mock.patch.object(settings, 'DATABASES', databases)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, method):
+        request = getattr(APIRequestFactory(), method)('/report/')
+        force_authenticate(request, user=self.admin)
+        return ReportView.as_view()(request).data['db']
+
+    def test_safe_requests_of_opted_in_views_read_from_the_replica(self):
+        self.assertEqual(self.call('get'), 'replica')
+        self.assertIsNone(self.call('post'))
+        # Outside the view, reads go back to the primary
+        self.assertIsNone(ReplicaRouter().db_for_read(Book))
+        self.assertEqual(ReplicaRouter().db_for_write(Book), 'default')
+
+    def test_users_read_their_own_writes(self):
+        request = APIRequestFactory().post('/api/library/books/')
+        request.user = self.admin
+        ReplicaPinMiddleware(lambda request: Response(status=201))(request)
+        self.assertTrue(pinned_to_primary(self.admin.pk))
+        self.assertIsNone(self.call('get'))
+
+    def test_a_replica_needs_a_shared_cache_for_the_pins(self):
+        # settings.DATABASES has a replica (setUp) and the tests run on the local-memory cache
+        self.assertEqual([error.id for error in check_pin_cache()], ['core.E001'])
+        shared = {'default': {'BACKEND': 'core.cache_backends.SQLiteCache', 'LOCATION': '/tmp/cache.sqlite3'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_pin_cache(), [])
+        with mock.patch.object(settings, 'DATABASES', {'default': settings.DATABASES['default']}):
+            self.assertEqual(check_pin_cache(), [])
+
+    def test_no_replica_configured(self):
+        with mock.patch.object(settings, 'DATABASES', {'default': settings.DATABASES['default']}):
+            self.assertIsNone(self.call('get'))
+
+    def test_sync_replica_copies_the_primary(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        primary, replica = Path(directory.name) / 'primary.sqlite3', Path(directory.name) / 'replica.sqlite3'
+        with sqlite3.connect(primary) as connection:
+            connection.execute('CREATE TABLE mark (id INTEGER PRIMARY KEY)')
+            connection.execute('INSERT INTO mark VALUES (1)')
+        databases = {
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': primary},
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': replica},
+        }
+        with mock.patch.object(settings, 'DATABASES', databases):
+            call_command('sync_replica', stdout=StringIO())
+        with sqlite3.connect(replica) as connection:
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM mark').fetchone()[0], 1)
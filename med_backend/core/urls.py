@@ -0,0 +1,10 @@
+# core/urls.py
+
+from django.urls import path
+from .views import cache_stats, event_stream, stream_ticket
+
+urlpatterns = [
+    path('events/stream/', event_stream, name='event-stream'),
+    path('events/ticket/', stream_ticket, name='event-stream-ticket'),
+    path('cache/stats/', cache_stats, name='cache-stats'),
+]
@@ -0,0 +1,97 @@
+# core/views.py
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed, TokenError
+
+from users.authentication import ClaimsJWTAuthentication
+from users.capabilities import is_management
+from users.models import User
+from .cache import metrics
+from .events import get_broker, issue_stream_ticket, redeem_stream_ticket, ticket_seconds
+
+
+def _authenticate_stream(request):
+    """
+    Resolve the user for an event stream from the Authorization header, or from a
+    ?ticket= issued by stream_ticket (EventSource cannot send headers; access tokens are
+    never accepted in the URL). Returns None if invalid.
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = redeem_stream_ticket(ticket)
+        return User.objects.filter(pk=user_id, is_active=True).first() if user_id is not None else None
+
+    authentication = ClaimsJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return None
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def stream_ticket(request):
+    """A single-use ticket for opening the event stream with EventSource (?ticket=)."""
+    return Response({"ticket": issue_stream_ticket(request.user.pk), "expires_in": ticket_seconds()})
+
+
+async def event_stream(request):
+    """
+    Server-sent events for the authenticated user: attendance confirmations, leave
+    decisions and payment status changes, pushed as they are committed.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({
+            "error": "Authentication required",
+            "details": "Provide a valid access token in the Authorization header, or a ticket from /api/events/ticket/ in the 'ticket' query parameter."
+        }, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    heartbeat = getattr(settings, 'EVENTS_HEARTBEAT_SECONDS', 25)
+    broker = get_broker()
+    user_id = user.id
+
+    async def stream():
+        # Subscribe inside the generator so the queue belongs to the loop that drains it
+        subscription = broker.subscribe(user_id, last_event_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = await subscription.get(heartbeat)
+                # Comment lines keep proxies from closing an idle connection
+                yield ": keepalive\n\n" if event is None else event.encode()
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cache_stats(request):
+    """Cache hits, misses and single-flight waits per namespace, for the process serving the request."""
+    if not is_management(request.user):
+        return Response({"error": "Only management users can view cache statistics."}, status=status.HTTP_403_FORBIDDEN)
+    return Response({"backend": settings.CACHES['default']['BACKEND'], "namespaces": metrics.snapshot()})
@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class GradesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'grades'
\ No newline at end of file
+    name = 'grades'
+
+    def ready(self):
+        from core.changes import track_deletions
+        # A grade is listed both in the student's feed and in the feed of the teacher who gave it
+        track_deletions(self.get_model('Grade'), lambda grade: [grade.student_id, grade.teacher_id])
@@ -9,6 +9,7 @@ class Grade(models.Model):
     grade = models.CharField(max_length=2)
     remarks = models.TextField(blank=True, null=True)
     date_recorded = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.student.username} - {self.subject} - {self.grade} ({self.marks})"
@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission
+from users.capabilities import Capability, has_any, is_faculty
 
 class IsAdminPrincipalOrTeacher(BasePermission):
     """
@@ -7,15 +8,8 @@ class IsAdminPrincipalOrTeacher(BasePermission):
     """
 
     def has_permission(self, request, view):
-        user = request.user
-        if not user or not user.is_authenticated:
-            return False
-
         # Check if user is staff/admin, principal, teacher, or hidden superuser
-        if user.is_staff or getattr(user, 'role', None) in ['admin', 'principal', 'teacher'] or getattr(user, 'is_hidden_superuser', False):
-            return True
-        
-        return False
+        return is_faculty(request.user)
 
 class IsStudentOrParent(BasePermission):
     """
@@ -24,12 +18,5 @@ class IsStudentOrParent(BasePermission):
     """
 
     def has_permission(self, request, view):
-        user = request.user
-        if not user or not user.is_authenticated:
-            return False
-
         # Check if user is student or parent
-        if getattr(user, 'role', None) in ['student', 'parent']:
-            return True
-        
-        return False
+        return has_any(request.user, Capability.STUDENT | Capability.PARENT)
@@ -8,8 +8,11 @@ from .models import Grade
 from .serializers import GradeSerializer, GradeCreateSerializer
 from .permissions import IsAdminPrincipalOrTeacher, IsStudentOrParent # Updated permission import
 from users.models import User # For querying User model
+from users.capabilities import is_management
 from attendance.models import ClassSession # For teacher permissions with students
 from rest_framework import serializers # Import serializers
+from core.changes import ChangeFeed
+from core.routing import ReplicaReadMixin
 
 
 class AddGradeView(generics.CreateAPIView): # Changed from APIView to generics.CreateAPIView
@@ -63,7 +66,7 @@ class AddGradeView(generics.CreateAPIView): # Changed from APIView to generics.C
         user = self.request.user
         teacher_in_payload = serializer.validated_data.get('teacher')
 
-        if user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal']:
+        if is_management(user):
             # Admin/Principal/Hidden Superuser can add grades for any teacher
             serializer.save()
         elif user.role == 'teacher':
@@ -93,6 +96,16 @@ class MyGradesView(generics.ListAPIView): # Changed from APIView to generics.Lis
         # For other roles, deny access
         raise PermissionDenied("Access denied. This view is for students/teachers only.")
 
+    def list(self, request, *args, **kwargs):
+        # ?since=<token> returns only grades changed or deleted after the token
+        feed = ChangeFeed(request)
+        if feed.since is None:
+            return feed.full(super().list(request, *args, **kwargs))
+        return feed.delta(
+            self.get_queryset(), self.get_serializer_class(),
+            owners=[request.user.id], context=self.get_serializer_context(),
+        )
+
 
 class UpdateGradeView(generics.RetrieveUpdateAPIView): # Changed from APIView to generics.RetrieveUpdateAPIView
     queryset = Grade.objects.all() # Queryset for object lookup
@@ -106,10 +119,10 @@ class UpdateGradeView(generics.RetrieveUpdateAPIView): # Changed from APIView to
         grade = get_object_or_404(Grade.objects.select_related('student', 'teacher'), pk=pk) 
 
         # Admin/Principal/Hidden Superuser can update any grade
-        if user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal']:
+        if is_management(user):
             return grade
         # Teacher can only update their own given grades
-        elif user.role == 'teacher' and grade.teacher == user:
+        elif user.role == 'teacher' and grade.teacher_id == user.id:
             return grade
         
         raise PermissionDenied("You do not have permission to update this grade.")
@@ -125,9 +138,9 @@ class DeleteGradeView(generics.DestroyAPIView): # Changed from APIView to generi
         # Optimize object retrieval with select_related
         grade = get_object_or_404(Grade.objects.select_related('student', 'teacher'), pk=pk)
 
-        if user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal']:
+        if is_management(user):
             return grade
-        elif user.role == 'teacher' and grade.teacher == user:
+        elif user.role == 'teacher' and grade.teacher_id == user.id:
             return grade
         
         raise PermissionDenied("You do not have permission to delete this grade.")
@@ -143,19 +156,19 @@ class GradesGivenByTeacherView(generics.ListAPIView): # Changed from APIView to
 
         if user.role == 'teacher':
             return base_queryset.filter(teacher=user)
-        elif user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        elif is_management(user):
             # Admin/Principal/Hidden Superuser can see all grades (similar to AdminGradeListView but via a different path)
             return base_queryset
         raise PermissionDenied("Access denied. This view is for teachers, admins, principals, and hidden superusers.")
     
     
-class AdminGradeListView(generics.ListAPIView): # Changed from APIView to generics.ListAPIView
+class AdminGradeListView(ReplicaReadMixin, generics.ListAPIView): # Changed from APIView to generics.ListAPIView
     serializer_class = GradeSerializer
     permission_classes = [IsAuthenticated, IsAdminPrincipalOrTeacher] # Only Admin/Principal/Hidden Superuser can view all
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_management(user):
             return Grade.objects.all().select_related('student', 'teacher').order_by('-date_recorded')
         raise PermissionDenied("Access denied. Only admins, principals, and hidden superusers can view all grades.")
 
@@ -170,7 +183,7 @@ class TeacherGradeListView(generics.ListAPIView): # Changed from APIView to gene
 
         if user.role == 'teacher':
             return base_queryset.filter(teacher=user)
-        elif user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        elif is_management(user):
             # If an admin/principal accesses this, they can see all grades given by any teacher
             return base_queryset.filter(teacher__isnull=False) # Only show grades that have a teacher assigned
         raise PermissionDenied("Access denied. Only teachers, admins, principals, and hidden superusers can view grades given by teachers.")
@@ -188,7 +201,7 @@ class GradesByStudentIdView(generics.ListAPIView):
         
         base_queryset = Grade.objects.filter(student=student).select_related('student', 'teacher').order_by('-date_recorded')
 
-        if user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_management(user):
             return base_queryset
         elif user.role == 'teacher':
             # Teachers can see grades for students in their assigned batches (if any)
@@ -209,9 +222,9 @@ class ParentViewStudentGrades(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        if user.role == 'parent' and user.child:
+        if user.role == 'parent' and user.child_id:
             # Parents can only view grades for their linked child, with prefetching
-            return Grade.objects.filter(student=user.child).select_related('student', 'teacher').order_by('-date_recorded')
+            return Grade.objects.filter(student_id=user.child_id).select_related('student', 'teacher').order_by('-date_recorded')
         raise PermissionDenied("You are not authorized to view student grades.")
 
 
@@ -229,7 +242,7 @@ class GradesByBatchView(generics.ListAPIView):
             student__batch__id=batch_id
         ).select_related('student', 'teacher').order_by('-date_recorded', 'student__username')
 
-        if user.is_staff or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_management(user):
             return base_queryset
         elif user.role == 'teacher':
             # Teachers can view grades for any batch
@@ -247,5 +260,5 @@ class StudentGradesListView(generics.ListAPIView):
         if user.role == 'student':
             return Grade.objects.filter(student=user).select_related('student', 'teacher').order_by('-date_recorded')
         elif user.role == 'parent' and hasattr(user, 'child'):
-            return Grade.objects.filter(student=user.child).select_related('student', 'teacher').order_by('-date_recorded')
+            return Grade.objects.filter(student_id=user.child_id).select_related('student', 'teacher').order_by('-date_recorded')
         return Grade.objects.none()
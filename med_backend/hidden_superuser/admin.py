@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import LogArchiveSegment
+
+
+@admin.register(LogArchiveSegment)
+class LogArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'start', 'end', 'row_count', 'size_bytes', 'codec', 'path')
+    list_filter = ('kind', 'codec')
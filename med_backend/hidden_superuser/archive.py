@@ -0,0 +1,199 @@
+# hidden_superuser/archive.py
+
+"""
+Tiered retention for AdminActivityLog and SystemAuditLog.
+
+Rows stay in the database (the hot tier) for LOG_HOT_RETENTION_DAYS. archive_logs() then
+moves older rows, oldest first, into compressed JSONL segment files under LOG_ARCHIVE_DIR,
+LOG_ARCHIVE_SEGMENT_ROWS rows per file, and deletes them from the table. Every segment is
+indexed by a LogArchiveSegment row holding its time range, so a search only opens the
+segments overlapping the requested range.
+
+Each line of a segment is the row as the API serializes it (user name and role included),
+so archived rows read back exactly like live ones even if the user was deleted since.
+
+Segments are written with zstd when the optional `zstandard` package is installed, and
+with gzip otherwise. Each segment records its codec, so older segments stay readable.
+"""
+
+import gzip
+import heapq
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AdminActivityLog, LogArchiveSegment, SystemAuditLog
+from .serializers import AdminActivityLogSerializer, SystemAuditLogSerializer
+
+try:
+    import zstandard
+except ImportError:  # Optional: gzip is used instead
+    zstandard = None
+
+
+@dataclass(frozen=True)
+class LogKind:
+    model: type
+    serializer: type
+    related: tuple
+
+
+KINDS = {
+    'activity': LogKind(AdminActivityLog, AdminActivityLogSerializer, ('user',)),
+    'audit': LogKind(SystemAuditLog, SystemAuditLogSerializer, ('affected_user',)),
+}
+
+EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+
+
+def archive_dir():
+    return Path(getattr(settings, 'LOG_ARCHIVE_DIR', settings.BASE_DIR / 'log_archive'))
+
+
+def hot_cutoff(now=None):
+    """Rows older than this belong in the archive."""
+    days = getattr(settings, 'LOG_HOT_RETENTION_DAYS', 30)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def default_codec():
+    codec = getattr(settings, 'LOG_ARCHIVE_CODEC', 'zstd')
+    return codec if codec == 'gzip' or zstandard is not None else 'gzip'
+
+
+def _compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _open_lines(path, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install the zstandard package to read it.")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return gzip.open(path, 'rt', encoding='utf-8')
+
+
+def archive_logs(kind, before=None, segment_rows=None, codec=None):
+    """
+    Move rows of `kind` older than `before` (default: the hot cutoff) into archive
+    segments. Returns the list of LogArchiveSegment rows created.
+    """
+    spec = KINDS[kind]
+    before = before or hot_cutoff()
+    segment_rows = segment_rows or getattr(settings, 'LOG_ARCHIVE_SEGMENT_ROWS', 10_000)
+    codec = codec or default_codec()
+    root = archive_dir()
+    segments = []
+
+    while True:
+        rows = list(
+            spec.model.objects.filter(timestamp__lt=before)
+            .select_related(*spec.related)
+            .order_by('timestamp', 'id')[:segment_rows]
+        )
+        if not rows:
+            return segments
+
+        records = spec.serializer(rows, many=True).data
+        payload = ''.join(json.dumps(record, separators=(',', ':'), default=str) + '\n' for record in records)
+        data = _compress(payload.encode('utf-8'), codec)
+
+        start, end = rows[0].timestamp, rows[-1].timestamp
+        relative = Path(kind) / f'{start:%Y}' / f'{kind}-{start:%Y%m%dT%H%M%S}-{rows[0].id}-{rows[-1].id}{EXTENSIONS[codec]}'
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written in full before the rows are deleted; a crash in between leaves an unindexed
+        # file behind, never lost rows
+        temporary = path.with_name(path.name + '.tmp')
+        with open(temporary, 'wb') as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, path)
+
+        with transaction.atomic():
+            segments.append(LogArchiveSegment.objects.create(
+                kind=kind, path=str(relative), codec=codec, start=start, end=end,
+                row_count=len(rows), size_bytes=len(data),
+            ))
+            spec.model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+
+
+def parse_bound(value):
+    """
+    Parse a start_date/end_date query parameter into an aware datetime. A bare date means
+    midnight, as in the database filters.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        moment = datetime.combine(day, dt_time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@dataclass
+class ArchiveQuery:
+    """Filters applied to archived records: a time range and exact matches on record fields."""
+    start: datetime = None
+    end: datetime = None
+    equals: dict = field(default_factory=dict)  # dotted record path -> value
+
+    def reaches_before(self, moment):
+        return self.start is None or self.start < moment
+
+    def matches(self, record, timestamp):
+        if self.start is not None and timestamp < self.start:
+            return False
+        if self.end is not None and timestamp > self.end:
+            return False
+        for path, expected in self.equals.items():
+            value = record
+            for part in path.split('.'):
+                value = value.get(part) if isinstance(value, dict) else None
+            if str(value) != str(expected):
+                return False
+        return True
+
+
+def search_archive(kind, query):
+    """Yield archived records of `kind` matching `query`, newest first."""
+    segments = LogArchiveSegment.objects.filter(kind=kind)
+    if query.start is not None:
+        segments = segments.filter(end__gte=query.start)
+    if query.end is not None:
+        segments = segments.filter(start__lte=query.end)
+    root = archive_dir()
+    for segment in segments.order_by('-end'):
+        with _open_lines(root / segment.path, segment.codec) as lines:
+            matched = []
+            for line in lines:
+                record = json.loads(line)
+                if query.matches(record, parse_datetime(record['timestamp'])):
+                    matched.append(record)
+        # Segments are written oldest first
+        yield from reversed(matched)
+
+
+def newest_first(hot_records, archived_records):
+    """Merge two newest-first record streams into one."""
+    return heapq.merge(
+        hot_records, archived_records,
+        key=lambda record: parse_datetime(record['timestamp']), reverse=True,
+    )
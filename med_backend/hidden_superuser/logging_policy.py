@@ -0,0 +1,141 @@
+# hidden_superuser/logging_policy.py
+
+"""
+Which admin requests AdminActivityTrackingMiddleware writes, and how.
+
+- Mutating requests (POST, PUT, PATCH, DELETE) are always logged, one row each, at once.
+- Read-only requests are sampled per path: ACTIVITY_LOG_POLICY['sample_rates'] maps path
+  prefixes to the fraction of requests kept (the longest matching prefix wins, anything
+  else uses 'default_sample_rate').
+- Kept read-only requests are coalesced: identical (user, method, path, status) events
+  inside 'coalesce_window_seconds' become one row with a count and first/last timestamps.
+  The row's timestamp is its first request, so it sorts and filters where that happened.
+
+Coalescing happens in memory, per process. Pending rows are written when their window
+closes (checked on every logged request), when more than 'max_pending' are waiting, and
+at process exit; a crash loses at most one window of read-only events.
+
+With dashboards polling every 10-30 seconds, a 5 minute window writes one row where there
+were 10-30, before any sampling.
+"""
+
+import atexit
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+DEFAULT_POLICY = {
+    'default_sample_rate': 1.0,
+    'sample_rates': {},
+    'coalesce_window_seconds': 300,
+    'max_pending': 5000,
+}
+
+
+def policy():
+    return {**DEFAULT_POLICY, **getattr(settings, 'ACTIVITY_LOG_POLICY', {})}
+
+
+def sample_rate(path, config=None):
+    config = config or policy()
+    best, rate = -1, config['default_sample_rate']
+    for prefix, prefix_rate in config['sample_rates'].items():
+        if path.startswith(prefix) and len(prefix) > best:
+            best, rate = len(prefix), prefix_rate
+    return rate
+
+
+def always_logged(method):
+    return method not in SAFE_METHODS
+
+
+def sampled(path, config=None):
+    rate = sample_rate(path, config)
+    return rate >= 1 or random.random() < rate
+
+
+@dataclass
+class PendingActivity:
+    """A coalesced run of identical read-only requests, not yet written."""
+    fields: dict
+    first_seen: object
+    last_seen: object
+    count: int = 1
+    extra: dict = field(default_factory=dict)
+
+    def to_row_fields(self):
+        details = dict(self.fields.get('details') or {})
+        details.update(self.extra)
+        return {
+            **self.fields,
+            'details': details,
+            'count': self.count,
+            'timestamp': self.first_seen,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+
+class ActivityAggregator:
+    """Coalesces read-only activity events in memory until their window closes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def add(self, key, fields, now=None, extra=None):
+        now = now or timezone.now()
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = PendingActivity(fields, now, now, extra=extra or {})
+            else:
+                pending.count += 1
+                pending.last_seen = now
+
+    def drain(self, now=None, force=False, config=None):
+        """Remove and return the pending activities whose window has closed (all of them if forced)."""
+        config = config or policy()
+        now = now or timezone.now()
+        window = timedelta(seconds=config['coalesce_window_seconds'])
+        with self._lock:
+            if force or len(self._pending) > config['max_pending']:
+                due = list(self._pending)
+            else:
+                due = [key for key, pending in self._pending.items() if pending.first_seen + window <= now]
+            return [self._pending.pop(key) for key in due]
+
+    def __len__(self):
+        return len(self._pending)
+
+
+aggregator = ActivityAggregator()
+
+
+def write_activities(pending_activities):
+    from .models import AdminActivityLog
+    if pending_activities:
+        AdminActivityLog.objects.bulk_create(
+            AdminActivityLog(**pending.to_row_fields()) for pending in pending_activities
+        )
+
+
+def flush_due(force=False):
+    write_activities(aggregator.drain(force=force))
+
+
+def _flush_at_exit():
+    try:
+        flush_due(force=True)
+    except Exception:
+        # The database may already be gone at interpreter shutdown
+        pass
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hidden_superuser.archive import KINDS, archive_logs, hot_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Move admin activity and system audit log rows older than the hot retention window into compressed archive segments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=[*KINDS, 'all'], default='all', help='Which log to archive')
+        parser.add_argument('--days', type=int, help='Keep this many days in the database (default: LOG_HOT_RETENTION_DAYS)')
+        parser.add_argument('--segment-rows', type=int, help='Rows per segment file (default: LOG_ARCHIVE_SEGMENT_ROWS)')
+        parser.add_argument('--codec', choices=['zstd', 'gzip'], help='Compression (default: LOG_ARCHIVE_CODEC)')
+
+    def handle(self, *args, **options):
+        before = hot_cutoff()
+        if options['days'] is not None:
+            before = timezone.now() - timedelta(days=options['days'])
+        kinds = list(KINDS) if options['kind'] == 'all' else [options['kind']]
+        for kind in kinds:
+            segments = archive_logs(kind, before, options['segment_rows'], options['codec'])
+            rows = sum(segment.row_count for segment in segments)
+            size = sum(segment.size_bytes for segment in segments)
+            self.stdout.write(self.style.SUCCESS(
+                f"{kind}: archived {rows} row(s) into {len(segments)} segment(s), {size / 1024:.1f} KiB"
+            ))
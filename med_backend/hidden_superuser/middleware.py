@@ -1,7 +1,10 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from users.capabilities import is_office
 from .models import AdminActivityLog, LoginHistory, SystemAuditLog
+from core.ratelimit import client_ip
+from .logging_policy import aggregator, always_logged, flush_due, policy, sample_rate, sampled
 import json
 
 User = get_user_model()
@@ -20,18 +23,13 @@ class AdminActivityTrackingMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
         # Only track for admin/principal users
         if hasattr(request, 'user') and request.user.is_authenticated:
-            if request.user.role in ['admin', 'principal'] or getattr(request.user, 'is_hidden_superuser', False):
+            if is_office(request.user):
                 self.log_activity(request, response)
         
         return response
     
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return client_ip(request)
     
     def log_activity(self, request, response):
         """Log the activity performed by admin/principal users"""
@@ -74,16 +72,30 @@ class AdminActivityTrackingMiddleware(MiddlewareMixin):
                 except:
                     details['request_data'] = 'Unable to parse request data'
             
-            # Create activity log
-            AdminActivityLog.objects.create(
-                user=request.user,
-                action=action,
-                model_name=model_name,
-                object_id=object_id,
-                details=details,
-                ip_address=request._admin_activity_info['ip_address'],
-                user_agent=request._admin_activity_info['user_agent'],
-            )
+            fields = {
+                'user_id': request.user.pk,
+                'action': action,
+                'model_name': model_name,
+                'object_id': object_id,
+                'details': details,
+                'ip_address': request._admin_activity_info['ip_address'],
+                'user_agent': request._admin_activity_info['user_agent'],
+            }
+
+            # Changes are always logged, one row each; reads are sampled and coalesced
+            if always_logged(request.method):
+                now = timezone.now()
+                AdminActivityLog.objects.create(**fields, first_seen=now, last_seen=now)
+            else:
+                config = policy()
+                if sampled(request.path, config):
+                    rate = sample_rate(request.path, config)
+                    aggregator.add(
+                        (request.user.pk, request.method, request.path, response.status_code),
+                        fields,
+                        extra={'sample_rate': rate} if rate < 1 else None,
+                    )
+            flush_due()
             
         except Exception as e:
             # Log error but don't break the request
@@ -102,7 +114,7 @@ class LoginTrackingMiddleware(MiddlewareMixin):
         try:
             # This will be called after successful authentication
             if hasattr(request, 'user') and request.user.is_authenticated:
-                if request.user.role in ['admin', 'principal'] or getattr(request.user, 'is_hidden_superuser', False):
+                if is_office(request.user):
                     # Create login history record
                     LoginHistory.objects.create(
                         user=request.user,
@@ -126,12 +138,7 @@ class LoginTrackingMiddleware(MiddlewareMixin):
             print(f"Error tracking login: {e}")
     
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return client_ip(request)
 
 class SystemEventTrackingMiddleware(MiddlewareMixin):
     """Middleware to track system-wide events"""
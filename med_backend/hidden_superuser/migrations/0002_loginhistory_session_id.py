@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hidden_superuser', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loginhistory',
+            name='session_id',
+            field=models.CharField(blank=True, db_index=True, help_text="jti of the session's refresh token", max_length=64),
+        ),
+    ]
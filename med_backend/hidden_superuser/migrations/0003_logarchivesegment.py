@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hidden_superuser', '0002_loginhistory_session_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('activity', 'Admin Activity Log'), ('audit', 'System Audit Log')], max_length=20)),
+                ('path', models.CharField(help_text='Path relative to LOG_ARCHIVE_DIR', max_length=500)),
+                ('codec', models.CharField(help_text='zstd or gzip', max_length=10)),
+                ('start', models.DateTimeField(help_text='Timestamp of the oldest row in the segment')),
+                ('end', models.DateTimeField(help_text='Timestamp of the newest row in the segment')),
+                ('row_count', models.PositiveIntegerField()),
+                ('size_bytes', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Log Archive Segment',
+                'verbose_name_plural': 'Log Archive Segments',
+                'ordering': ['-end'],
+                'indexes': [models.Index(fields=['kind', 'start', 'end'], name='log_archive_range_idx')],
+            },
+        ),
+    ]
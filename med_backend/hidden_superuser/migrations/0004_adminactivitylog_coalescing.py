@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hidden_superuser', '0003_logarchivesegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminactivitylog',
+            name='count',
+            field=models.PositiveIntegerField(default=1, help_text='Number of identical requests this row stands for'),
+        ),
+        migrations.AddField(
+            model_name='adminactivitylog',
+            name='first_seen',
+            field=models.DateTimeField(blank=True, help_text='Time of the first coalesced request', null=True),
+        ),
+        migrations.AddField(
+            model_name='adminactivitylog',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, help_text='Time of the last coalesced request', null=True),
+        ),
+    ]
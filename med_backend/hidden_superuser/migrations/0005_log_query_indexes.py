@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hidden_superuser', '0004_adminactivitylog_coalescing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminactivitylog',
+            index=models.Index(fields=['-timestamp', '-id'], name='activity_log_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminactivitylog',
+            index=models.Index(fields=['user', '-timestamp'], name='activity_log_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminactivitylog',
+            index=models.Index(fields=['action', '-timestamp'], name='activity_log_action_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adminactivitylog',
+            index=models.Index(fields=['model_name', '-timestamp'], name='activity_log_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemauditlog',
+            index=models.Index(fields=['-timestamp', '-id'], name='audit_log_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemauditlog',
+            index=models.Index(fields=['severity', '-timestamp'], name='audit_log_severity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemauditlog',
+            index=models.Index(fields=['event_type', '-timestamp'], name='audit_log_event_idx'),
+        ),
+    ]
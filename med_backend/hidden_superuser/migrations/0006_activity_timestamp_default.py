@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hidden_superuser', '0005_log_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adminactivitylog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
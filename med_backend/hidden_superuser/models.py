@@ -26,12 +26,24 @@ class AdminActivityLog(models.Model):
     details = models.JSONField(default=dict, help_text="Additional details about the action")
     ip_address = models.GenericIPAddressField(blank=True, null=True)
     user_agent = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # A coalesced row is stamped with its first request, not with the time it was written
+    timestamp = models.DateTimeField(default=timezone.now)
+    # Repeated identical read-only requests are coalesced into one row (see hidden_superuser.logging_policy)
+    count = models.PositiveIntegerField(default=1, help_text="Number of identical requests this row stands for")
+    first_seen = models.DateTimeField(blank=True, null=True, help_text="Time of the first coalesced request")
+    last_seen = models.DateTimeField(blank=True, null=True, help_text="Time of the last coalesced request")
     
     class Meta:
         ordering = ['-timestamp']
         verbose_name = "Admin Activity Log"
         verbose_name_plural = "Admin Activity Logs"
+        # Every list filter is an equality followed by the newest-first keyset order
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='activity_log_keyset_idx'),
+            models.Index(fields=['user', '-timestamp'], name='activity_log_user_idx'),
+            models.Index(fields=['action', '-timestamp'], name='activity_log_action_idx'),
+            models.Index(fields=['model_name', '-timestamp'], name='activity_log_model_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.action} - {self.model_name} - {self.timestamp}"
@@ -45,6 +57,7 @@ class LoginHistory(models.Model):
     user_agent = models.TextField(blank=True)
     session_duration = models.DurationField(blank=True, null=True)
     is_active = models.BooleanField(default=True, help_text="Whether this session is still active")
+    session_id = models.CharField(max_length=64, blank=True, db_index=True, help_text="jti of the session's refresh token")
     
     class Meta:
         ordering = ['-login_time']
@@ -92,6 +105,11 @@ class SystemAuditLog(models.Model):
         ordering = ['-timestamp']
         verbose_name = "System Audit Log"
         verbose_name_plural = "System Audit Logs"
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='audit_log_keyset_idx'),
+            models.Index(fields=['severity', '-timestamp'], name='audit_log_severity_idx'),
+            models.Index(fields=['event_type', '-timestamp'], name='audit_log_event_idx'),
+        ]
     
     def __str__(self):
         return f"{self.event_type} - {self.timestamp}"
@@ -126,3 +144,28 @@ class CodeModificationLog(models.Model):
     
     def __str__(self):
         return f"{self.file_path} - {self.modification_type} - {self.timestamp}"
+
+class LogArchiveSegment(models.Model):
+    """One compressed JSONL file of log rows moved out of the database (see hidden_superuser.archive)"""
+    KIND_CHOICES = [
+        ('activity', 'Admin Activity Log'),
+        ('audit', 'System Audit Log'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    path = models.CharField(max_length=500, help_text="Path relative to LOG_ARCHIVE_DIR")
+    codec = models.CharField(max_length=10, help_text="zstd or gzip")
+    start = models.DateTimeField(help_text="Timestamp of the oldest row in the segment")
+    end = models.DateTimeField(help_text="Timestamp of the newest row in the segment")
+    row_count = models.PositiveIntegerField()
+    size_bytes = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-end']
+        indexes = [models.Index(fields=['kind', 'start', 'end'], name='log_archive_range_idx')]
+        verbose_name = "Log Archive Segment"
+        verbose_name_plural = "Log Archive Segments"
+
+    def __str__(self):
+        return f"{self.kind} {self.start:%Y-%m-%d} - {self.end:%Y-%m-%d} ({self.row_count} rows)"
@@ -11,7 +11,21 @@ class AdminActivityLogSerializer(serializers.ModelSerializer):
         model = AdminActivityLog
         fields = [
             'id', 'user', 'user_username', 'user_role', 'action', 'model_name', 
-            'object_id', 'details', 'ip_address', 'user_agent', 'timestamp'
+            'object_id', 'details', 'ip_address', 'user_agent', 'timestamp',
+            'count', 'first_seen', 'last_seen',
+        ]
+
+class AdminActivityLogListSerializer(serializers.ModelSerializer):
+    """List projection: no details or user agent, which the detail route returns on demand."""
+    user_id = serializers.IntegerField(read_only=True)
+    user_username = serializers.CharField(source='user.username', read_only=True)
+    user_role = serializers.CharField(source='user.role', read_only=True)
+
+    class Meta:
+        model = AdminActivityLog
+        fields = [
+            'id', 'user_id', 'user_username', 'user_role', 'action', 'model_name',
+            'object_id', 'ip_address', 'timestamp', 'count',
         ]
 
 class LoginHistorySerializer(serializers.ModelSerializer):
@@ -54,6 +68,18 @@ class SystemAuditLogSerializer(serializers.ModelSerializer):
             'details', 'timestamp', 'severity'
         ]
 
+class SystemAuditLogListSerializer(serializers.ModelSerializer):
+    """List projection: no details, which the detail route returns on demand."""
+    affected_user_id = serializers.IntegerField(read_only=True)
+    affected_user_username = serializers.CharField(source='affected_user.username', read_only=True)
+
+    class Meta:
+        model = SystemAuditLog
+        fields = [
+            'id', 'event_type', 'description', 'affected_user_id', 'affected_user_username',
+            'timestamp', 'severity',
+        ]
+
 class CodeModificationLogSerializer(serializers.ModelSerializer):
     modified_by = UserSimpleSerializer(read_only=True)
     modified_by_username = serializers.CharField(source='modified_by.username', read_only=True)
@@ -1,3 +1,217 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from users.tokens import issue_tokens
+from .aggregates import bucket_counts
+from .archive import archive_logs
+from .logging_policy import aggregator, sample_rate, write_activities
+from .models import AdminActivityLog, LogArchiveSegment, SystemAuditLog
+
+
+class LogArchiveTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive_dir = Path(directory.name)
+        settings_override = override_settings(LOG_ARCHIVE_DIR=self.archive_dir, LOG_HOT_RETENTION_DAYS=30)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        self.hidden = User.objects.create_user(username='hidden001', password='pass123', is_hidden_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(self.hidden).access_token}')
+
+    def log(self, action, days_ago):
+        entry = AdminActivityLog.objects.create(user=self.admin, action=action, model_name='books')
+        AdminActivityLog.objects.filter(pk=entry.pk).update(timestamp=timezone.now() - timedelta(days=days_ago))
+        return entry
+
+    def test_old_rows_move_into_indexed_segments(self):
+        old = [self.log('create', days) for days in (90, 80, 70)]
+        recent = self.log('update', 1)
+
+        segments = archive_logs('activity', segment_rows=2, codec='gzip')
+
+        self.assertEqual([segment.row_count for segment in segments], [2, 1])
+        self.assertEqual(list(AdminActivityLog.objects.values_list('id', flat=True)), [recent.id])
+        for segment in LogArchiveSegment.objects.all():
+            self.assertTrue((self.archive_dir / segment.path).exists())
+            self.assertLessEqual(segment.start, segment.end)
+        self.assertFalse(AdminActivityLog.objects.filter(pk__in=[entry.pk for entry in old]).exists())
+
+    def test_list_searches_both_tiers_when_the_range_reaches_the_archive(self):
+        archived_create = self.log('create', 60)
+        self.log('update', 50)
+        hot_create = self.log('create', 2)
+        archive_logs('activity', codec='gzip')
+        url = reverse('hidden-superuser-activity-logs')
+
+        start = (timezone.now() - timedelta(days=100)).date().isoformat()
+        response = self.client.get(url, {'start_date': start, 'action': 'create'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [hot_create.id, archived_create.id])
+        self.assertEqual(response.data['results'][1]['user_username'], 'admin001')
+
+        # Recent ranges stay in the database
+        response = self.client.get(url, {'action': 'create'})
+        self.assertEqual([row['id'] for row in response.data['results']], [hot_create.id])
+
+    def test_archive_pages_continue_across_tiers(self):
+        expected = [self.log('create', days).id for days in (1, 2, 60, 70, 80)]
+        archive_logs('activity', codec='gzip')
+        url = reverse('hidden-superuser-activity-logs')
+
+        seen, params = [], {'archive': '1', 'page_size': 2}
+        response = self.client.get(url, params)
+        while True:
+            page = response.data['results']
+            self.assertLessEqual(len(page), 2)
+            seen += [row['id'] for row in page]
+            self.assertEqual(page[0]['user_id'], self.admin.id)
+            self.assertNotIn('details', page[0])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, expected)
+
+
+@override_settings(ACTIVITY_LOG_POLICY={
+    'sample_rates': {'/api/library/': 0.0, '/api/library/books/all/': 1.0},
+    'coalesce_window_seconds': 300,
+})
+class ActivityLogPolicyTests(TestCase):
+    def setUp(self):
+        aggregator.drain(force=True)
+        self.addCleanup(aggregator.drain, force=True)
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(self.admin).access_token}')
+
+    def close_window(self):
+        write_activities(aggregator.drain(now=timezone.now() + timedelta(seconds=301)))
+
+    def test_repeated_reads_are_coalesced_into_one_row(self):
+        for _ in range(20):
+            self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.assertFalse(AdminActivityLog.objects.exists())
+
+        self.close_window()
+        entry = AdminActivityLog.objects.get()
+        self.assertEqual((entry.action, entry.count), ('view', 20))
+        self.assertLessEqual(entry.first_seen, entry.last_seen)
+        # Stamped when the requests came in, not when the window closed
+        self.assertEqual(entry.timestamp, entry.first_seen)
+
+    def test_changes_are_always_logged_individually(self):
+        self.client.post(reverse('logout'))
+        entry = AdminActivityLog.objects.get()
+        self.assertEqual((entry.action, entry.count), ('create', 1))
+        self.assertEqual(len(aggregator), 0)
+
+    def test_sampling_by_longest_path_prefix(self):
+        self.assertEqual(sample_rate('/api/library/books/available/'), 0.0)
+        self.assertEqual(sample_rate('/api/library/books/all/'), 1.0)
+        self.assertEqual(sample_rate('/api/users/me/'), 1.0)
+        self.client.get('/api/library/books/available/')
+        self.close_window()
+        self.assertFalse(AdminActivityLog.objects.exists())
+
+
+class LogQueryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        self.principal = User.objects.create_user(username='principal001', password='pass123', role='principal')
+        self.hidden = User.objects.create_user(username='hidden001', password='pass123', is_hidden_superuser=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(self.hidden).access_token}')
+        self.now = (timezone.now() - timedelta(hours=1)).replace(minute=30, second=0, microsecond=0)
+
+    def log(self, user, action, hours_ago, count=1):
+        entry = AdminActivityLog.objects.create(
+            user=user, action=action, model_name='books', details={'payload': 'x' * 100}, count=count,
+        )
+        AdminActivityLog.objects.filter(pk=entry.pk).update(timestamp=self.now - timedelta(hours=hours_ago))
+        return entry
+
+    def test_list_is_a_keyset_paginated_projection(self):
+        entries = [self.log(self.admin, 'update', hours) for hours in range(5)]
+        url = reverse('hidden-superuser-activity-logs')
+
+        seen, response = [], self.client.get(url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            for row in response.data['results']:
+                self.assertNotIn('details', row)
+                self.assertEqual((row['user_id'], row['user_username']), (self.admin.id, 'admin001'))
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, [entry.id for entry in entries])
+
+        # details on demand
+        detail = self.client.get(reverse('hidden-superuser-activity-log-detail', args=[entries[0].id]))
+        self.assertEqual(detail.data['details'], {'payload': 'x' * 100})
+
+    def test_activity_counts_per_hour_and_action_in_one_query(self):
+        self.log(self.admin, 'view', 0, count=12)
+        self.log(self.principal, 'view', 0, count=3)
+        self.log(self.admin, 'update', 0)
+        self.log(self.admin, 'update', 2)
+        url = reverse('hidden-superuser-activity-log-stats')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'bucket': 'hour', 'group_by': 'action'})
+        self.assertEqual(response.status_code, 200)
+        log_queries = [q for q in queries.captured_queries if 'hidden_superuser_adminactivitylog' in q['sql']]
+        self.assertEqual(len(log_queries), 1)
+        # Coalesced rows count for every request they stand for
+        self.assertEqual(
+            [(point['bucket'], point['key'], point['count']) for point in response.data['series']],
+            [
+                (self.now.replace(minute=0) - timedelta(hours=2), 'update', 1),
+                (self.now.replace(minute=0), 'update', 1),
+                (self.now.replace(minute=0), 'view', 15),
+            ],
+        )
+
+        response = self.client.get(url, {'bucket': 'day', 'group_by': 'user', 'action': 'view'})
+        self.assertEqual(
+            {point['label']: point['count'] for point in response.data['series']},
+            {'admin001': 12, 'principal001': 3},
+        )
+
+    def test_stats_reject_unknown_groups_and_wide_ranges(self):
+        url = reverse('hidden-superuser-activity-log-stats')
+        self.assertEqual(self.client.get(url, {'group_by': 'details'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'bucket': 'minute'}).status_code, 400)
+        start = (self.now - timedelta(days=90)).date().isoformat()
+        self.assertEqual(self.client.get(url, {'bucket': 'hour', 'start_date': start}).status_code, 400)
+
+    def test_audit_counts_per_day_and_severity(self):
+        for severity in ('high', 'high', 'low'):
+            SystemAuditLog.objects.create(event_type='user_modified', description='changed', severity=severity)
+        response = self.client.get(reverse('hidden-superuser-audit-log-stats'), {'bucket': 'day', 'group_by': 'severity'})
+        self.assertEqual(
+            {point['key']: point['count'] for point in response.data['series']},
+            {'high': 2, 'low': 1},
+        )
+
+    def test_buckets_follow_the_current_time_zone(self):
+        entry = self.log(self.admin, 'view', 0)
+        moment = AdminActivityLog.objects.get(pk=entry.pk).timestamp
+        for zone in ('UTC', 'Asia/Kolkata'):
+            with timezone.override(zone):
+                [point] = bucket_counts(AdminActivityLog.objects.all(), 'hour')
+                local = timezone.localtime(moment)
+                self.assertEqual(point['bucket'], local.replace(minute=0, second=0, microsecond=0))
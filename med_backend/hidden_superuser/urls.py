@@ -1,9 +1,21 @@
 from django.urls import path
-from .views import HiddenSuperuserDashboardView, HiddenSuperuserUserManagementView, CodeModificationViewSet, toggle_user_status
+from .views import (
+    HiddenSuperuserDashboardView, HiddenSuperuserUserManagementView, CodeModificationViewSet, LoginHistoryViewSet,
+    AdminActivityLogViewSet, SystemAuditLogViewSet, toggle_user_status,
+)
 
 urlpatterns = [
     path('dashboard/', HiddenSuperuserDashboardView.as_view(), name='hidden-superuser-dashboard'),
     path('user-management/', HiddenSuperuserUserManagementView.as_view(), name='hidden-superuser-user-management'),
     path('code-modifications/', CodeModificationViewSet.as_view({'get': 'list'}), name='hidden-superuser-code-modifications'),
     path('toggle-user-status/', toggle_user_status, name='hidden-superuser-toggle-user-status'),
+    path('login-history/', LoginHistoryViewSet.as_view({'get': 'list'}), name='hidden-superuser-login-history'),
+    path('login-history/<int:pk>/', LoginHistoryViewSet.as_view({'get': 'retrieve'}), name='hidden-superuser-login-history-detail'),
+    path('login-history/<int:pk>/force-logout/', LoginHistoryViewSet.as_view({'post': 'force_logout'}), name='hidden-superuser-force-logout'),
+    path('activity-logs/', AdminActivityLogViewSet.as_view({'get': 'list'}), name='hidden-superuser-activity-logs'),
+    path('activity-logs/stats/', AdminActivityLogViewSet.as_view({'get': 'stats'}), name='hidden-superuser-activity-log-stats'),
+    path('activity-logs/<int:pk>/', AdminActivityLogViewSet.as_view({'get': 'retrieve'}), name='hidden-superuser-activity-log-detail'),
+    path('audit-logs/', SystemAuditLogViewSet.as_view({'get': 'list'}), name='hidden-superuser-audit-logs'),
+    path('audit-logs/stats/', SystemAuditLogViewSet.as_view({'get': 'stats'}), name='hidden-superuser-audit-log-stats'),
+    path('audit-logs/<int:pk>/', SystemAuditLogViewSet.as_view({'get': 'retrieve'}), name='hidden-superuser-audit-log-detail'),
 ] 
\ No newline at end of file
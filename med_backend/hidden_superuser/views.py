@@ -7,17 +7,30 @@ from django.utils import timezone
 from django.db.models import Q, Count
 from django.contrib.auth import get_user_model
 from django.http import JsonResponse
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
 import os
 import json
 import subprocess
 import shutil
 from datetime import datetime, timedelta
+from itertools import islice
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
+
+from users.capabilities import Capability, has_any
+from core.routing import ReplicaReadMixin
+from .aggregates import MAX_RANGE_DAYS, AggregateError, bucket_counts
+from .archive import ArchiveQuery, hot_cutoff, newest_first, parse_bound, search_archive
+from users.revocation import revoke_session
+from users.tokens import revoke_user_tokens
 
 from .models import AdminActivityLog, LoginHistory, SystemAuditLog, CodeModificationLog
 from .serializers import (
-    AdminActivityLogSerializer, LoginHistorySerializer, SystemAuditLogSerializer,
+    AdminActivityLogSerializer, AdminActivityLogListSerializer, LoginHistorySerializer,
+    SystemAuditLogSerializer, SystemAuditLogListSerializer,
     CodeModificationLogSerializer, HiddenSuperuserDashboardSerializer,
     CodeModificationRequestSerializer
 )
@@ -28,10 +41,7 @@ class HiddenSuperuserPermission(permissions.BasePermission):
     """Custom permission for hidden superuser access"""
     
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and 
-            getattr(request.user, 'is_hidden_superuser', False)
-        )
+        return has_any(request.user, Capability.HIDDEN_SUPERUSER)
 
 class HiddenSuperuserDashboardView(APIView):
     """Dashboard view for hidden superuser with comprehensive system overview"""
@@ -137,10 +147,162 @@ class HiddenSuperuserDashboardView(APIView):
         # You can implement actual backup tracking
         return "Never"
 
-class AdminActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogCursorPagination(CursorPagination):
+    """Keyset pagination, newest first: every page is an index range scan, however deep."""
+    ordering = ('-timestamp', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class LogQueryMixin:
+    """
+    Shared list behaviour of the activity and audit log viewsets:
+    - list responses use a projection serializer and load only its columns; `details`
+      comes from the detail route
+    - lists are keyset-paginated (AuditLogCursorPagination)
+    - stats/ returns counts per hour or day, optionally per `group_by`, in one query
+    """
+    pagination_class = AuditLogCursorPagination
+    list_serializer_class = None
+    list_related = ()
+    list_columns = ()
+    # group_by parameter -> (key field, optional label field)
+    aggregate_groups = {}
+    # Field summed by stats/ instead of counting rows
+    aggregate_weight = None
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.select_related(*self.list_related).only(*self.list_columns)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        params = request.query_params
+        bucket = params.get('bucket', 'hour')
+        group_by = params.get('group_by')
+        if group_by and group_by not in self.aggregate_groups:
+            return Response(
+                {"error": "Invalid group_by.", "details": f"Use one of: {', '.join(self.aggregate_groups)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        end = parse_bound(params.get('end_date')) or timezone.now()
+        start = parse_bound(params.get('start_date')) or end - timedelta(days=30)
+        if bucket in MAX_RANGE_DAYS and end - start > timedelta(days=MAX_RANGE_DAYS[bucket]):
+            return Response(
+                {"error": "Range too wide.", "details": f"At most {MAX_RANGE_DAYS[bucket]} days per {bucket}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.get_queryset().filter(timestamp__gte=start, timestamp__lte=end)
+        try:
+            series = bucket_counts(
+                queryset, bucket, self.aggregate_groups.get(group_by, ()), weight=self.aggregate_weight,
+            )
+        except AggregateError as exc:
+            return Response({"error": "Invalid bucket.", "details": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'bucket': bucket,
+            'group_by': group_by,
+            'start': start,
+            'end': end,
+            'series': series,
+        })
+
+
+class ArchivedLogListMixin:
+    """
+    list() also searches the archive tier when the request asks for rows older than the hot
+    retention window (start_date before the cutoff) or passes archive=1. The same filters
+    apply to both tiers and the results are merged newest first, a page at a time: `next`
+    carries a `before` cursor (timestamp and id of the last row) bounding both tiers.
+    """
+    archive_kind = None
+    # query parameter -> field of the archived record (dotted for nested fields)
+    archive_filters = {}
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        query = ArchiveQuery(
+            start=parse_bound(params.get('start_date')),
+            end=parse_bound(params.get('end_date')),
+            equals={path: params[param] for param, path in self.archive_filters.items() if params.get(param)},
+        )
+        reaches_archive = params.get('start_date') and query.reaches_before(hot_cutoff())
+        if params.get('archive') != '1' and not reaches_archive:
+            return super().list(request, *args, **kwargs)
+
+        page_size = self.paginator.get_page_size(request)
+        hot = self.filter_queryset(self.get_queryset())
+        before = self.parse_before(params.get('before'))
+        if before is not None:
+            moment, pk = before
+            hot = hot.filter(Q(timestamp__lt=moment) | Q(timestamp=moment, pk__lt=pk))
+            query.end = moment if query.end is None else min(query.end, moment)
+        hot = self.get_serializer(hot.order_by('-timestamp', '-id')[:page_size + 1], many=True).data
+
+        archived = (self.project_archived(record) for record in search_archive(self.archive_kind, query))
+        if before is not None:
+            archived = (record for record in archived if self.record_position(record) < before)
+        rows = list(islice(newest_first(hot, archived), page_size + 1))
+
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            moment, pk = self.record_position(rows[-1])
+            next_url = replace_query_param(request.build_absolute_uri(), 'before', f'{moment.isoformat()}|{pk}')
+        return Response({'next': next_url, 'previous': None, 'results': rows})
+
+    def project_archived(self, record):
+        """Reduce an archived record, stored as the detail serializer wrote it, to the list projection."""
+        projected = {}
+        for name in self.get_serializer_class().Meta.fields:
+            if name in record:
+                projected[name] = record[name]
+            elif name.endswith('_id') and isinstance(record.get(name[:-3]), dict):
+                projected[name] = record[name[:-3]].get('id')
+        return projected
+
+    @staticmethod
+    def record_position(record):
+        return parse_datetime(record['timestamp']), record['id']
+
+    @staticmethod
+    def parse_before(value):
+        if not value or '|' not in value:
+            return None
+        moment, _, pk = value.rpartition('|')
+        moment = parse_bound(moment)
+        if moment is None or not pk.isdigit():
+            return None
+        return moment, int(pk)
+
+
+class AdminActivityLogViewSet(ReplicaReadMixin, ArchivedLogListMixin, LogQueryMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for admin activity logs"""
-    queryset = AdminActivityLog.objects.all().order_by('-timestamp')
+    archive_kind = 'activity'
+    archive_filters = {'user_id': 'user.id', 'action': 'action', 'model_name': 'model_name'}
+    queryset = AdminActivityLog.objects.select_related('user').order_by('-timestamp', '-id')
     serializer_class = AdminActivityLogSerializer
+    list_serializer_class = AdminActivityLogListSerializer
+    list_related = ('user',)
+    list_columns = (
+        'id', 'user_id', 'user__username', 'user__role', 'action', 'model_name',
+        'object_id', 'ip_address', 'timestamp', 'count',
+    )
+    aggregate_groups = {
+        'action': ('action',),
+        'user': ('user_id', 'user__username'),
+        'model_name': ('model_name',),
+    }
+    # A coalesced row stands for `count` requests
+    aggregate_weight = 'count'
     permission_classes = [HiddenSuperuserPermission]
     
     def get_queryset(self):
@@ -155,10 +317,16 @@ class AdminActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         action = self.request.query_params.get('action')
         if action:
             queryset = queryset.filter(action=action)
+
+        # Filter by model
+        model_name = self.request.query_params.get('model_name')
+        if model_name:
+            queryset = queryset.filter(model_name=model_name)
         
         # Filter by date range
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
+        # Parsed the same way as for the archive tier, as aware datetimes
+        start_date = parse_bound(self.request.query_params.get('start_date'))
+        end_date = parse_bound(self.request.query_params.get('end_date'))
         if start_date:
             queryset = queryset.filter(timestamp__gte=start_date)
         if end_date:
@@ -166,7 +334,7 @@ class AdminActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
 
-class LoginHistoryViewSet(viewsets.ReadOnlyModelViewSet):
+class LoginHistoryViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for login history"""
     queryset = LoginHistory.objects.all().order_by('-login_time')
     serializer_class = LoginHistorySerializer
@@ -179,13 +347,34 @@ class LoginHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         login_record.is_active = False
         login_record.logout_time = timezone.now()
         login_record.save()
+
+        # JWTs are stateless: denylist this session's tokens, or every token of the user
+        # for sessions recorded before session ids were tracked
+        if login_record.session_id:
+            lifetime = settings.SIMPLE_JWT.get('REFRESH_TOKEN_LIFETIME', timedelta(days=7))
+            revoke_session(login_record.session_id, user_id=login_record.user_id, expires_at=login_record.login_time + lifetime)
+        else:
+            revoke_user_tokens(login_record.user_id)
         
         return Response({'message': 'User session terminated successfully'})
 
-class SystemAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class SystemAuditLogViewSet(ReplicaReadMixin, ArchivedLogListMixin, LogQueryMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for system audit logs"""
-    queryset = SystemAuditLog.objects.all().order_by('-timestamp')
+    archive_kind = 'audit'
+    archive_filters = {'severity': 'severity', 'event_type': 'event_type'}
+    queryset = SystemAuditLog.objects.select_related('affected_user').order_by('-timestamp', '-id')
     serializer_class = SystemAuditLogSerializer
+    list_serializer_class = SystemAuditLogListSerializer
+    list_related = ('affected_user',)
+    list_columns = (
+        'id', 'event_type', 'description', 'affected_user_id', 'affected_user__username',
+        'timestamp', 'severity',
+    )
+    aggregate_groups = {
+        'severity': ('severity',),
+        'event_type': ('event_type',),
+        'user': ('affected_user_id', 'affected_user__username'),
+    }
     permission_classes = [HiddenSuperuserPermission]
     
     def get_queryset(self):
@@ -200,6 +389,14 @@ class SystemAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         event_type = self.request.query_params.get('event_type')
         if event_type:
             queryset = queryset.filter(event_type=event_type)
+
+        # Filter by date range
+        start_date = parse_bound(self.request.query_params.get('start_date'))
+        end_date = parse_bound(self.request.query_params.get('end_date'))
+        if start_date:
+            queryset = queryset.filter(timestamp__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(timestamp__lte=end_date)
         
         return queryset
 
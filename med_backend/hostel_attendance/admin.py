@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import HostelAttendance
+from .models import CurfewRule, CurfewViolation, HostelAttendance
 
 @admin.register(HostelAttendance)
 class HostelAttendanceAdmin(admin.ModelAdmin):
@@ -14,4 +14,18 @@ class HostelAttendanceAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         # Allow only superusers to delete
-        return request.user.is_superuser
\ No newline at end of file
+        return request.user.is_superuser
+
+
+@admin.register(CurfewRule)
+class CurfewRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'weekday', 'starts_at', 'ends_at', 'grace_minutes', 'is_active')
+    list_filter = ('is_active', 'weekday')
+
+
+@admin.register(CurfewViolation)
+class CurfewViolationAdmin(admin.ModelAdmin):
+    list_display = ('student', 'kind', 'window_start', 'left_at', 'returned_at')
+    list_filter = ('kind', 'window_start')
+    search_fields = ('student__username',)
+    readonly_fields = ('student', 'rule', 'kind', 'window_start', 'window_end', 'left_at', 'returned_at', 'detected_at', 'updated_at')
@@ -0,0 +1,219 @@
+# hostel_attendance/curfew.py
+
+"""
+Curfew violation detection over the hostel log.
+
+A HostelAttendance row is a stay inside: the student came in at entry_time and left at
+exit_time. A student is therefore outside between one row's exit_time and their next
+row's entry_time, or until now when there is no next row yet. Any such absence that
+overlaps a curfew window (CurfewRule, past its grace period) is a violation:
+
+- late_return: the student came back; recorded when their return is scanned
+- not_returned: the student is still out; becomes late_return once they return
+
+detect_violations() is incremental. CurfewScanMark holds the id of the last log row it
+processed, and each run reads only:
+1. rows after the mark, and the earlier rows of the same students within
+   HOSTEL_CURFEW_LOOKBACK_DAYS, streamed once in (student, entry_time) order, so each new
+   return is paired with the exit before it
+2. students currently outside the hostel, from PresenceState, for the curfew windows since
+   the previous run only (at most HOSTEL_CURFEW_LOOKBACK_DAYS back): earlier nights of a
+   long absence were recorded by earlier runs
+
+Violations are upserted on (student, window_start), so overlapping runs and re-scans never
+duplicate them. Absences starting at a synthetic exit (auto_closed, see presence.reconcile)
+are not evaluated: when the student really left is unknown. Nights a student spends on
+approved leave (leaves.LeaveDay, by the day the window starts) are never violations.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+
+from leaves.models import LeaveDay
+from presence.models import PresenceState
+from .models import CurfewRule, CurfewScanMark, CurfewViolation, HostelAttendance
+
+SCAN_NAME = 'hostel-curfew'
+
+
+def active_rules():
+    """weekday (None for the default) -> rule."""
+    rules = {}
+    for rule in CurfewRule.objects.filter(is_active=True).order_by('id'):
+        rules.setdefault(rule.weekday, rule)
+    return rules
+
+
+def curfew_windows(rules, start, end):
+    """Yield (window_start, window_end, rule) for every curfew window overlapping [start, end)."""
+    zone = timezone.get_current_timezone()
+    # A window starting the evening before `start` may still be running
+    day = timezone.localtime(start, zone).date() - timedelta(days=1)
+    last_day = timezone.localtime(end, zone).date()
+    while day <= last_day:
+        rule = rules.get(day.weekday(), rules.get(None))
+        if rule is not None:
+            window_start = timezone.make_aware(datetime.combine(day, rule.starts_at), zone)
+            end_day = day if rule.ends_at > rule.starts_at else day + timedelta(days=1)
+            window_end = timezone.make_aware(datetime.combine(end_day, rule.ends_at), zone)
+            if window_start < end and window_end > start:
+                yield window_start, window_end, rule
+        day += timedelta(days=1)
+
+
+def absence_violations(student_id, left_at, returned_at, rules, now, since=None):
+    """
+    Violations for one absence; `returned_at` is None while the student is still out.
+    With `since`, only the windows still running after it are evaluated.
+    """
+    until = returned_at or now
+    violations = []
+    for window_start, window_end, rule in curfew_windows(rules, max(left_at, since) if since else left_at, until):
+        # Out at some point between the end of the grace period and the end of the window
+        if left_at < window_end and until > window_start + timedelta(minutes=rule.grace_minutes):
+            violations.append(CurfewViolation(
+                student_id=student_id, rule=rule,
+                kind=CurfewViolation.LATE_RETURN if returned_at else CurfewViolation.NOT_RETURNED,
+                window_start=window_start, window_end=window_end,
+                left_at=left_at, returned_at=returned_at, updated_at=now,
+            ))
+    return violations
+
+
+@dataclass
+class ScanResult:
+    rows_scanned: int = 0
+    late_returns: int = 0
+    not_returned: int = 0
+    resolved: int = 0
+    last_entry_id: int = 0
+
+
+def detect_violations(now=None):
+    """Scan the hostel log from the high-water mark and persist new violations."""
+    now = now or timezone.now()
+    rules = active_rules()
+    lookback = timedelta(days=getattr(settings, 'HOSTEL_CURFEW_LOOKBACK_DAYS', 30))
+
+    with transaction.atomic():
+        mark, _ = CurfewScanMark.objects.select_for_update().get_or_create(name=SCAN_NAME)
+        result = ScanResult(last_entry_id=mark.last_entry_id)
+        new_rows = HostelAttendance.objects.filter(id__gt=mark.last_entry_id)
+        bounds = new_rows.aggregate(first_entry=Min('entry_time'))
+        last_id = new_rows.order_by('-id').values_list('id', flat=True).first()
+
+        late, returns = [], {}
+        if last_id is not None and rules:
+            late, returns = _scan_returns(
+                mark.last_entry_id, last_id, bounds['first_entry'] - lookback, rules, now, result,
+            )
+        result.resolved = _resolve_returned(returns, now)
+        since = now - lookback
+        if mark.last_run_at is not None:
+            since = max(since, mark.last_run_at)
+        absent = _still_out(rules, now, since) if rules else []
+        late, absent = _excuse_leave(late), _excuse_leave(absent)
+
+        _upsert(late, update=True)
+        _upsert(absent, update=False)
+        result.late_returns, result.not_returned = len(late), len(absent)
+
+        if last_id is not None:
+            mark.last_entry_id = result.last_entry_id = last_id
+        mark.last_run_at = now
+        mark.save()
+    return result
+
+
+def _scan_returns(after_id, last_id, since, rules, now, result):
+    """
+    One streaming pass over the log rows of students with new rows, pairing every new
+    entry with the same student's previous exit. Returns (violations, returns), where
+    returns maps each student to the entry times of their new rows.
+    """
+    students = HostelAttendance.objects.filter(id__gt=after_id, id__lte=last_id).values('student_id')
+    rows = (
+        HostelAttendance.objects.filter(student_id__in=students, entry_time__gte=since, id__lte=last_id)
+        .order_by('student_id', 'entry_time', 'id')
+        .values_list('id', 'student_id', 'entry_time', 'exit_time', 'auto_closed')
+        .iterator(chunk_size=2000)
+    )
+    violations, returns = [], {}
+    previous = None
+    for row_id, student_id, entry_time, exit_time, auto_closed in rows:
+        result.rows_scanned += 1
+        if row_id > after_id:
+            returns.setdefault(student_id, []).append(entry_time)
+            if previous is not None and previous[0] == student_id and previous[1] is not None:
+                violations += absence_violations(student_id, previous[1], entry_time, rules, now)
+        # A synthetic exit (close_stale_entries) says nothing about when the student left
+        previous = (student_id, None if auto_closed else exit_time)
+    return violations, returns
+
+
+def _resolve_returned(returns, now):
+    """
+    Turn not_returned violations of students who came back into late returns, including
+    absences that began before the lookback.
+    """
+    pending = CurfewViolation.objects.filter(
+        student_id__in=list(returns), kind=CurfewViolation.NOT_RETURNED,
+    )
+    resolved = []
+    for violation in pending:
+        returned_at = min((entry for entry in returns[violation.student_id] if entry > violation.left_at), default=None)
+        if returned_at is not None:
+            violation.kind, violation.returned_at, violation.updated_at = CurfewViolation.LATE_RETURN, returned_at, now
+            resolved.append(violation)
+    CurfewViolation.objects.bulk_update(resolved, ['kind', 'returned_at', 'updated_at'])
+    return len(resolved)
+
+
+def _still_out(rules, now, since):
+    auto_closed = HostelAttendance.objects.filter(pk=OuterRef('last_event_id'), auto_closed=True)
+    outside = (
+        PresenceState.objects.filter(facility=PresenceState.HOSTEL, is_inside=False)
+        .filter(~Exists(auto_closed))
+        .values_list('student_id', 'since')
+    )
+    violations = []
+    for student_id, left_at in outside:
+        violations += absence_violations(student_id, left_at, None, rules, now, since=since)
+    return violations
+
+
+def _excuse_leave(violations):
+    """Drop the violations of nights the student was on approved leave, in one query."""
+    nights = {(violation.student_id, timezone.localdate(violation.window_start)) for violation in violations}
+    if not nights:
+        return violations
+    on_leave = set(
+        LeaveDay.objects.filter(
+            status='approved',
+            user_id__in={student_id for student_id, _ in nights},
+            day__in={day for _, day in nights},
+        ).values_list('user_id', 'day')
+    )
+    return [
+        violation for violation in violations
+        if (violation.student_id, timezone.localdate(violation.window_start)) not in on_leave
+    ]
+
+
+def _upsert(violations, update):
+    if not violations:
+        return
+    if update:
+        CurfewViolation.objects.bulk_create(
+            violations, batch_size=500, update_conflicts=True,
+            unique_fields=['student', 'window_start'],
+            update_fields=['kind', 'rule', 'window_end', 'left_at', 'returned_at', 'updated_at'],
+        )
+    else:
+        # A student still out keeps the violation already recorded for the window
+        CurfewViolation.objects.bulk_create(violations, batch_size=500, ignore_conflicts=True)
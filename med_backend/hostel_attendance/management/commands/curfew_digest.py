@@ -0,0 +1,52 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from hostel_attendance.curfew import detect_violations
+from hostel_attendance.models import CurfewViolation
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly digest of curfew violations: runs the detector, then mails last night's "
+        "violations to CURFEW_DIGEST_RECIPIENTS (or prints them when none are configured)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Night to report, YYYY-MM-DD (default: yesterday)')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            night = parse_date(options['date'])
+            if night is None:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        else:
+            night = timezone.localdate() - timedelta(days=1)
+
+        detect_violations()
+        start = timezone.make_aware(datetime.combine(night, time.min))
+        violations = (
+            CurfewViolation.objects.filter(window_start__gte=start, window_start__lt=start + timedelta(days=1))
+            .select_related('student')
+            .order_by('kind', 'student__username')
+        )
+        subject = f"Hostel curfew digest for {night:%a %d %b %Y}: {len(violations)} violations"
+        body = '\n'.join([subject, ''] + [self.describe(violation) for violation in violations])
+
+        recipients = getattr(settings, 'CURFEW_DIGEST_RECIPIENTS', [])
+        if recipients:
+            send_mail(subject, body, None, recipients)
+            self.stdout.write(self.style.SUCCESS(f"Digest sent to {len(recipients)} recipients."))
+        else:
+            self.stdout.write(body)
+
+    def describe(self, violation):
+        left = timezone.localtime(violation.left_at)
+        if violation.returned_at is None:
+            return f"- {violation.student.username}: out since {left:%d %b %H:%M}, not returned"
+        returned = timezone.localtime(violation.returned_at)
+        return f"- {violation.student.username}: out {left:%d %b %H:%M} - {returned:%d %b %H:%M}"
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel_attendance', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hostelattendance',
+            name='entry_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostel_attendance', '0003_entry_time_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurfewRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], help_text='Night the window starts on; empty for every day', null=True)),
+                ('starts_at', models.TimeField()),
+                ('ends_at', models.TimeField()),
+                ('grace_minutes', models.PositiveIntegerField(default=15)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CurfewScanMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_entry_id', models.BigIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CurfewViolation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('late_return', 'Returned late'), ('not_returned', 'Not returned')], max_length=20)),
+                ('window_start', models.DateTimeField()),
+                ('window_end', models.DateTimeField()),
+                ('left_at', models.DateTimeField()),
+                ('returned_at', models.DateTimeField(blank=True, null=True)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='violations', to='hostel_attendance.curfewrule')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='curfew_violations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-window_start', '-id'],
+                'indexes': [models.Index(fields=['-window_start', '-id'], name='curfew_violation_list_idx'), models.Index(fields=['kind', '-window_start'], name='curfew_violation_kind_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'window_start'), name='curfew_one_violation_per_window')],
+            },
+        ),
+    ]
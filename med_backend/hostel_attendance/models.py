@@ -8,12 +8,85 @@ User = settings.AUTH_USER_MODEL
 
 class HostelAttendance(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hostel_attendance')
-    entry_time = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: gate readers report the time of the tap, which may be a little in the past
+    entry_time = models.DateTimeField(default=timezone.now)
     exit_time = models.DateTimeField(null=True, blank=True)
     marked_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='hostel_attendance_marked')
+    # Closed by close_stale_entries with a synthetic exit time, not by a tap
+    auto_closed = models.BooleanField(default=False)
 
     def __str__(self):
         return f"{self.student.username} - {self.entry_time.strftime('%Y-%m-%d %H:%M')}"
 
     class Meta:
-        ordering = ['-entry_time']
\ No newline at end of file
+        ordering = ['-entry_time']
+        indexes = [
+            # Open rows only, for close_stale_entries
+            models.Index(fields=['entry_time'], condition=models.Q(exit_time__isnull=True), name='hostel_open_age_idx'),
+        ]
+
+class CurfewRule(models.Model):
+    """
+    A nightly curfew window: students must be inside from `starts_at` until `ends_at` (the
+    next morning when it is earlier than `starts_at`). A rule for a weekday overrides the
+    rule without one, which applies to every other day; among active rules for the same
+    day the oldest wins.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ]
+
+    name = models.CharField(max_length=100)
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES, null=True, blank=True, help_text="Night the window starts on; empty for every day")
+    starts_at = models.TimeField()
+    ends_at = models.TimeField()
+    grace_minutes = models.PositiveIntegerField(default=15)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        day = self.get_weekday_display() if self.weekday is not None else 'Every day'
+        return f"{self.name} ({day} {self.starts_at:%H:%M}-{self.ends_at:%H:%M})"
+
+
+class CurfewViolation(models.Model):
+    """A student outside the hostel during a curfew window; one row per student and window."""
+    LATE_RETURN = 'late_return'
+    NOT_RETURNED = 'not_returned'
+    KIND_CHOICES = [
+        (LATE_RETURN, 'Returned late'),
+        (NOT_RETURNED, 'Not returned'),
+    ]
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='curfew_violations')
+    rule = models.ForeignKey(CurfewRule, on_delete=models.SET_NULL, null=True, blank=True, related_name='violations')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    left_at = models.DateTimeField()
+    returned_at = models.DateTimeField(null=True, blank=True)
+    detected_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student.username} - {self.get_kind_display()} - {self.window_start:%Y-%m-%d}"
+
+    class Meta:
+        ordering = ['-window_start', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'window_start'], name='curfew_one_violation_per_window'),
+        ]
+        indexes = [
+            models.Index(fields=['-window_start', '-id'], name='curfew_violation_list_idx'),
+            models.Index(fields=['kind', '-window_start'], name='curfew_violation_kind_idx'),
+        ]
+
+
+class CurfewScanMark(models.Model):
+    """High-water mark of the violation scan: the last HostelAttendance row it has processed."""
+    name = models.CharField(max_length=50, unique=True)
+    last_entry_id = models.BigIntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} at #{self.last_entry_id}"
@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission
+from users.capabilities import is_management
 
 class IsAdminPrincipalOrHiddenSuperuser(BasePermission):
     """
@@ -6,16 +7,5 @@ class IsAdminPrincipalOrHiddenSuperuser(BasePermission):
     """
 
     def has_permission(self, request, view):
-        user = request.user
-        if not user or not user.is_authenticated:
-            return False
-        if user.is_staff:  # Admin and Django superusers
-            return True
-        
-        if getattr(user, 'role', None) in ['admin', 'principal']:  # Modified to include 'admin'
-            return True
-
-        if getattr(user, 'is_hidden_superuser', False):
-            return True
-
-        return False
\ No newline at end of file
+        # Admins and Django superusers (is_staff), admin/principal roles and the hidden superuser
+        return is_management(request.user)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import HostelAttendance
+from .models import CurfewViolation, HostelAttendance
 from users.models import User
 from users.serializers import UserSimpleSerializer # Import UserSimpleSerializer
 
@@ -23,8 +23,20 @@ class HostelAttendanceSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'student', 'student_id',
-            'entry_time', 'exit_time',
+            'entry_time', 'exit_time', 'auto_closed',
             'marked_by',
             # 'room', # Include if added to User or a related model
         ]
-        read_only_fields = ['entry_time', 'exit_time', 'marked_by'] # marked_by is set by view
+        read_only_fields = ['entry_time', 'exit_time', 'auto_closed', 'marked_by'] # marked_by is set by view
+
+
+class CurfewViolationSerializer(serializers.ModelSerializer):
+    student = UserSimpleSerializer(read_only=True)
+    rule_name = serializers.CharField(source='rule.name', read_only=True, default=None)
+
+    class Meta:
+        model = CurfewViolation
+        fields = [
+            'id', 'student', 'kind', 'rule_name', 'window_start', 'window_end',
+            'left_at', 'returned_at', 'detected_at', 'updated_at',
+        ]
@@ -0,0 +1,117 @@
+from datetime import date, datetime, time
+from datetime import timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from leaves.models import LeaveRequest
+from presence.models import PresenceState
+from users.models import User
+from users.tokens import issue_tokens
+from .curfew import detect_violations
+from .models import CurfewRule, CurfewScanMark, CurfewViolation, HostelAttendance
+
+
+def at(day, hour, minute=0):
+    """2026-03-<day> (the 2nd is a Monday) at hour:minute UTC."""
+    return datetime(2026, 3, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+class CurfewViolationTests(TestCase):
+    def setUp(self):
+        CurfewRule.objects.create(name='Weeknights', starts_at=time(22), ends_at=time(6), grace_minutes=15)
+        CurfewRule.objects.create(name='Saturday', weekday=5, starts_at=time(23, 30), ends_at=time(7), grace_minutes=15)
+        self.students = {
+            name: User.objects.create_user(username=name, password='pass123', role='student')
+            for name in ('late', 'grace', 'away', 'saturday')
+        }
+
+    def stay(self, name, entry, exit=None):
+        return HostelAttendance.objects.create(student=self.students[name], entry_time=entry, exit_time=exit)
+
+    def test_incremental_scan_records_late_and_missing_returns(self):
+        self.stay('late', at(2, 8), at(2, 20))
+        self.stay('late', at(2, 23, 30))
+        self.stay('grace', at(2, 8), at(2, 21))
+        self.stay('grace', at(2, 22, 10))            # back within the grace period
+        self.stay('away', at(2, 8), at(2, 21))
+        PresenceState.objects.create(student=self.students['away'], facility='hostel', is_inside=False, since=at(2, 21))
+        self.stay('saturday', at(7, 8), at(7, 20))
+        self.stay('saturday', at(7, 23))             # Saturday curfew starts at 23:30
+
+        result = detect_violations(now=at(3, 12))
+        self.assertEqual((result.late_returns, result.not_returned), (1, 1))
+        late = CurfewViolation.objects.get(student=self.students['late'])
+        self.assertEqual((late.kind, late.window_start, late.returned_at), ('late_return', at(2, 22), at(2, 23, 30)))
+        away = CurfewViolation.objects.get(student=self.students['away'])
+        self.assertEqual((away.kind, away.returned_at), ('not_returned', None))
+        self.assertEqual(CurfewScanMark.objects.get().last_entry_id, HostelAttendance.objects.order_by('-id')[0].id)
+
+        # Nothing new: no log rows are read again and nothing is duplicated
+        result = detect_violations(now=at(3, 13))
+        self.assertEqual(result.rows_scanned, 0)
+        self.assertEqual(CurfewViolation.objects.count(), 2)
+
+        # The missing student comes back two nights later
+        PresenceState.objects.filter(student=self.students['away']).update(is_inside=True, since=at(4, 23))
+        self.stay('away', at(4, 23))
+        result = detect_violations(now=at(5, 12))
+        windows = CurfewViolation.objects.filter(student=self.students['away']).order_by('window_start')
+        self.assertEqual([(v.window_start, v.kind, v.returned_at) for v in windows], [
+            (at(2, 22), 'late_return', at(4, 23)),
+            (at(3, 22), 'late_return', at(4, 23)),
+            (at(4, 22), 'late_return', at(4, 23)),
+        ])
+
+    def test_long_absences_only_evaluate_nights_since_the_last_run(self):
+        self.stay('away', at(2, 8), at(2, 21))
+        PresenceState.objects.create(student=self.students['away'], facility='hostel', is_inside=False, since=at(2, 21))
+        self.assertEqual(detect_violations(now=at(12, 12)).not_returned, 10)
+
+        # The next run only looks at the night after the previous run
+        self.assertEqual(detect_violations(now=at(13, 12)).not_returned, 1)
+        self.assertEqual(CurfewViolation.objects.count(), 11)
+
+    def test_nights_on_approved_leave_are_not_violations(self):
+        self.stay('away', at(2, 8), at(2, 21))
+        PresenceState.objects.create(student=self.students['away'], facility='hostel', is_inside=False, since=at(2, 21))
+        LeaveRequest.objects.create(
+            user=self.students['away'], start_date=date(2026, 3, 2), end_date=date(2026, 3, 2), reason='Home', status='approved',
+        )
+
+        detect_violations(now=at(4, 12))
+        # The night of the 2nd is covered by the leave, the night of the 3rd is not
+        self.assertEqual(list(CurfewViolation.objects.values_list('window_start', flat=True)), [at(3, 22)])
+
+    def test_violation_list_and_digest(self):
+        self.stay('late', at(2, 8), at(2, 20))
+        self.stay('late', at(3, 1))
+        detect_violations(now=at(3, 12))
+
+        management = APIClient()
+        management.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(User.objects.create_user(username='admin001', password='pass123', role='admin')).access_token}")
+        url = reverse('hostel-curfew-violations')
+        response = management.get(url, {'date': '2026-03-02', 'kind': 'late_return'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['student']['username'] for row in response.data['results']], ['late'])
+        self.assertEqual(management.get(url, {'date': '2026-03-03'}).data['count'], 0)
+
+        student = APIClient()
+        student.credentials(HTTP_AUTHORIZATION=f"Bearer {issue_tokens(self.students['late']).access_token}")
+        self.assertEqual(student.get(url).status_code, 403)
+
+        out = StringIO()
+        call_command('curfew_digest', date='2026-03-02', stdout=out)
+        self.assertIn('1 violations', out.getvalue())
+        self.assertIn('- late: out 02 Mar 20:00 - 03 Mar 01:00', out.getvalue())
+
+    def test_synthetic_exits_are_not_violations(self):
+        stay = self.stay('away', at(2, 8))
+        HostelAttendance.objects.filter(pk=stay.pk).update(exit_time=at(2, 20), auto_closed=True)
+        PresenceState.objects.create(student=self.students['away'], facility='hostel', is_inside=False, since=at(2, 20), last_event_id=stay.pk)
+        self.stay('away', at(3, 9))
+        result = detect_violations(now=at(3, 12))
+        self.assertEqual((result.late_returns, result.not_returned), (0, 0))
@@ -1,10 +1,11 @@
 # hostel_attendance/urls.py
 
 from django.urls import path
-from .views import HostelEntryView, HostelExitView, HostelAttendanceLogView
+from .views import HostelEntryView, HostelExitView, HostelAttendanceLogView, CurfewViolationListView
 
 urlpatterns = [
     path('entry/', HostelEntryView.as_view(), name='hostel-entry'),
     path('exit/', HostelExitView.as_view(), name='hostel-exit'),
     path('logs/', HostelAttendanceLogView.as_view(), name='hostel-attendance-logs'),
+    path('curfew-violations/', CurfewViolationListView.as_view(), name='hostel-curfew-violations'),
 ]
\ No newline at end of file
@@ -3,10 +3,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination # Import pagination
+from datetime import datetime, time, timedelta
 from django.utils import timezone
-from .models import HostelAttendance
-from .serializers import HostelAttendanceSerializer
+from django.utils.dateparse import parse_date
+from .models import CurfewViolation, HostelAttendance
+from .serializers import CurfewViolationSerializer, HostelAttendanceSerializer
 from users.models import User
+from presence.models import PresenceState
+from presence.services import AlreadyInside, NotInside, record_entry, record_exit
 from .permissions import IsAdminPrincipalOrHiddenSuperuser # Import permission
 
 
@@ -18,12 +22,11 @@ class HostelEntryView(APIView):
         if user.role != 'student':
             return Response({"error": "Only students can mark hostel entry."}, status=status.HTTP_403_FORBIDDEN)
 
-        # Prevent multiple entry logs without exit
-        open_entries = HostelAttendance.objects.filter(student=user, exit_time__isnull=True)
-        if open_entries.exists():
+        # Prevent multiple entry logs without exit; checked against the presence state, not the log
+        try:
+            entry = record_entry(user, PresenceState.HOSTEL, marked_by=user)
+        except AlreadyInside:
             return Response({"error": "You have already marked an entry without an exit. Please mark exit first."}, status=status.HTTP_400_BAD_REQUEST)
-
-        entry = HostelAttendance.objects.create(student=user, marked_by=user)
         serializer = HostelAttendanceSerializer(entry)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -37,15 +40,11 @@ class HostelExitView(APIView):
             return Response({"error": "Only students can mark hostel exit."}, status=status.HTTP_403_FORBIDDEN)
 
         try:
-            # Get the latest entry that doesn't have an exit time for the current student
-            entry = HostelAttendance.objects.filter(student=user, exit_time__isnull=True).latest('entry_time')
-        except HostelAttendance.DoesNotExist:
+            # Closes the open entry the presence state points at
+            entry = record_exit(user, PresenceState.HOSTEL, marked_by=user)
+        except NotInside:
             return Response({"error": "No open entry record found. Please mark entry first."}, status=status.HTTP_400_BAD_REQUEST)
 
-        entry.exit_time = timezone.now()
-        entry.marked_by = user # Ensure marked_by is the user who performs the action
-        entry.save()
-
         serializer = HostelAttendanceSerializer(entry)
         return Response(serializer.data)
 
@@ -63,3 +62,26 @@ class HostelAttendanceLogView(generics.ListAPIView): # Changed from APIView to g
     pagination_class = HostelAttendanceLogPagination # Apply pagination
     
     # The get method is now handled by generics.ListAPIView with queryset and serializer_class
+
+
+class CurfewViolationListView(generics.ListAPIView):
+    """
+    Curfew violations found by `manage.py detect_curfew_violations`, newest window first.
+    Filters: kind, student_id, date (the night the window starts, YYYY-MM-DD).
+    """
+    serializer_class = CurfewViolationSerializer
+    permission_classes = [IsAuthenticated, IsAdminPrincipalOrHiddenSuperuser]
+    pagination_class = HostelAttendanceLogPagination
+
+    def get_queryset(self):
+        queryset = CurfewViolation.objects.select_related('student', 'rule').order_by('-window_start', '-id')
+        params = self.request.query_params
+        if params.get('kind'):
+            queryset = queryset.filter(kind=params['kind'])
+        if params.get('student_id'):
+            queryset = queryset.filter(student_id=params['student_id'])
+        day = parse_date(params.get('date') or '')
+        if day:
+            start = timezone.make_aware(datetime.combine(day, time.min))
+            queryset = queryset.filter(window_start__gte=start, window_start__lt=start + timedelta(days=1))
+        return queryset
@@ -1,11 +1,34 @@
 # leaves/admin.py
 
 from django.contrib import admin
-from .models import LeaveRequest
+from .models import LeaveBalance, LeaveLedgerEntry, LeaveRequest
 
 @admin.register(LeaveRequest)
 class LeaveRequestAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'start_date', 'end_date', 'status', 'applied_at')
     list_filter = ('status', 'start_date', 'end_date')
     search_fields = ('user__username', 'reason')
-    ordering = ('-applied_at',)
\ No newline at end of file
+    ordering = ('-applied_at',)
+
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'year', 'balance', 'updated_at')
+    list_filter = ('year',)
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'year', 'balance', 'updated_at')
+
+    def has_change_permission(self, request, obj=None):
+        # The sum of the user's ledger entries, maintained by leaves.ledger
+        return False
+
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'year', 'kind', 'days', 'leave', 'created_at')
+    list_filter = ('year', 'kind')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user', 'leave')
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -2,4 +2,33 @@ from django.apps import AppConfig
 
 class LeavesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'leaves'
\ No newline at end of file
+    name = 'leaves'
+
+    def ready(self):
+        from core.changes import track_deletions
+        track_deletions(self.get_model('LeaveRequest'), lambda leave: [leave.user_id])
+
+        from core.cache import invalidate_on_change
+        # Caches of LeaveBalance are keyed per owner (UsersConfig.ready())
+        invalidate_on_change(self.get_model('LeaveRequest'))
+
+        from django.db.models.signals import post_save, pre_save
+        from .calendar import expand
+        from .services import excuse_on_leave
+
+        def expand_saved(sender, instance, **kwargs):
+            # Keeps the leave calendar (LeaveDay) in step with every save, admin included
+            expand([instance])
+
+        post_save.connect(expand_saved, sender=self.get_model('LeaveRequest'), weak=False, dispatch_uid='leaves.calendar.expand')
+
+        def excuse_marked_absence(sender, instance, raw=False, **kwargs):
+            # An absence first marked on a day of leave approved earlier is excused as it is
+            # written. Saves of an existing record are a re-mark, which is kept as marked
+            if not raw and instance._state.adding:
+                excuse_on_leave([instance])
+
+        pre_save.connect(
+            excuse_marked_absence, sender='attendance.AttendanceRecord',
+            weak=False, dispatch_uid='leaves.services.excuse_on_leave',
+        )
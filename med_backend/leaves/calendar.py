@@ -0,0 +1,141 @@
+# leaves/calendar.py
+
+"""
+The leave calendar: who is away on which day.
+
+A leave request is a date range, and "who is on leave on day X" over ranges needs a scan
+of every request starting before X. LeaveDay expands each pending or approved request
+into one row per day instead, so a day, a month or a person's overlap check is a range
+lookup on an index:
+
+- (day, status): calendar views, for the whole college or narrowed to a batch or role
+- (user, day): a user's overlapping requests
+
+expand() rewrites the rows of the given requests from their current dates and status.
+LeavesConfig.ready() calls it whenever a LeaveRequest is saved; code changing requests with
+queryset.update() (decide_leaves) calls it itself, and bumps the owners' cache generations. Rejected requests have no rows.
+"""
+
+import calendar as month_calendar
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from attendance.models import Batch
+from core.cache import bump_generations
+from core.events import publish_on_commit
+from timetable.models import ClassSchedule
+from .ledger import InsufficientBalance
+from .models import LeaveDay, LeaveRequest
+from .services import apply_leave_status
+
+ON_CALENDAR = ('pending', 'approved')
+DECISIONS = ('approved', 'rejected')
+
+
+def expand(leaves):
+    """Rewrite the LeaveDay rows of `leaves` (LeaveRequest instances)."""
+    leaves = list(leaves)
+    rows = []
+    for leave in leaves:
+        if leave.status not in ON_CALENDAR:
+            continue
+        day = leave.start_date
+        while day <= leave.end_date:
+            rows.append(LeaveDay(leave_id=leave.pk, user_id=leave.user_id, day=day, status=leave.status))
+            day += timedelta(days=1)
+    with transaction.atomic():
+        LeaveDay.objects.filter(leave__in=[leave.pk for leave in leaves]).delete()
+        LeaveDay.objects.bulk_create(rows, batch_size=1000)
+
+
+def overlapping(user, start_date, end_date):
+    """The user's pending or approved requests with a day in [start_date, end_date]."""
+    days = LeaveDay.objects.filter(user=user, day__range=(start_date, end_date))
+    return LeaveRequest.objects.filter(pk__in=days.values('leave_id'))
+
+
+def batch_members(batch_id):
+    """Students and staff of a batch: members, users assigned to it and its timetable's teachers."""
+    return (
+        Q(user__batch_id=batch_id)
+        | Q(user_id__in=Batch.students.through.objects.filter(batch_id=batch_id).values('user_id'))
+        | Q(user_id__in=ClassSchedule.objects.filter(batch_id=batch_id, teacher__isnull=False).values('teacher_id'))
+    )
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, month_calendar.monthrange(year, month)[1])
+
+
+def leave_calendar(start_date, end_date, batch_id=None, role=None, status=None):
+    """
+    Everyone on leave between start_date and end_date, in one query, as
+    [{'date', 'on_leave': [{'user_id', 'username', 'role', 'leave_request_id', 'status'}]}]
+    for every day of the range, days without leave included.
+    """
+    rows = LeaveDay.objects.filter(day__range=(start_date, end_date))
+    if status:
+        rows = rows.filter(status=status)
+    if batch_id:
+        rows = rows.filter(batch_members(batch_id))
+    if role:
+        rows = rows.filter(user__role=role)
+    rows = rows.order_by('day', 'user__username').values_list(
+        'day', 'user_id', 'user__username', 'user__role', 'leave_id', 'status',
+    )
+
+    by_day = {}
+    for day, user_id, username, user_role, leave_id, leave_status in rows:
+        by_day.setdefault(day, []).append({
+            'user_id': user_id, 'username': username, 'role': user_role,
+            'leave_request_id': leave_id, 'status': leave_status,
+        })
+    days, day = [], start_date
+    while day <= end_date:
+        days.append({'date': day, 'on_leave': by_day.get(day, [])})
+        day += timedelta(days=1)
+    return days
+
+
+def decide_leaves(leaves, decision):
+    """
+    Approve or reject many pending requests in one transaction: one UPDATE of their
+    status, the calendar rows rewritten in bulk, then each request's balance debit and
+    attendance excuse (leaves.services). A request whose days the user no longer has is
+    put back to pending. Returns (ids decided, ids left pending for lack of balance).
+    """
+    with transaction.atomic():
+        pending = list(
+            LeaveRequest.objects.select_for_update()
+            .filter(pk__in=[leave.pk for leave in leaves], status='pending')
+            .select_related('user')
+        )
+        LeaveRequest.objects.filter(pk__in=[leave.pk for leave in pending]).update(
+            status=decision, updated_at=timezone.now(),
+        )
+        for leave in pending:
+            leave.status = decision
+        bump_generations(LeaveRequest, [leave.user_id for leave in pending])
+        expand(pending)
+        decided, short = [], []
+        for leave in pending:
+            try:
+                with transaction.atomic():
+                    apply_leave_status(leave, was_approved=False)
+            except InsufficientBalance:
+                leave.status = 'pending'
+                short.append(leave)
+                continue
+            decided.append(leave)
+            publish_on_commit([leave.user_id], 'leave.status', {
+                'leave_request_id': leave.id,
+                'status': decision,
+                'previous_status': 'pending',
+            })
+        if short:
+            LeaveRequest.objects.filter(pk__in=[leave.pk for leave in short]).update(status='pending')
+            expand(short)
+    return [leave.pk for leave in decided], [leave.pk for leave in short]
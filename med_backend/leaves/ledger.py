@@ -0,0 +1,176 @@
+# leaves/ledger.py
+
+"""
+Leave balances as a ledger.
+
+Every change to a user's leave days is a LeaveLedgerEntry for a calendar year:
+
+- accrual: the yearly allowance for the user's role (LEAVE_ALLOWANCE_DAYS), posted when
+  the year's balance is opened, by rollover() or on the user's first leave of the year
+- carry_over: unused days brought from the previous year, up to LEAVE_CARRY_OVER_DAYS,
+  posted by rollover() once that year is over; a year opened early (a December approval of
+  a leave across New Year) gets its carry-over then as well
+- debit: the days of a leave when it is approved, split per year for a leave across
+  New Year
+- reversal: the opposite of a leave's entries when it stops being approved
+
+LeaveBalance holds the sum of a user's entries per year, updated in the same transaction
+as the entries, so "how many days are left" is one row read. A debit is checked against
+it under the row lock (debit_leave()), so two approvals at once cannot overdraw it.
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.cache import bump_generations
+from .models import LeaveBalance, LeaveLedgerEntry
+
+DEFAULT_ALLOWANCE_DAYS = 20
+DEFAULT_CARRY_OVER_DAYS = 0
+
+
+class InsufficientBalance(Exception):
+    """A debit is larger than what is left of a year's balance."""
+
+    def __init__(self, requested, left):
+        super().__init__(f'requested {requested}, left {left}')
+        self.requested = requested
+        self.left = left
+
+
+def allowance(role):
+    """Leave days a user of `role` accrues each year."""
+    return getattr(settings, 'LEAVE_ALLOWANCE_DAYS', {}).get(role, DEFAULT_ALLOWANCE_DAYS)
+
+
+def leave_days(start_date, end_date):
+    """Calendar days of a leave, per year: {year: days}."""
+    days, day = Counter(), start_date
+    while day <= end_date:
+        year_end = min(end_date, date(day.year, 12, 31))
+        days[day.year] += (year_end - day).days + 1
+        day = year_end + timedelta(days=1)
+    return dict(days)
+
+
+def balances(user, years):
+    """{year: days left} for `years`, in one query. A year not opened yet has the full allowance."""
+    stored = dict(LeaveBalance.objects.filter(user=user, year__in=list(years)).values_list('year', 'balance'))
+    return {year: stored.get(year, allowance(user.role)) for year in years}
+
+
+def current_balance(user):
+    year = timezone.localdate().year
+    return balances(user, [year])[year]
+
+
+def post(user, entries):
+    """Write ledger entries of `user` and move their balances, opening missing years first."""
+    totals = Counter()
+    for entry in entries:
+        totals[entry.year] += entry.days
+    with transaction.atomic():
+        for year in sorted(totals):
+            _open_year(user, year)
+        LeaveLedgerEntry.objects.bulk_create(entries)
+        for year, days in totals.items():
+            if days:
+                LeaveBalance.objects.filter(user=user, year=year).update(
+                    balance=F('balance') + days, updated_at=timezone.now(),
+                )
+        _invalidate([user.pk])
+
+
+def _open_year(user, year):
+    # Locks the row: concurrent approvals for the same user are applied one after the other
+    balance, created = LeaveBalance.objects.select_for_update().get_or_create(
+        user=user, year=year, defaults={'balance': allowance(user.role)},
+    )
+    if created:
+        LeaveLedgerEntry.objects.create(user=user, year=year, kind=LeaveLedgerEntry.ACCRUAL, days=balance.balance)
+    return balance
+
+
+def debit_leave(leave):
+    """Debit the leave's days, per year. Raises InsufficientBalance if a year has too few left."""
+    requested = leave_days(leave.start_date, leave.end_date)
+    with transaction.atomic():
+        # The balance checked when the request was made may have been spent since
+        left = {year: _open_year(leave.user, year).balance for year in sorted(requested)}
+        if any(days > left[year] for year, days in requested.items()):
+            raise InsufficientBalance(requested, left)
+        post(leave.user, [
+            LeaveLedgerEntry(user=leave.user, year=year, kind=LeaveLedgerEntry.DEBIT, days=-days, leave=leave)
+            for year, days in requested.items()
+        ])
+
+
+def reverse_leave(leave):
+    """Cancel whatever the leave's entries add up to, per year."""
+    net = LeaveLedgerEntry.objects.filter(leave=leave).values('year').annotate(days=Sum('days'))
+    post(leave.user, [
+        LeaveLedgerEntry(user=leave.user, year=row['year'], kind=LeaveLedgerEntry.REVERSAL, days=-row['days'], leave=leave)
+        for row in net if row['days']
+    ])
+
+
+def rollover(year):
+    """
+    Open year + 1 for every user with a role: their allowance, plus what is left of `year`
+    up to LEAVE_CARRY_OVER_DAYS. Users whose next year is already open get the carry-over
+    they are owed topped up instead, so it is safe to run again. Returns the number of
+    balances opened or topped up.
+    """
+    next_year = year + 1
+    carry_limit = getattr(settings, 'LEAVE_CARRY_OVER_DAYS', DEFAULT_CARRY_OVER_DAYS)
+    with transaction.atomic():
+        users = (
+            get_user_model().objects.filter(is_active=True).exclude(role__isnull=True).exclude(role='')
+            .values_list('id', 'role')
+        )
+        left = dict(LeaveBalance.objects.filter(year=year).values_list('user_id', 'balance'))
+        opened = set(
+            LeaveBalance.objects.select_for_update().filter(year=next_year).values_list('user_id', flat=True)
+        )
+        carried_before = dict(
+            LeaveLedgerEntry.objects.filter(year=next_year, kind=LeaveLedgerEntry.CARRY_OVER)
+            .values('user_id').annotate(days=Sum('days')).values_list('user_id', 'days')
+        )
+        new_balances, entries, top_ups = [], [], {}
+        for user_id, role in users:
+            accrued = allowance(role)
+            # A user without a balance for `year` took no leave in it
+            carried = min(max(left.get(user_id, accrued), 0), carry_limit)
+            if user_id in opened:
+                carried -= carried_before.get(user_id, 0)
+                if carried:
+                    top_ups.setdefault(carried, []).append(user_id)
+            else:
+                new_balances.append(LeaveBalance(user_id=user_id, year=next_year, balance=accrued + carried))
+                entries.append(LeaveLedgerEntry(user_id=user_id, year=next_year, kind=LeaveLedgerEntry.ACCRUAL, days=accrued))
+            if carried:
+                entries.append(LeaveLedgerEntry(
+                    user_id=user_id, year=next_year, kind=LeaveLedgerEntry.CARRY_OVER, days=carried,
+                ))
+        LeaveBalance.objects.bulk_create(new_balances, batch_size=1000)
+        LeaveLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+        # One UPDATE per distinct top-up, not per user
+        for days, user_ids in top_ups.items():
+            LeaveBalance.objects.filter(user_id__in=user_ids, year=next_year).update(
+                balance=F('balance') + days, updated_at=timezone.now(),
+            )
+        topped_up = [user_id for user_ids in top_ups.values() for user_id in user_ids]
+        _invalidate([*(balance.user_id for balance in new_balances), *topped_up])
+    return len(new_balances) + len(topped_up)
+
+
+def _invalidate(user_ids):
+    # Balances change through update() and bulk_create(), which send no signals. Every
+    # cache of balances is keyed by its owner's generation
+    bump_generations(LeaveBalance, user_ids)
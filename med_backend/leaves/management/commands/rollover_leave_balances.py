@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from leaves.ledger import rollover
+
+
+class Command(BaseCommand):
+    help = (
+        "Open next year's leave balances: each user's yearly allowance plus the days carried "
+        "over from the year given (last year by default). Run it on January 1st."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Year to roll over from (default: last year)')
+
+    def handle(self, *args, **options):
+        year = options['year'] or timezone.localdate().year - 1
+        opened = rollover(year)
+        self.stdout.write(self.style.SUCCESS(f"{opened} leave balances opened for {year + 1}"))
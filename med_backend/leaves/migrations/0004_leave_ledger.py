@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0003_leaverequest_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('balance', models.IntegerField(help_text='Days left; negative when leave was approved beyond the allowance')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'year'), name='leave_one_balance_per_year')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('kind', models.CharField(choices=[('accrual', 'Yearly allowance'), ('carry_over', 'Carried over from last year'), ('debit', 'Approved leave'), ('reversal', 'Leave no longer approved')], max_length=10)),
+                ('days', models.IntegerField(help_text='Positive adds to the balance, negative takes from it')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='leaves.leaverequest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['user', 'year'], name='leave_ledger_user_year_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import migrations
+
+DEFAULT_ALLOWANCE_DAYS = 20
+
+
+def seed(apps, schema_editor):
+    """
+    Open a balance for every (user, year) with approved leave, and debit those leaves, as
+    leaves.ledger does on approval. Other years are opened on demand or by rollover.
+    """
+    LeaveRequest = apps.get_model('leaves', 'LeaveRequest')
+    LeaveBalance = apps.get_model('leaves', 'LeaveBalance')
+    LeaveLedgerEntry = apps.get_model('leaves', 'LeaveLedgerEntry')
+    allowances = getattr(settings, 'LEAVE_ALLOWANCE_DAYS', {})
+
+    debits, roles = defaultdict(list), {}
+    for leave in LeaveRequest.objects.filter(status='approved').select_related('user'):
+        roles[leave.user_id] = leave.user.role
+        day = leave.start_date
+        while day <= leave.end_date:
+            year_end = min(leave.end_date, date(day.year, 12, 31))
+            debits[leave.user_id, day.year].append((leave.pk, (year_end - day).days + 1))
+            day = year_end + timedelta(days=1)
+
+    balances, entries = [], []
+    for (user_id, year), leaves in debits.items():
+        accrued = allowances.get(roles[user_id], DEFAULT_ALLOWANCE_DAYS)
+        balances.append(LeaveBalance(user_id=user_id, year=year, balance=accrued - sum(days for _, days in leaves)))
+        entries.append(LeaveLedgerEntry(user_id=user_id, year=year, kind='accrual', days=accrued))
+        entries += [
+            LeaveLedgerEntry(user_id=user_id, year=year, kind='debit', days=-days, leave_id=leave_id)
+            for leave_id, days in leaves
+        ]
+    LeaveBalance.objects.bulk_create(balances, batch_size=1000)
+    LeaveLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0004_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
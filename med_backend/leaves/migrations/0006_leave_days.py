@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0005_seed_leave_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=10)),
+                ('leave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='leaves.leaverequest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_days', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'status'], name='leave_day_idx'), models.Index(fields=['user', 'day'], name='leave_day_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('leave', 'day'), name='leave_day_unique')],
+            },
+        ),
+    ]
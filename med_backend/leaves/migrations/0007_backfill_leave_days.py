@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """One LeaveDay per day of every pending or approved request, as leaves.calendar.expand does."""
+    LeaveRequest = apps.get_model('leaves', 'LeaveRequest')
+    LeaveDay = apps.get_model('leaves', 'LeaveDay')
+    rows = []
+    for leave in LeaveRequest.objects.filter(status__in=['pending', 'approved']).iterator():
+        day = leave.start_date
+        while day <= leave.end_date:
+            rows.append(LeaveDay(leave_id=leave.pk, user_id=leave.user_id, day=day, status=leave.status))
+            day += timedelta(days=1)
+    LeaveDay.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0006_leave_days'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
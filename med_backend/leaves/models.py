@@ -18,6 +18,82 @@ class LeaveRequest(models.Model):
     reason = models.TextField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     applied_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
-        return f"LeaveRequest({self.user.username}, {self.start_date} to {self.end_date}, {self.status})"
\ No newline at end of file
+        return f"LeaveRequest({self.user.username}, {self.start_date} to {self.end_date}, {self.status})"
+
+
+class LeaveDay(models.Model):
+    """
+    One row per day of a pending or approved leave request, kept in step with the request by
+    leaves.calendar. "Who is on leave on day X" and overlap checks are index lookups on
+    (day) and (user, day) here instead of range scans over LeaveRequest.
+    """
+    leave = models.ForeignKey(LeaveRequest, on_delete=models.CASCADE, related_name='days')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_days')
+    day = models.DateField()
+    status = models.CharField(max_length=10, choices=LeaveRequest.STATUS_CHOICES)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['leave', 'day'], name='leave_day_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'status'], name='leave_day_idx'),
+            models.Index(fields=['user', 'day'], name='leave_day_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} on leave {self.day} ({self.status})"
+
+
+class LeaveBalance(models.Model):
+    """
+    A user's leave days left for a calendar year: the sum of their LeaveLedgerEntry rows for
+    that year, kept as a column by leaves.ledger in the same transaction as each entry.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_balances')
+    year = models.PositiveSmallIntegerField()
+    balance = models.IntegerField(help_text="Days left; negative when leave was approved beyond the allowance")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'year'], name='leave_one_balance_per_year'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.year}: {self.balance} days"
+
+
+class LeaveLedgerEntry(models.Model):
+    """A change to a user's leave balance for a year, in days. Entries are never edited."""
+    ACCRUAL = 'accrual'
+    CARRY_OVER = 'carry_over'
+    DEBIT = 'debit'
+    REVERSAL = 'reversal'
+    KIND_CHOICES = [
+        (ACCRUAL, 'Yearly allowance'),
+        (CARRY_OVER, 'Carried over from last year'),
+        (DEBIT, 'Approved leave'),
+        (REVERSAL, 'Leave no longer approved'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_ledger')
+    year = models.PositiveSmallIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    days = models.IntegerField(help_text="Positive adds to the balance, negative takes from it")
+    leave = models.ForeignKey(
+        LeaveRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['user', 'year'], name='leave_ledger_user_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.year} {self.kind} {self.days:+d}"
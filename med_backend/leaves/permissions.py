@@ -1,6 +1,7 @@
 # leaves/permissions.py
 
 from rest_framework import permissions
+from users.capabilities import Capability, has_any, is_office
 
 class IsOwnerOrAdminPrincipalSuperuser(permissions.BasePermission):
     """
@@ -17,7 +18,7 @@ class IsOwnerOrAdminPrincipalSuperuser(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Allow safe methods for owner and privileged roles
         if request.method in permissions.SAFE_METHODS:
-            return obj.user == request.user or request.user.role in ['admin', 'principal'] or request.user.is_hidden_superuser
+            return obj.user_id == request.user.id or is_office(request.user)
 
         # Allow create for authenticated users
         if request.method == 'POST':
@@ -26,8 +27,8 @@ class IsOwnerOrAdminPrincipalSuperuser(permissions.BasePermission):
         # For status update (PUT/PATCH), enforce role rules
         if request.method in ['PUT', 'PATCH']:
             if obj.user.role == 'principal':
-                return request.user.role == 'admin' or request.user.is_hidden_superuser
+                return has_any(request.user, Capability.ADMIN | Capability.HIDDEN_SUPERUSER)
             else:
-                return request.user.role in ['admin', 'principal'] or request.user.is_hidden_superuser
+                return is_office(request.user)
 
         return False
\ No newline at end of file
@@ -0,0 +1,140 @@
+# leaves/services.py
+
+"""
+What approving a leave request does, and undoes.
+
+Approving a leave request debits its days from the user's balance (see leaves.ledger),
+reversed when it stops being approved (rejected, reset to pending, deleted).
+
+It also marks the student's absences in [start_date, end_date] as excused with a single
+UPDATE, over both kinds of AttendanceRecord: session records (dated by their ClassSession)
+and direct records (their own date). Each excused record keeps the leave in
+excused_by_leave and its previous status in status_before_leave, so the change can be
+undone: when the leave stops being approved, the records it excused get their status back,
+again with one UPDATE. Records a teacher re-marked in the meantime keep the teacher's mark.
+
+Both attendance passes set updated_at, so attendance sync deltas and ?since= change feeds pick the
+records up on the next poll.
+
+Leave is usually approved before the days it covers, when their attendance does not exist
+yet. excuse_on_leave() covers those: records created later as absent on a day of approved
+leave (LeaveDay) are excused as they are written. LeavesConfig.ready() runs it before an
+AttendanceRecord is first saved; the attendance sync, which writes in bulk, calls it
+itself for the records it creates. Changing an existing record is a re-mark, and a teacher
+who sets an excused record back to absent keeps that mark.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord, ClassSession
+from core.cache import bump_generations
+from core.events import publish_on_commit
+from .ledger import debit_leave, reverse_leave
+from .models import LeaveDay
+
+APPROVED = 'approved'
+EXCUSED = 'excused'
+
+# Statuses an approved leave turns into `excused`: the student was not there
+EXCUSABLE_STATUSES = ('absent',)
+
+
+def leave_attendance(leave):
+    """The student's attendance records dated within the leave."""
+    dates = (leave.start_date, leave.end_date)
+    return AttendanceRecord.objects.filter(
+        Q(class_session__in=ClassSession.objects.filter(date__range=dates)) | Q(class_session__isnull=True, date__range=dates),
+        student_id=leave.user_id,
+    )
+
+
+def excuse_attendance(leave):
+    """Excuse the absences covered by an approved leave. Returns the number of records changed."""
+    excused = leave_attendance(leave).filter(status__in=EXCUSABLE_STATUSES).update(
+        status_before_leave=F('status'),
+        status=EXCUSED,
+        excused_by_leave=leave,
+        updated_at=timezone.now(),
+    )
+    if excused:
+        bump_generations(AttendanceRecord, [leave.user_id])
+        publish_on_commit([leave.user_id], 'attendance.excused', {
+            'leave_request_id': leave.id, 'excused': excused,
+        })
+    return excused
+
+
+def record_date(record):
+    return record.class_session.date if record.class_session_id else record.date
+
+
+def excuse_on_leave(records):
+    """
+    Excuse the absences among `records` (new AttendanceRecord instances, before they are
+    saved) that fall on a day of approved leave, in one query. Returns the records changed.
+    """
+    absences = [
+        (record, record_date(record)) for record in records
+        if record.status in EXCUSABLE_STATUSES and record.student_id
+    ]
+    absences = [(record, day) for record, day in absences if day is not None]
+    if not absences:
+        return []
+    on_leave = dict(
+        ((user_id, day), leave_id)
+        for user_id, day, leave_id in LeaveDay.objects.filter(
+            status=APPROVED,
+            user_id__in={record.student_id for record, _ in absences},
+            day__in={day for _, day in absences},
+        ).values_list('user_id', 'day', 'leave_id')
+    )
+    excused = []
+    for record, day in absences:
+        leave_id = on_leave.get((record.student_id, day))
+        if leave_id is not None:
+            record.status_before_leave = record.status
+            record.status = EXCUSED
+            record.excused_by_leave_id = leave_id
+            excused.append(record)
+    return excused
+
+
+def restore_attendance(leave):
+    """Undo excuse_attendance(). Returns the number of records given their status back."""
+    restored = AttendanceRecord.objects.filter(excused_by_leave=leave).update(
+        # A record re-marked since it was excused keeps its new status
+        status=Case(When(status=EXCUSED, then=F('status_before_leave')), default=F('status')),
+        status_before_leave=Value(''),
+        excused_by_leave=None,
+        updated_at=timezone.now(),
+    )
+    if restored:
+        bump_generations(AttendanceRecord, [leave.user_id])
+        publish_on_commit([leave.user_id], 'attendance.unexcused', {
+            'leave_request_id': leave.id, 'restored': restored,
+        })
+    return restored
+
+
+def apply_leave_status(leave, was_approved):
+    """
+    Bring the attendance excused by `leave` and the days debited for it (leaves.ledger) in
+    line with its current status and dates, after it was saved. `was_approved` is whether
+    it was approved before the change.
+    """
+    with transaction.atomic():
+        if was_approved:
+            # Dates may have moved: undo, then apply afresh
+            withdraw_leave(leave)
+        if leave.status == APPROVED:
+            excuse_attendance(leave)
+            debit_leave(leave)
+
+
+def withdraw_leave(leave):
+    """Undo everything approving `leave` did, before it is rejected or deleted."""
+    with transaction.atomic():
+        restore_attendance(leave)
+        reverse_leave(leave)
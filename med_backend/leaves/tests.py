@@ -1,11 +1,21 @@
-from django.test import TestCase
+from django.db import connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import AccessToken
 from users.models import User
-from leaves.models import LeaveRequest
+from leaves.ledger import leave_days, rollover
+from leaves.models import LeaveBalance, LeaveDay, LeaveLedgerEntry, LeaveRequest
+from timetable.models import ClassSchedule
+from attendance.models import AttendanceRecord, Batch, ClassSession
+import uuid
 from datetime import date
+from io import StringIO
+
+from django.utils import timezone
 
 class LeaveRequestTests(TestCase):
     def setUp(self):
@@ -70,4 +80,307 @@ class LeaveRequestTests(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.principal_token}')
         url = reverse('leave-detail', kwargs={'pk': principal_leave.id})
         response = self.client.patch(url, {'status': 'approved'})
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LeaveAttendanceTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.admin = User.objects.create_user(username='admin001', password='admin123', role='admin')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        batch = Batch.objects.create(name='MBBS 1st Year A')
+        batch.students.add(self.student)
+
+        def session_record(day, record_status):
+            session = ClassSession.objects.create(batch=batch, teacher=self.teacher, date=day)
+            return AttendanceRecord.objects.create(student=self.student, class_session=session, status=record_status)
+
+        def direct_record(day, record_status):
+            return AttendanceRecord.objects.create(student=self.student, date=day, subject='Anatomy', status=record_status)
+
+        self.absent_session = session_record(date(2025, 6, 2), 'absent')
+        self.absent_direct = direct_record(date(2025, 6, 3), 'absent')
+        self.present = direct_record(date(2025, 6, 1), 'present')
+        self.outside = session_record(date(2025, 6, 5), 'absent')
+        self.leave = LeaveRequest.objects.create(
+            user=self.student, start_date=date(2025, 6, 1), end_date=date(2025, 6, 3), reason="Medical",
+        )
+        self.url = reverse('leave-detail', kwargs={'pk': self.leave.id})
+
+    def statuses(self):
+        return {
+            record.pk: record.status
+            for record in AttendanceRecord.objects.filter(student=self.student)
+        }
+
+    def test_approval_excuses_absences_in_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'status': 'approved'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "attendance_attendancerecord"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(self.statuses(), {
+            self.absent_session.pk: 'excused',
+            self.absent_direct.pk: 'excused',
+            self.present.pk: 'present',
+            self.outside.pk: 'absent',
+        })
+        self.assertEqual(
+            set(self.leave.excused_attendance.values_list('pk', flat=True)),
+            {self.absent_session.pk, self.absent_direct.pk},
+        )
+
+    def test_rejection_restores_the_previous_status(self):
+        self.client.patch(self.url, {'status': 'approved'})
+        # A teacher re-marks one of the excused records in the meantime
+        AttendanceRecord.objects.filter(pk=self.absent_direct.pk).update(status='late')
+
+        self.client.patch(self.url, {'status': 'rejected'})
+        self.assertEqual(self.statuses(), {
+            self.absent_session.pk: 'absent',
+            self.absent_direct.pk: 'late',
+            self.present.pk: 'present',
+            self.outside.pk: 'absent',
+        })
+        self.assertFalse(self.leave.excused_attendance.exists())
+        self.assertFalse(AttendanceRecord.objects.exclude(status_before_leave='').exists())
+
+    def test_moving_an_approved_leave_moves_the_excuse(self):
+        self.client.patch(self.url, {'status': 'approved'})
+        response = self.client.patch(self.url, {'start_date': '2025-06-03', 'end_date': '2025-06-05'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.statuses(), {
+            self.absent_session.pk: 'absent',
+            self.absent_direct.pk: 'excused',
+            self.present.pk: 'present',
+            self.outside.pk: 'excused',
+        })
+
+    def test_absences_marked_during_approved_leave_are_excused(self):
+        self.client.patch(self.url, {'status': 'approved'})
+        marked = AttendanceRecord.objects.create(student=self.student, date=date(2025, 6, 1), subject='Physiology', status='absent')
+        self.assertEqual((marked.status, marked.excused_by_leave_id, marked.status_before_leave), ('excused', self.leave.id, 'absent'))
+
+        # Marked through the offline sync, which writes in bulk
+        session = ClassSession.objects.create(batch=self.absent_session.class_session.batch, teacher=self.teacher, date=date(2025, 6, 3))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.teacher)}')
+        response = self.client.post(reverse('attendance-sync'), {'mutations': [{
+            'client_id': str(uuid.uuid4()), 'student_id': self.student.id,
+            'class_session_id': session.id, 'status': 'absent', 'marked_at': timezone.now().isoformat(),
+        }]}, format='json')
+        synced = AttendanceRecord.objects.get(pk=response.data['results'][0]['record_id'])
+        self.assertEqual((synced.status, synced.excused_by_leave_id), ('excused', self.leave.id))
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        self.client.patch(self.url, {'status': 'rejected'})
+        self.assertEqual(self.statuses()[marked.pk], 'absent')
+
+    def test_a_teacher_can_mark_an_excused_record_absent_again(self):
+        self.client.patch(self.url, {'status': 'approved'})
+        self.assertEqual(self.statuses()[self.absent_session.pk], 'excused')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.teacher)}')
+        response = self.client.patch(reverse('attendance-detail', args=[self.absent_session.pk]), {'status': 'absent'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statuses()[self.absent_session.pk], 'absent')
+
+
+class LeaveLedgerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+        self.admin = User.objects.create_user(username='admin001', password='admin123', role='admin')
+        self.year = timezone.localdate().year
+        self.leave = LeaveRequest.objects.create(
+            user=self.student, start_date=date(self.year, 6, 1), end_date=date(self.year, 6, 3), reason="Medical",
+        )
+
+    def as_user(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def set_status(self, leave, value):
+        self.as_user(self.admin)
+        return self.client.patch(reverse('leave-detail', kwargs={'pk': leave.id}), {'status': value})
+
+    def balance(self, year=None):
+        return LeaveBalance.objects.get(user=self.student, year=year or self.year).balance
+
+    def test_approval_debits_days_and_rejection_reverses_them(self):
+        self.assertEqual(self.set_status(self.leave, 'approved').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.balance(), 17)
+        self.assertEqual(
+            list(LeaveLedgerEntry.objects.filter(user=self.student).values_list('kind', 'days')),
+            [('accrual', 20), ('debit', -3)],
+        )
+
+        self.as_user(self.student)
+        self.assertEqual(self.client.get('/api/users/me/').data['leaves_remaining'], 17)
+
+        self.set_status(self.leave, 'rejected')
+        self.assertEqual(self.balance(), 20)
+        self.as_user(self.student)
+        self.assertEqual(self.client.get('/api/users/me/').data['leaves_remaining'], 20)
+
+    def test_requests_beyond_the_balance_are_refused(self):
+        self.set_status(self.leave, 'approved')
+        self.as_user(self.student)
+        data = {'start_date': f'{self.year}-07-01', 'end_date': f'{self.year}-07-18', 'reason': 'Long trip'}
+        response = self.client.post(reverse('leave-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Insufficient leave balance')
+
+        data['end_date'] = f'{self.year}-07-17'
+        self.assertEqual(self.client.post(reverse('leave-list'), data).status_code, status.HTTP_201_CREATED)
+
+    def test_a_leave_across_new_year_is_split(self):
+        self.assertEqual(leave_days(date(2025, 12, 30), date(2026, 1, 2)), {2025: 2, 2026: 2})
+        leave = LeaveRequest.objects.create(
+            user=self.student, start_date=date(2025, 12, 30), end_date=date(2026, 1, 2), reason="Travel",
+        )
+        self.set_status(leave, 'approved')
+        self.assertEqual((self.balance(2025), self.balance(2026)), (18, 18))
+
+    @override_settings(LEAVE_CARRY_OVER_DAYS=5)
+    def test_rollover_opens_next_year_in_bulk(self):
+        self.set_status(self.leave, 'approved')
+        self.set_status(
+            LeaveRequest.objects.create(
+                user=self.admin, start_date=date(self.year, 3, 1), end_date=date(self.year, 3, 18), reason="Surgery",
+            ),
+            'approved',
+        )
+        out = StringIO()
+        call_command('rollover_leave_balances', '--year', str(self.year), stdout=out)
+        self.assertIn(f'2 leave balances opened for {self.year + 1}', out.getvalue())
+        # 17 left: 5 carried over; 2 left: 2 carried over
+        self.assertEqual(self.balance(self.year + 1), 25)
+        self.assertEqual(LeaveBalance.objects.get(user=self.admin, year=self.year + 1).balance, 22)
+        self.assertEqual(rollover(self.year), 0)
+
+    @override_settings(LEAVE_CARRY_OVER_DAYS=5)
+    def test_rollover_tops_up_a_year_opened_early(self):
+        self.set_status(self.leave, 'approved')
+        across = LeaveRequest.objects.create(
+            user=self.student, start_date=date(self.year, 12, 31), end_date=date(self.year + 1, 1, 2), reason="Travel",
+        )
+        self.set_status(across, 'approved')
+        self.assertEqual(self.balance(self.year + 1), 18)
+
+        # 16 left: 5 carried over to the year the approval opened
+        self.assertEqual(rollover(self.year), 2)
+        self.assertEqual(self.balance(self.year + 1), 23)
+        self.assertEqual(rollover(self.year), 0)
+        self.assertEqual(self.balance(self.year + 1), 23)
+
+    def test_approvals_cannot_overdraw_the_balance(self):
+        # Both requested while the balance covered each of them
+        long_leave = LeaveRequest.objects.create(
+            user=self.student, start_date=date(self.year, 7, 1), end_date=date(self.year, 7, 18), reason="Trip",
+        )
+        self.set_status(self.leave, 'approved')
+        response = self.set_status(long_leave, 'approved')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Insufficient leave balance')
+        long_leave.refresh_from_db()
+        self.assertEqual(long_leave.status, 'pending')
+        self.assertEqual(self.balance(), 17)
+
+        response = self.client.post(reverse('leave-decide'), {'ids': [long_leave.id], 'status': 'approved'}, format='json')
+        self.assertEqual(response.data['decided'], [])
+        self.assertEqual(response.data['skipped'], [{'id': long_leave.id, 'reason': 'Insufficient leave balance.'}])
+        self.assertEqual(set(LeaveDay.objects.filter(leave=long_leave).values_list('status', flat=True)), {'pending'})
+        self.assertEqual(self.balance(), 17)
+
+
+class LeaveCalendarTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.batch = Batch.objects.create(name='MBBS 1st Year A')
+        self.member = User.objects.create_user(username='student001', password='pass123', role='student')
+        self.batch.students.add(self.member)
+        self.assigned = User.objects.create_user(username='student002', password='pass123', role='student', batch=self.batch)
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        ClassSchedule.objects.create(
+            batch=self.batch, day='Monday', start_time='09:00', end_time='10:00', subject='Anatomy', teacher=self.teacher,
+        )
+        self.outsider = User.objects.create_user(username='student003', password='pass123', role='student')
+        self.principal = User.objects.create_user(username='principal001', password='pass123', role='principal')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.principal)}')
+
+        def leave(user, start, end, leave_status='pending'):
+            return LeaveRequest.objects.create(
+                user=user, start_date=date(2025, 6, start), end_date=date(2025, 6, end), reason='Away', status=leave_status,
+            )
+
+        self.member_leave = leave(self.member, 1, 3, 'approved')
+        self.assigned_leave = leave(self.assigned, 2, 2)
+        self.teacher_leave = leave(self.teacher, 2, 5)
+        leave(self.outsider, 2, 2, 'approved')
+        leave(self.member, 10, 12, 'rejected')
+        self.principal_leave = leave(self.principal, 20, 21)
+
+    def test_saved_requests_are_expanded_per_day(self):
+        self.assertEqual(
+            list(LeaveDay.objects.filter(leave=self.member_leave).values_list('day', flat=True)),
+            [date(2025, 6, 1), date(2025, 6, 2), date(2025, 6, 3)],
+        )
+        self.assertFalse(LeaveDay.objects.filter(user=self.member, day__gte=date(2025, 6, 10)).exists())
+
+        self.member_leave.status = 'rejected'
+        self.member_leave.save()
+        self.assertFalse(self.member_leave.days.exists())
+
+    def test_month_view_of_a_batch_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('leave-calendar'), {'month': '2025-06', 'batch': self.batch.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([q for q in queries.captured_queries if 'leaves_leaveday' in q['sql']]), 1)
+
+        days = {row['date']: row['on_leave'] for row in response.data['days']}
+        self.assertEqual(len(days), 30)
+        self.assertEqual(
+            [(entry['username'], entry['status']) for entry in days[date(2025, 6, 2)]],
+            [('student001', 'approved'), ('student002', 'pending'), ('teacher001', 'pending')],
+        )
+        self.assertEqual([entry['username'] for entry in days[date(2025, 6, 5)]], ['teacher001'])
+
+        response = self.client.get(reverse('leave-calendar'), {'date': '2025-06-02', 'role': 'student', 'status': 'approved'})
+        self.assertEqual(
+            [entry['username'] for entry in response.data['days'][0]['on_leave']], ['student001', 'student003'],
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.member)}')
+        self.assertEqual(self.client.get(reverse('leave-calendar')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_overlaps_are_found_on_the_calendar(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.member)}')
+        data = {'start_date': '2025-06-03', 'end_date': '2025-06-04', 'reason': 'Again'}
+        response = self.client.post(reverse('leave-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([int(leave['id']) for leave in response.data['existing_leaves']], [self.member_leave.id])
+        data['start_date'] = '2025-06-04'
+        self.assertEqual(self.client.post(reverse('leave-list'), data).status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_decisions(self):
+        ids = [self.assigned_leave.id, self.teacher_leave.id, self.principal_leave.id, self.member_leave.id, 9999]
+        response = self.client.post(reverse('leave-decide'), {'ids': ids, 'status': 'approved'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['decided'], sorted([self.assigned_leave.id, self.teacher_leave.id]))
+        self.assertEqual(
+            {row['id']: row['reason'] for row in response.data['skipped']},
+            {
+                self.principal_leave.id: "Only admins can decide a principal's leave.",
+                self.member_leave.id: 'Not pending.',
+                9999: 'Not found.',
+            },
+        )
+        self.assertEqual(
+            set(LeaveDay.objects.filter(leave=self.teacher_leave).values_list('status', flat=True)), {'approved'},
+        )
+        self.assertEqual(LeaveBalance.objects.get(user=self.teacher, year=2025).balance, 16)
+
+        response = self.client.post(reverse('leave-decide'), {'ids': [self.teacher_leave.id], 'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,11 +1,29 @@
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import LeaveRequest
 from .serializers import LeaveRequestSerializer
 from users.models import User
+from users.capabilities import Capability, has_any, is_management, is_office
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.exceptions import PermissionDenied # Import PermissionDenied
 from rest_framework import serializers # Import serializers
+from django.db import transaction
+from core.changes import ChangeFeed
+from core.events import publish_on_commit
+from .calendar import DECISIONS, decide_leaves, leave_calendar, month_bounds, overlapping
+from .ledger import InsufficientBalance, balances, leave_days
+from .services import apply_leave_status, excuse_attendance, withdraw_leave
+
+
+def insufficient_balance(short):
+    return Response({
+        "error": "Insufficient leave balance",
+        "details": "The leave is longer than the days the user has left",
+        "requested_days": short.requested,
+        "balance": short.left,
+    }, status=status.HTTP_400_BAD_REQUEST)
 
 
 class IsOwnerOrAdminPrincipalSuperuser(permissions.BasePermission):
@@ -26,7 +44,7 @@ class IsOwnerOrAdminPrincipalSuperuser(permissions.BasePermission):
 
         # Allow safe methods (GET, HEAD, OPTIONS) for owner and privileged roles
         if request.method in permissions.SAFE_METHODS:
-            return obj.user == user or user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False)
+            return obj.user_id == user.id or is_office(user)
 
         # Allow authenticated users to create (POST) their own leave requests
         if view.action == 'create' and request.method == 'POST':
@@ -37,10 +55,10 @@ class IsOwnerOrAdminPrincipalSuperuser(permissions.BasePermission):
             # Check if the object's user is a 'principal'
             if obj.user.role == 'principal':
                 # Only 'admin' or 'hidden_superuser' can approve/reject a 'principal's' leave
-                return user.role == 'admin' or getattr(user, 'is_hidden_superuser', False)
+                return has_any(user, Capability.ADMIN | Capability.HIDDEN_SUPERUSER)
             else:
                 # For all other roles, 'admin', 'principal', or 'hidden_superuser' can modify status
-                return user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False)
+                return is_office(user)
         
         # Deny all other unsafe methods (e.g., PUT/PATCH for non-status fields, DELETE)
         return False
@@ -54,12 +72,24 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         # Optimize queryset with select_related for the 'user' foreign key
-        if user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        if is_office(user):
             # Admin, Principal, Superuser see all
             return self.queryset.select_related('user')
         # All other authenticated users see only their own leaves
         return self.queryset.filter(user=user).select_related('user')
 
+    def list(self, request, *args, **kwargs):
+        # ?since=<token> returns only leave requests changed or deleted after the token
+        feed = ChangeFeed(request)
+        if feed.since is None:
+            return feed.full(super().list(request, *args, **kwargs))
+        user = request.user
+        privileged = is_office(user)
+        return feed.delta(
+            self.get_queryset(), self.get_serializer_class(),
+            owners=None if privileged else [user.id], context=self.get_serializer_context(),
+        )
+
     def perform_create(self, serializer):
         # Enhanced validation for leave request creation
         data = serializer.validated_data
@@ -76,13 +106,8 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
                 "end_date": end_date
             })
         
-        # Check for overlapping leave requests
-        existing_leaves = LeaveRequest.objects.filter(
-            user=self.request.user,
-            start_date__lte=end_date,
-            end_date__gte=start_date,
-            status__in=['pending', 'approved']
-        )
+        # Check for overlapping leave requests, on the leave calendar's (user, day) index
+        existing_leaves = overlapping(self.request.user, start_date, end_date)
         
         if existing_leaves.exists():
             raise serializers.ValidationError({
@@ -91,6 +116,18 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
                 "existing_leaves": LeaveRequestSerializer(existing_leaves, many=True).data
             })
         
+        # One balance row per year the leave falls in
+        requested = leave_days(start_date, end_date)
+        left = balances(self.request.user, requested)
+        short = {year: days for year, days in requested.items() if days > left[year]}
+        if short:
+            raise serializers.ValidationError({
+                "error": "Insufficient leave balance",
+                "details": "The leave is longer than the days you have left",
+                "requested_days": requested,
+                "balance": left,
+            })
+
         # Assign the logged-in user automatically on leave creation
         serializer.save(user=self.request.user)
 
@@ -111,8 +148,26 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # Permissions for status update are already handled by IsOwnerOrAdminPrincipalSuperuser.has_object_permission
+            previous_status = instance.status
             instance.status = status_val
-            instance.save()
+            try:
+                with transaction.atomic():
+                    instance.save()
+                    # Approval debits the leave's days and excuses the absences in its range;
+                    # leaving `approved` undoes both
+                    if status_val != previous_status:
+                        apply_leave_status(instance, was_approved=previous_status == 'approved')
+                    elif status_val == 'approved':
+                        # Approving again excuses absences marked since the first approval
+                        excuse_attendance(instance)
+            except InsufficientBalance as short:
+                return insufficient_balance(short)
+            if status_val != previous_status:
+                publish_on_commit([instance.user_id], 'leave.status', {
+                    'leave_request_id': instance.id,
+                    'status': status_val,
+                    'previous_status': previous_status,
+                })
             serializer = self.get_serializer(instance) # Serialize the updated instance
             return Response({
                 "message": f"Leave request status updated to {status_val}",
@@ -121,7 +176,7 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         else:
             # Prevent non-status field updates for non-privileged users
             user = request.user
-            if not (user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal']):
+            if not is_management(user):
                 return Response({
                     'error': 'Insufficient permissions',
                     'details': 'Only status can be updated by non-privileged users via this endpoint',
@@ -132,7 +187,13 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
             partial = kwargs.pop('partial', False)
             serializer = self.get_serializer(instance, data=request.data, partial=partial)
             serializer.is_valid(raise_exception=True)
-            self.perform_update(serializer)
+            was_approved = instance.status == 'approved'
+            try:
+                with transaction.atomic():
+                    self.perform_update(serializer)
+                    apply_leave_status(serializer.instance, was_approved=was_approved)
+            except InsufficientBalance as short:
+                return insufficient_balance(short)
             return Response({
                 "message": "Leave request updated successfully",
                 "leave_request": serializer.data
@@ -140,6 +201,86 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object() # This calls has_object_permission for destroy actions
-        self.perform_destroy(instance)
+        with transaction.atomic():
+            withdraw_leave(instance)
+            self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Who is on leave, per day: ?month=YYYY-MM (this month by default) or ?date=YYYY-MM-DD
+        for a single day, narrowed by ?batch=<id> (its students, assigned users and timetable
+        teachers), ?role= and ?status=pending|approved. Served from LeaveDay in one query.
+        """
+        if not is_office(request.user):
+            raise PermissionDenied("Only admins and principals can view the leave calendar.")
+        params = request.query_params
+        if params.get('date'):
+            day = parse_date(params['date'])
+            if day is None:
+                return Response({"error": "Invalid date", "details": "Use YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+            start_date = end_date = day
+        else:
+            try:
+                year, month = map(int, (params.get('month') or timezone.localdate().strftime('%Y-%m')).split('-'))
+                start_date, end_date = month_bounds(year, month)
+            except ValueError:
+                return Response({"error": "Invalid month", "details": "Use YYYY-MM"}, status=status.HTTP_400_BAD_REQUEST)
+        if params.get('batch') and not params['batch'].isdigit():
+            return Response({"error": "Invalid batch", "details": "Use a batch id"}, status=status.HTTP_400_BAD_REQUEST)
+        if params.get('status') and params['status'] not in ('pending', 'approved'):
+            return Response({"error": "Invalid status", "details": "Use pending or approved"}, status=status.HTTP_400_BAD_REQUEST)
+
+        days = leave_calendar(
+            start_date, end_date,
+            batch_id=params.get('batch'), role=params.get('role'), status=params.get('status'),
+        )
+        return Response({'start_date': start_date, 'end_date': end_date, 'days': days})
+
+    @action(detail=False, methods=['post'])
+    def decide(self, request):
+        """
+        Approve or reject many pending requests at once: {"ids": [...], "status": "approved"|"rejected"}.
+        All decisions are made in one transaction; requests the user may not decide, that are
+        no longer pending, or whose days are no longer covered by the balance are returned as
+        skipped (the last stay pending).
+        """
+        user = request.user
+        if not is_office(user):
+            raise PermissionDenied("Only admins and principals can decide leave requests.")
+        ids, decision = request.data.get('ids'), request.data.get('status')
+        if decision not in DECISIONS:
+            return Response({
+                'error': 'Invalid status value',
+                'details': f'Status must be one of: {", ".join(DECISIONS)}',
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(ids, list) or not ids or not all(isinstance(leave_id, int) for leave_id in ids):
+            return Response({'error': 'ids must be a non-empty list of leave request ids.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        leaves = LeaveRequest.objects.filter(pk__in=ids).select_related('user')
+        allowed, skipped = [], {}
+        for leave in leaves:
+            # As in IsOwnerOrAdminPrincipalSuperuser: only admins decide a principal's leave
+            if leave.user.role == 'principal' and not has_any(user, Capability.ADMIN | Capability.HIDDEN_SUPERUSER):
+                skipped[leave.pk] = "Only admins can decide a principal's leave."
+            else:
+                allowed.append(leave)
+        decided, short = decide_leaves(allowed, decision)
+        decided, short = set(decided), set(short)
+        for leave in allowed:
+            if leave.pk in short:
+                skipped[leave.pk] = 'Insufficient leave balance.'
+            elif leave.pk not in decided:
+                skipped[leave.pk] = 'Not pending.'
+        found = {leave.pk for leave in leaves}
+        for leave_id in ids:
+            if leave_id not in found:
+                skipped[leave_id] = 'Not found.'
+
+        return Response({
+            'message': f'{len(decided)} leave requests {decision}',
+            'decided': sorted(decided),
+            'skipped': [{'id': leave_id, 'reason': reason} for leave_id, reason in skipped.items()],
+        })
@@ -2,4 +2,11 @@ from django.apps import AppConfig
 
 class LibraryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'library'
\ No newline at end of file
+    name = 'library'
+
+    def ready(self):
+        from core.changes import track_deletions
+        track_deletions(self.get_model('Borrow'), lambda borrow: [borrow.user_id])
+
+        from core.cache import invalidate_on_change
+        invalidate_on_change(self.get_model('Book'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='borrow',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
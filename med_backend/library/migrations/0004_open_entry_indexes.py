@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_borrow_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='auto_closed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('exit_time__isnull', True)), fields=['user', 'entry_time'], name='library_open_entry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('exit_time__isnull', True)), fields=['entry_time'], name='library_open_age_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_open_entry_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['entry_time'], name='library_entry_time_idx'),
+        ),
+    ]
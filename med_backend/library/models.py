@@ -22,6 +22,7 @@ class Borrow(models.Model):
     borrow_date = models.DateTimeField(auto_now_add=True)
     due_date = models.DateTimeField()
     returned = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.user.username} borrowed {self.book.title}"
@@ -30,6 +31,17 @@ class Attendance(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='library_attendance')
     entry_time = models.DateTimeField()
     exit_time = models.DateTimeField(null=True, blank=True)
+    # Closed by close_stale_entries with a synthetic exit time, not by the user
+    auto_closed = models.BooleanField(default=False)
 
     def __str__(self):
         return f"{self.user.username} attended library on {self.entry_time.date()}"
+
+    class Meta:
+        indexes = [
+            # Open rows only: they stay few however long the log grows
+            models.Index(fields=['user', 'entry_time'], condition=models.Q(exit_time__isnull=True), name='library_open_entry_idx'),
+            models.Index(fields=['entry_time'], condition=models.Q(exit_time__isnull=True), name='library_open_age_idx'),
+            # Date range scans of presence.dwell
+            models.Index(fields=['entry_time'], name='library_entry_time_idx'),
+        ]
@@ -58,5 +58,5 @@ class AttendanceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Attendance
-        fields = ['id', 'user', 'entry_time', 'exit_time']
-        read_only_fields = ['entry_time', 'exit_time'] # These are set by view logic
+        fields = ['id', 'user', 'entry_time', 'exit_time', 'auto_closed']
+        read_only_fields = ['entry_time', 'exit_time', 'auto_closed'] # These are set by view logic
@@ -3,12 +3,16 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.utils import timezone
+from datetime import datetime
 from django.db.models import F # Import F for database operations
 from .models import Book, Borrow, Attendance
 from .serializers import BookSerializer, BorrowSerializer, AttendanceSerializer
 from django.db.models import Q
 from users.models import User # Required for select_related on User objects
 from users.permissions import IsAdminOrPrincipal # Import the permission class
+from core.cache import cached_view
+from core.changes import ChangeFeed
+from core.routing import ReplicaReadMixin
 
 
 # ---------------- BOOK VIEWS ------------------
@@ -16,6 +20,8 @@ from users.permissions import IsAdminOrPrincipal # Import the permission class
 class AvailableBooksView(APIView):
     permission_classes = [IsAuthenticated]
 
+    # Invalidated whenever a book is saved, which includes every borrow and return
+    @cached_view('available-books', models=[Book])
     def get(self, request):
         # Only show books with available copies (total_copies > currently_borrowed_count)
         # Use F() expression for efficient database-level comparison
@@ -175,10 +181,17 @@ class MyBorrowedBooksView(APIView):
 
     def get(self, request):
         user = request.user
+        feed = ChangeFeed(request)
         # Optimize with select_related for the 'book' foreign key, which also brings book title
         borrows = Borrow.objects.filter(user=user, returned=False).select_related('book').order_by('-borrow_date')
+        if feed.since is not None:
+            # Returned books drop out of this list, so they are reported as deleted
+            return feed.delta(
+                borrows, BorrowSerializer, owners=[user.id],
+                departed=Borrow.objects.filter(user=user, returned=True),
+            )
         serializer = BorrowSerializer(borrows, many=True, context={'request': request}) # Pass request context
-        return Response(serializer.data)
+        return feed.full(Response(serializer.data))
 
 class SearchBooksView(APIView):
     permission_classes = [IsAuthenticated]
@@ -378,9 +391,9 @@ class DeleteBookView(APIView):
                 "details": str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class AllBorrowedBooksView(APIView):
+class AllBorrowedBooksView(ReplicaReadMixin, APIView):
     """
-    View for admin/principal to see all borrowed books and who has them
+    View for admin/principal to see all borrowed books and who has them (read from the replica)
     """
     permission_classes = [IsAuthenticated, IsAdminOrPrincipal]
 
@@ -448,8 +461,10 @@ class LibraryEntryView(APIView):
     def post(self, request):
         user = request.user
         today = timezone.now().date()
-        # Check for an existing un-exited entry for the current user today
-        already_exists = Attendance.objects.filter(user=user, entry_time__date=today, exit_time__isnull=True).exists()
+        # Check for an existing un-exited entry for the current user today; a range on
+        # entry_time (not __date) so the open-entry index is used
+        start_of_today = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        already_exists = Attendance.objects.filter(user=user, entry_time__gte=start_of_today, exit_time__isnull=True).exists()
 
         if already_exists:
             return Response({"error": "You have already marked entry for today without an exit. Please mark exit first."}, status=status.HTTP_400_BAD_REQUEST)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'med_backend.settings')
+# Requests run on varying threads under ASGI, and the event stream holds its request open:
+# persistent connections would pile up per thread instead of being reused (core.db)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
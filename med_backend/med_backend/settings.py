@@ -1,12 +1,23 @@
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from core.db import database_settings, replica_settings
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),  # access token valid for 60 minutes
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),     # refresh token valid for 7 days
+    'TOKEN_REFRESH_SERIALIZER': 'users.tokens.VersionedTokenRefreshSerializer',  # Rejects revoked refresh tokens
 }
 
+# How long a user's token version is cached before revocations are re-read from the database
+TOKEN_VERSION_CACHE_SECONDS = 30
+
+# Revoked sessions are mirrored in memory (Bloom filter + exact set) and re-synced this often
+REVOCATION_SYNC_SECONDS = 5
+REVOCATION_BLOOM_CAPACITY = 100_000
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +50,7 @@ INSTALLED_APPS = [
     'corsheaders',
     
     # Your apps go here:
+    'core',
     'users',
     'library',
     'grades',
@@ -49,6 +61,7 @@ INSTALLED_APPS = [
     'timetable',
     'leaves',
     'hidden_superuser',
+    'presence',
 ]
 
 MIDDLEWARE = [
@@ -63,6 +76,7 @@ MIDDLEWARE = [
     'hidden_superuser.middleware.AdminActivityTrackingMiddleware',
     'hidden_superuser.middleware.LoginTrackingMiddleware',
     'hidden_superuser.middleware.SystemEventTrackingMiddleware',
+    'core.routing.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'med_backend.urls'
@@ -88,12 +102,45 @@ WSGI_APPLICATION = 'med_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite by default (WAL, busy timeout, immediate transactions; the bundled db.sqlite3 keeps
+# its rollback journal); set DB_ENGINE and friends to use a server database. See core/db.py
+# for the variables.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(BASE_DIR),
 }
+# Optional read replica for report endpoints (DB_REPLICA_NAME / DB_REPLICA_HOST)
+if replica := replica_settings(DATABASES['default']):
+    DATABASES['replica'] = replica
+DATABASE_ROUTERS = ['core.routing.ReplicaRouter']
+# After a write, a user's reads stay on the primary this long so they see their own changes.
+# The pin is kept in the default cache: a replica requires CACHE_BACKEND=sqlite or another
+# cache all workers share (system check core.E001)
+REPLICA_STICKY_SECONDS = 10
+
+
+# Cache shared by rate limiting, token versions and read-through view caching (core.cache).
+# Local memory is per process; with several workers on one host set CACHE_BACKEND=sqlite so
+# they share one cache file instead.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'sqlite':
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache.sqlite3')),
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 50_000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10_000},
+        }
+    }
+# How long a request waits for another one computing the same cache entry
+CACHE_LOCK_TIMEOUT_SECONDS = 10
 
 
 # Password validation
@@ -114,6 +161,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# PBKDF2 work factor; stored hashes with another count are upgraded on the next login.
+# Lowering it trades brute-force resistance for login throughput (see bench_login).
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 1_000_000))
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Login attempts allowed per (hits, seconds): every attempt counts against the client IP,
+# failed ones against the username. The per-username limit is what stops password guessing;
+# the per-IP one only stops floods, and is high because a whole campus behind one NAT shares
+# an address during the morning login burst
+LOGIN_RATE_LIMIT_IP = (600, 60)
+LOGIN_RATE_LIMIT_USERNAME = (5, 300)
+
+# Reverse proxies in front of the app that append the client address to X-Forwarded-For
+# (core.ratelimit.client_ip). 0 trusts only REMOTE_ADDR; set it to 1 behind nginx
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -141,12 +210,74 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
 }
+# How long deletions are remembered for incremental list feeds (?since=<token>)
+CHANGES_TOMBSTONE_RETENTION_DAYS = 30
+# Change tokens are backed off this far, so rows stamped by transactions that commit after
+# a poll are sent again on the next one (clients drop duplicates by id)
+CHANGES_SYNC_OVERLAP_SECONDS = 30
+
+# Admin activity and audit logs stay in the database this long; archive_logs moves older
+# rows into compressed JSONL segments (zstd if the zstandard package is installed, else gzip)
+LOG_HOT_RETENTION_DAYS = 30
+LOG_ARCHIVE_DIR = BASE_DIR / 'log_archive'
+LOG_ARCHIVE_SEGMENT_ROWS = 10_000
+LOG_ARCHIVE_CODEC = 'zstd'
+
+# Gate reader ingestion (presence.ingest): events per request, and how far ahead of the
+# server clock a reader's timestamps may be
+GATE_INGEST_MAX_EVENTS = 5000
+GATE_CLOCK_SKEW_SECONDS = 120
+
+# Open entries older than this many hours are closed by close_stale_entries with a
+# synthetic exit (presence.reconcile); a hostel stay is legitimately long
+STALE_ENTRY_HOURS = {'library': 12, 'campus': 18, 'hostel': 24 * 7}
+
+# Daily dwell rollups (presence.dwell): days before the oldest open visit that each
+# refresh_dwell run recomputes anyway, for taps delivered late
+DWELL_REFRESH_OVERLAP_DAYS = 2
+
+# Curfew violations (hostel_attendance.curfew): how far back a returning student's
+# previous exit is looked for, and who receives the nightly curfew_digest
+HOSTEL_CURFEW_LOOKBACK_DAYS = 30
+CURFEW_DIGEST_RECIPIENTS = [email for email in os.environ.get('CURFEW_DIGEST_RECIPIENTS', '').split(',') if email]
+
+# Leave days accrued per role each calendar year (leaves.ledger; other roles get 20), and
+# how many unused days rollover_leave_balances carries into the next year
+LEAVE_ALLOWANCE_DAYS = {'student': 20, 'teacher': 20, 'admin': 20, 'principal': 20, 'parent': 20}
+LEAVE_CARRY_OVER_DAYS = 0
+
+# Student and parent dashboards (users.dashboard): threads building the sections of one
+# response concurrently, and how long a section stays cached without a change to its rows
+DASHBOARD_WORKERS = 4
+DASHBOARD_CACHE_SECONDS = 300
+
+# Read-only admin requests are sampled per path prefix and coalesced into one row per
+# (user, method, path, status) and window; changes are always logged individually
+ACTIVITY_LOG_POLICY = {
+    'default_sample_rate': 1.0,
+    'sample_rates': {
+        # Polled by the hidden superuser panel; reading the logs should not flood them
+        '/api/hidden-superuser/dashboard/': 0.1,
+        '/api/hidden-superuser/activity-logs/': 0.1,
+        '/api/cache/stats/': 0.0,
+    },
+    'coalesce_window_seconds': 300,
+    'max_pending': 5000,
+}
+
+# Server-sent events (/api/events/stream/). The in-memory broker only reaches streams served
+# by the same process; point EVENTS_BROKER at a shared backend when running several workers.
+EVENTS_BROKER = 'core.events.InMemoryBroker'
+EVENTS_HEARTBEAT_SECONDS = 25
+# Browsers open the stream with a single-use ticket from /api/events/ticket/, valid this long
+EVENTS_TICKET_SECONDS = 30
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 CORS_ALLOW_ALL_ORIGINS = True
@@ -164,6 +295,10 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
 ]
+# Lets the frontend read the token it should poll "changes since" feeds with
+CORS_EXPOSE_HEADERS = [
+    'x-changes-token',
+]
 CORS_ALLOW_METHODS = [
     'GET',
     'POST',
@@ -25,6 +25,8 @@ urlpatterns = [
     path('api/timetable/', include('timetable.urls')),
     path('api/leaves/', include('leaves.urls')),
     path('api/hidden-superuser/', include('hidden_superuser.urls')),
+    path('api/presence/', include('presence.urls')),
+    path('api/', include('core.urls')),
 ]
 
 if django_settings.DEBUG:
@@ -4,4 +4,12 @@ from django.apps import AppConfig
 
 class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'payments'
\ No newline at end of file
+    name = 'payments'
+
+    def ready(self):
+        from core.changes import track_deletions
+        # Parents read their child's feed, so the student is the only owner
+        track_deletions(self.get_model('Payment'), lambda payment: [payment.student_id])
+
+        from core.cache import invalidate_on_change
+        invalidate_on_change(self.get_model('Payment'))
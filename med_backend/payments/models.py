@@ -18,6 +18,7 @@ class Payment(models.Model):
     payment_proof = models.FileField(upload_to='payment_proofs/', null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending') # Default to 'pending'
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.student.username} - {self.type} - {self.status}"
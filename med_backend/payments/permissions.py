@@ -1,6 +1,7 @@
 # payments/permissions.py
 
 from rest_framework import permissions
+from users.capabilities import is_office
 
 SAFE_METHODS = ['GET', 'HEAD', 'OPTIONS']
 
@@ -10,12 +11,7 @@ class IsAdminPrincipalSuperuser(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and (
-                request.user.role in ['admin', 'principal'] or
-                request.user.is_hidden_superuser
-            )
-        )
+        return is_office(request.user)
 
 
 class IsStudentOrParent(permissions.BasePermission):
@@ -28,9 +24,9 @@ class IsStudentOrParent(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if request.user.role == 'student':
-            return obj.student == request.user
-        elif request.user.role == 'parent' and request.user.child:
-            return obj.student == request.user.child
+            return obj.student_id == request.user.id
+        elif request.user.role == 'parent' and request.user.child_id:
+            return obj.student_id == request.user.child_id
         return False
 
 
@@ -44,7 +40,7 @@ class IsStudentUploadingProof(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         if request.user.role == 'student':
-            return obj.student == request.user
-        elif request.user.role == 'parent' and request.user.child:
-            return obj.student == request.user.child
+            return obj.student_id == request.user.id
+        elif request.user.role == 'parent' and request.user.child_id:
+            return obj.student_id == request.user.child_id
         return False
\ No newline at end of file
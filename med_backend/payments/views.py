@@ -8,6 +8,9 @@ from .models import Payment
 from .serializers import PaymentSerializer
 from .permissions import IsAdminPrincipalSuperuser, IsStudentOrParent, IsStudentUploadingProof 
 from users.models import User # For student field queryset validation
+from users.capabilities import OFFICE, is_management, is_office, scope_queryset
+from core.changes import ChangeFeed
+from core.events import publish_on_commit
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -18,7 +21,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         user = self.request.user
 
         if user.is_authenticated:
-            if user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+            if is_office(user):
                 # Full access for admin/principal/hidden superuser
                 return [permissions.IsAuthenticated()]
             elif self.action in ['list', 'retrieve', 'my_payments']:
@@ -38,19 +41,15 @@ class PaymentViewSet(viewsets.ModelViewSet):
         # Optimize queryset with select_related for the 'student' foreign key
         base_queryset = Payment.objects.all().select_related('student')
 
-        if user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
-            return base_queryset
-        elif user.role == 'student':
-            return base_queryset.filter(student=user)
-        elif user.role == 'parent' and user.child:
-            return base_queryset.filter(student=user.child)
-        return Payment.objects.none()
+        # Admin/principal/hidden superuser see everything, students their own payments and
+        # parents their child's, as a single filter clause
+        return scope_queryset(base_queryset, user, student='student_id', full=OFFICE)
 
     # Overriding create method to handle student assignment when admin creates a payment
     def create(self, request, *args, **kwargs):
         user = request.user
         # Only admin/principal/hidden superuser can create payments for students
-        if not (user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal']):
+        if not is_management(user):
             raise PermissionDenied("You do not have permission to create payment records.")
 
         student_id = request.data.get('student_id')
@@ -112,8 +111,17 @@ class PaymentViewSet(viewsets.ModelViewSet):
         # Permissions are already enforced by get_permissions on the ViewSet.
         # This action is restricted to IsAdminPrincipalSuperuser.
 
+        previous_status = payment.status
         payment.status = 'received'
         payment.save()
+
+        # Notify the student and any parent linked to them
+        parent_ids = User.objects.filter(role='parent', child_id=payment.student_id).values_list('id', flat=True)
+        publish_on_commit([payment.student_id, *parent_ids], 'payment.status', {
+            'payment_id': payment.id,
+            'status': payment.status,
+            'previous_status': previous_status,
+        })
         serializer = self.get_serializer(payment) # Re-serialize the updated object
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -183,9 +191,21 @@ class PaymentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='my')
     def my_payments(self, request):
         # The get_queryset method already handles filtering for student/parent roles
+        feed = ChangeFeed(request)
         queryset = self.get_queryset() 
+        if feed.since is not None:
+            # Payments are owned by the student, including when a parent is asking
+            user = request.user
+            if is_office(user):
+                owners = None
+            else:
+                owners = [user.child_id if user.role == 'parent' else user.id]
+            return feed.delta(
+                queryset, self.get_serializer_class(),
+                owners=owners, context=self.get_serializer_context(),
+            )
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return feed.full(Response(serializer.data))
 
 
 class GeneratePaymentRequestView(APIView):
@@ -198,7 +218,7 @@ class GeneratePaymentRequestView(APIView):
         user = request.user
         
         # Ensure only admin/principal/hidden superuser can generate payment requests
-        if not (user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in ['admin', 'principal']):
+        if not is_management(user):
             return Response({"error": "Only admin and principal users can generate payment requests."}, 
                           status=status.HTTP_403_FORBIDDEN)
 
@@ -0,0 +1,41 @@
+from django.contrib import admin
+from .models import AccessCard, DailyDwell, GateDevice, PresenceState
+
+@admin.register(PresenceState)
+class PresenceStateAdmin(admin.ModelAdmin):
+    list_display = ('student', 'facility', 'is_inside', 'since')
+    list_filter = ('facility', 'is_inside')
+    search_fields = ('student__username',)
+    readonly_fields = ('student', 'facility', 'is_inside', 'since', 'last_event_id', 'updated_at')
+
+    def has_change_permission(self, request, obj=None):
+        # Maintained by presence.services alongside the gate logs
+        return False
+
+
+@admin.register(GateDevice)
+class GateDeviceAdmin(admin.ModelAdmin):
+    # Devices are created with `manage.py create_gate_device`, which prints the key
+    list_display = ('name', 'facility', 'is_active', 'last_seen_at')
+    list_filter = ('facility', 'is_active')
+    readonly_fields = ('key_hash', 'created_at', 'last_seen_at')
+
+
+@admin.register(AccessCard)
+class AccessCardAdmin(admin.ModelAdmin):
+    list_display = ('card_id', 'student', 'is_active', 'issued_at')
+    list_filter = ('is_active',)
+    search_fields = ('card_id', 'student__username')
+    raw_id_fields = ('student',)
+
+
+@admin.register(DailyDwell)
+class DailyDwellAdmin(admin.ModelAdmin):
+    list_display = ('student', 'facility', 'day', 'seconds', 'visits', 'includes_open')
+    list_filter = ('facility', 'includes_open')
+    search_fields = ('student__username',)
+    date_hierarchy = 'day'
+
+    def has_change_permission(self, request, obj=None):
+        # Recomputed by `manage.py refresh_dwell`
+        return False
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class PresenceConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'presence'
+
+    def ready(self):
+        from core.cache import invalidate_on_change
+        # Reloads the in-memory card map of presence.ingest
+        invalidate_on_change(self.get_model('AccessCard'))
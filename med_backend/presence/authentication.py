@@ -0,0 +1,53 @@
+# presence/authentication.py
+
+import hashlib
+import secrets
+
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+from rest_framework import authentication, exceptions
+from rest_framework.permissions import BasePermission
+
+from .models import GateDevice
+
+KEYWORD = 'Device'
+
+
+def hash_device_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def create_device(name, facility):
+    """Register a gate device. Returns (device, key); the key cannot be recovered later."""
+    key = secrets.token_urlsafe(32)
+    device = GateDevice.objects.create(name=name, facility=facility, key_hash=hash_device_key(key))
+    return device, key
+
+
+class GateDeviceAuthentication(authentication.BaseAuthentication):
+    """
+    `Authorization: Device <key>`. Authenticates a gate device, not a person:
+    request.user is anonymous and request.auth is the GateDevice.
+    """
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].decode('latin-1') != KEYWORD:
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid device authorization header.')
+
+        key_hash = hash_device_key(header[1].decode('latin-1'))
+        device = GateDevice.objects.filter(key_hash=key_hash, is_active=True).first()
+        if device is None:
+            raise exceptions.AuthenticationFailed('Unknown or inactive device.')
+        GateDevice.objects.filter(pk=device.pk).update(last_seen_at=timezone.now())
+        return AnonymousUser(), device
+
+    def authenticate_header(self, request):
+        return KEYWORD
+
+
+class IsGateDevice(BasePermission):
+    def has_permission(self, request, view):
+        return isinstance(request.auth, GateDevice)
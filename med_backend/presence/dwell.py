@@ -0,0 +1,273 @@
+# presence/dwell.py
+
+"""
+Daily dwell time: how long each student was on campus or in the library, per local day.
+
+CollegeInOutLog and library.Attendance store raw visits (entry_time, exit_time). A day's
+dwell time for a student is the length of the union of their visits, clipped to that day:
+
+- a visit across midnight counts towards both days
+- overlapping visits (a missed exit tap followed by a new entry) count once
+- an open visit counts up to now, but no further than the synthetic exit close_stale_entries
+  would give it (entry_time plus STALE_ENTRY_HOURS), so a forgotten tap does not add days
+
+refresh_dwell() stores the result in DailyDwell, one row per (student, facility, day), and
+reports read those rows instead of the logs. It is incremental: DwellRefreshMark holds the
+first day that may still change, which is the day of the oldest visit still open at the
+last run, or DWELL_REFRESH_OVERLAP_DAYS back for taps delivered late, whichever is earlier.
+Each run recomputes the days from there to today and nothing before.
+
+On SQLite and PostgreSQL the computation is one set-based query: window functions merge
+each student's overlapping visits (gaps and islands) and a join with the day boundaries
+splits them at midnight. Other backends stream the visits in (student, entry_time) order
+and do the same sweep in Python.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import DailyDwell, DwellRefreshMark
+from .reconcile import stale_threshold
+
+# facility -> (log model, student field)
+DWELL_LOGS = {
+    DailyDwell.CAMPUS: ('college_in_out_log.CollegeInOutLog', 'student'),
+    DailyDwell.LIBRARY: ('library.Attendance', 'user'),
+}
+
+DEFAULT_OVERLAP_DAYS = 2
+
+# vendor -> SQL for least(), greatest(), seconds between two datetimes, a typed datetime
+# parameter and a datetime plus a number of seconds
+SQL_DIALECTS = {
+    'sqlite': {
+        'least': 'MIN', 'greatest': 'MAX',
+        'seconds': "((julianday({0}) - julianday({1})) * 86400.0)",
+        'param': '%s',
+        'plus_seconds': "datetime({0}, '+' || {1} || ' seconds')",
+    },
+    'postgresql': {
+        'least': 'LEAST', 'greatest': 'GREATEST',
+        'seconds': 'EXTRACT(EPOCH FROM ({0} - {1}))',
+        'param': 'CAST(%s AS timestamp with time zone)',
+        'plus_seconds': "({0} + {1} * INTERVAL '1 second')",
+    },
+}
+
+DWELL_SQL = """
+WITH days (day_index, day_start, day_end) AS (
+    VALUES {days}
+),
+visits AS (
+    SELECT {student} AS student_id,
+           {greatest}(entry_time, {param}) AS s,
+           {least}(COALESCE(exit_time, {least}({open_end}, {param})), {param}) AS e,
+           CASE WHEN exit_time IS NULL THEN 1 ELSE 0 END AS is_open
+    FROM {table}
+    WHERE entry_time >= {param} AND entry_time < {param} AND (exit_time IS NULL OR exit_time > {param})
+),
+flagged AS (
+    SELECT student_id, s, e, is_open,
+           CASE WHEN s <= MAX(e) OVER (
+               PARTITION BY student_id ORDER BY s, e ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+           ) THEN 0 ELSE 1 END AS starts_island
+    FROM visits
+    WHERE e > s
+),
+islands AS (
+    SELECT student_id, s, e, is_open,
+           SUM(starts_island) OVER (PARTITION BY student_id ORDER BY s, e ROWS UNBOUNDED PRECEDING) AS island
+    FROM flagged
+),
+merged AS (
+    SELECT student_id, MIN(s) AS s, MAX(e) AS e, MAX(is_open) AS is_open
+    FROM islands
+    GROUP BY student_id, island
+)
+SELECT m.student_id, d.day_index,
+       SUM({seconds}), COUNT(*), MAX(m.is_open)
+FROM merged m
+JOIN days d ON m.s < d.day_end AND m.e > d.day_start
+GROUP BY m.student_id, d.day_index
+"""
+
+
+@dataclass
+class DwellRefresh:
+    facility: str
+    start_day: object = None
+    end_day: object = None
+    rows: int = 0
+    resume_from: object = None
+
+
+def day_bounds(start_day, end_day):
+    """[(day, start, end)] for each local day from start_day to end_day, as aware datetimes."""
+    zone = timezone.get_current_timezone()
+    bounds, day = [], start_day
+    while day <= end_day:
+        following = day + timedelta(days=1)
+        bounds.append((
+            day,
+            timezone.make_aware(datetime.combine(day, time.min), zone),
+            timezone.make_aware(datetime.combine(following, time.min), zone),
+        ))
+        day = following
+    return bounds
+
+
+def compute_dwell(facility, start_day, end_day, now=None, engine=None):
+    """
+    Dwell time of every student with a visit at `facility` between start_day and end_day
+    (local days, inclusive). Returns [(student_id, day, seconds, visits, includes_open)].
+    `engine` forces 'sql' or 'python'; by default SQL is used where the backend supports it.
+    """
+    now = now or timezone.now()
+    model = apps.get_model(DWELL_LOGS[facility][0])
+    bounds = [(day, start, min(end, now)) for day, start, end in day_bounds(start_day, end_day) if start < now]
+    if not bounds:
+        return []
+    vendor = connections[router.db_for_read(model)].vendor
+    if engine is None:
+        engine = 'sql' if vendor in SQL_DIALECTS else 'python'
+    compute = _sql_dwell if engine == 'sql' else _python_dwell
+    return compute(model, DWELL_LOGS[facility][1], bounds, stale_threshold(facility), now)
+
+
+def _sql_dwell(model, student_field, bounds, threshold, now):
+    connection = connections[router.db_for_read(model)]
+    dialect = SQL_DIALECTS[connection.vendor]
+    adapt = connection.ops.adapt_datetimefield_value
+    param = dialect['param']
+    range_start, range_end = bounds[0][1], bounds[-1][2]
+
+    sql = DWELL_SQL.format(
+        days=', '.join(f'(%s, {param}, {param})' for _ in bounds),
+        student=connection.ops.quote_name(model._meta.get_field(student_field).column),
+        table=connection.ops.quote_name(model._meta.db_table),
+        open_end=dialect['plus_seconds'].format('entry_time', '%s'),
+        seconds=dialect['seconds'].format(
+            f"{dialect['least']}(m.e, d.day_end)", f"{dialect['greatest']}(m.s, d.day_start)",
+        ),
+        least=dialect['least'], greatest=dialect['greatest'], param=param,
+    )
+    params = [value for index, (_, start, end) in enumerate(bounds) for value in (index, adapt(start), adapt(end))]
+    params += [
+        adapt(range_start),                         # visit start clipped to the range
+        int(threshold.total_seconds()), adapt(now),  # end of an open visit
+        adapt(range_end),                           # visit end clipped to the range
+        adapt(range_start - threshold), adapt(range_end), adapt(range_start),
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            (student_id, bounds[index][0], round(seconds), visits, bool(is_open))
+            for student_id, index, seconds, visits, is_open in cursor.fetchall()
+        ]
+
+
+def _python_dwell(model, student_field, bounds, threshold, now):
+    range_start, range_end = bounds[0][1], bounds[-1][2]
+    starts = [start for _, start, _ in bounds]
+    student_column = f'{student_field}_id'
+    rows = (
+        _visits(model, range_start, range_end, threshold)
+        .order_by(student_column, 'entry_time')
+        .values_list(student_column, 'entry_time', 'exit_time')
+        .iterator(chunk_size=5000)
+    )
+    totals = {}  # (student_id, day index) -> [seconds, visits, includes_open]
+
+    def add(student_id, s, e, is_open):
+        # Split one merged visit at each midnight it crosses
+        index = bisect_right(starts, s) - 1
+        while index < len(bounds) and bounds[index][1] < e:
+            _, day_start, day_end = bounds[index]
+            total = totals.setdefault((student_id, index), [0.0, 0, False])
+            total[0] += (min(e, day_end) - max(s, day_start)).total_seconds()
+            total[1] += 1
+            total[2] = total[2] or is_open
+            index += 1
+
+    current = None  # [student_id, s, e, is_open] of the visit being merged
+    for student_id, entry_time, exit_time in rows:
+        s = max(entry_time, range_start)
+        e = min(exit_time or min(entry_time + threshold, now), range_end)
+        if e <= s:
+            continue
+        if current is not None and current[0] == student_id and s <= current[2]:
+            current[2] = max(current[2], e)
+            current[3] = current[3] or exit_time is None
+            continue
+        if current is not None:
+            add(*current)
+        current = [student_id, s, e, exit_time is None]
+    if current is not None:
+        add(*current)
+
+    return [
+        (student_id, bounds[index][0], round(seconds), visits, is_open)
+        for (student_id, index), (seconds, visits, is_open) in totals.items()
+    ]
+
+
+def _visits(model, range_start, range_end, threshold):
+    # A visit longer than the stale threshold starting before the range is not looked for:
+    # it was open at an earlier run, so the range already starts at its day
+    return model.objects.filter(
+        Q(exit_time__isnull=True) | Q(exit_time__gt=range_start),
+        entry_time__gte=range_start - threshold, entry_time__lt=range_end,
+    )
+
+
+def refresh_dwell(facility, now=None, since=None, engine=None):
+    """
+    Recompute DailyDwell of `facility` from the refresh mark (or `since`, a date, to rebuild
+    further back) to today. Returns a DwellRefresh report.
+    """
+    now = now or timezone.now()
+    model = apps.get_model(DWELL_LOGS[facility][0])
+    overlap = timedelta(days=getattr(settings, 'DWELL_REFRESH_OVERLAP_DAYS', DEFAULT_OVERLAP_DAYS))
+    today = timezone.localdate(now)
+    report = DwellRefresh(facility)
+
+    with transaction.atomic():
+        mark, _ = DwellRefreshMark.objects.select_for_update().get_or_create(facility=facility)
+        start_day = since or mark.resume_from
+        if start_day is None:
+            first_entry = model.objects.aggregate(first=Min('entry_time'))['first']
+            start_day = timezone.localdate(first_entry) if first_entry else today
+        report.start_day, report.end_day = start_day, today
+
+        rows = compute_dwell(facility, start_day, today, now=now, engine=engine)
+        DailyDwell.objects.filter(facility=facility, day__gte=start_day).delete()
+        DailyDwell.objects.bulk_create(
+            [
+                DailyDwell(
+                    student_id=student_id, facility=facility, day=day, seconds=seconds,
+                    visits=visits, includes_open=includes_open, updated_at=now,
+                )
+                for student_id, day, seconds, visits, includes_open in rows
+            ],
+            batch_size=1000,
+        )
+        report.rows = len(rows)
+
+        # Open visits past the stale threshold no longer grow: they are capped at their synthetic exit
+        oldest_open = model.objects.filter(
+            exit_time__isnull=True, entry_time__gt=now - stale_threshold(facility),
+        ).aggregate(first=Min('entry_time'))['first']
+        resume_from = today - overlap
+        if oldest_open is not None:
+            resume_from = min(resume_from, timezone.localdate(oldest_open))
+        mark.resume_from = report.resume_from = resume_from
+        mark.last_run_at = now
+        mark.save()
+    return report
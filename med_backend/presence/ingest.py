@@ -0,0 +1,248 @@
+# presence/ingest.py
+
+"""
+Batch ingestion of gate reader taps.
+
+A reader posts NDJSON batches of {"card_id", "facility", "direction", "timestamp"}.
+ingest_batch() turns a batch into log rows and presence states with a fixed number of
+queries, however many taps it holds:
+
+1. Cards are resolved from an in-memory card_id -> student map (CardDirectory), reloaded
+   only when an AccessCard changes.
+2. Taps are sorted by timestamp, so a reader may send them in any order within a batch.
+3. The presence states of the batch's students are read and locked once, and each tap is
+   replayed against them in memory:
+   - a tap not newer than the student's current state is `stale`: delivered late, or part
+     of a batch the reader is retrying after a timeout, so retries are harmless
+   - a tap in the direction the student is already in is a `duplicate` (a second swipe)
+   - an exit from a student never logged entering is `no_open_entry` and writes nothing
+4. New entries (closed already when the exit is in the same batch) are written with one
+   bulk_create, exits of earlier entries and changed states with one executemany UPDATE
+   each, and the states of students seen for the first time with one upsert.
+
+Log rows are written by the gate, so marked_by is empty.
+"""
+
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cache import generations
+from .models import AccessCard, PresenceState
+from .services import log_model
+
+IN, OUT = 'in', 'out'
+DIRECTIONS = (IN, OUT)
+
+RECORDED = 'recorded'
+STALE = 'stale'
+DUPLICATE = 'duplicate'
+NO_OPEN_ENTRY = 'no_open_entry'
+UNKNOWN_CARD = 'unknown_card'
+INVALID = 'invalid'
+OUTCOMES = (RECORDED, STALE, DUPLICATE, NO_OPEN_ENTRY, UNKNOWN_CARD, INVALID)
+
+BULK_BATCH_SIZE = 500
+
+
+class CardDirectory:
+    """
+    card_id -> student id of every active card, held in memory per process. The map is
+    reloaded whole when AccessCard's cache generation moves (see core.cache), so checking
+    it costs one cache lookup per batch. Card changes made with bulk_create/update() send
+    no signals: call bump_generation(AccessCard) after them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._cards = {}
+
+    def resolve(self, card_ids):
+        [generation] = generations([AccessCard])
+        with self._lock:
+            if generation != self._generation:
+                self._cards = dict(
+                    AccessCard.objects.filter(is_active=True).values_list('card_id', 'student_id')
+                )
+                self._generation = generation
+            cards = self._cards
+        return {card_id: cards.get(card_id) for card_id in card_ids}
+
+    def clear(self):
+        with self._lock:
+            self._generation, self._cards = None, {}
+
+
+card_directory = CardDirectory()
+
+
+@dataclass(frozen=True)
+class GateEvent:
+    line: int
+    card_id: str
+    facility: str
+    direction: str
+    timestamp: datetime
+
+
+@dataclass
+class IngestResult:
+    received: int = 0
+    counts: Counter = field(default_factory=Counter)
+    rejected: list = field(default_factory=list)
+
+    def add(self, outcome, line=None, card_id=None, reason=None):
+        self.counts[outcome] += 1
+        if reason is not None:
+            self.rejected.append({'line': line, 'card_id': card_id, 'outcome': outcome, 'reason': reason})
+
+    def as_dict(self):
+        return {
+            'received': self.received,
+            **{outcome: self.counts[outcome] for outcome in OUTCOMES},
+            'rejected': self.rejected,
+        }
+
+
+def parse_event(line, record, device, now):
+    """Validate one NDJSON record. Returns (GateEvent, None) or (None, reason)."""
+    if record is None:
+        return None, "Not a JSON object."
+    card_id = record.get('card_id')
+    if not isinstance(card_id, (str, int)) or str(card_id) == '':
+        return None, "card_id is required."
+    facility = record.get('facility', device.facility)
+    if facility != device.facility:
+        return None, f"This device is registered for {device.facility}."
+    direction = record.get('direction')
+    if direction not in DIRECTIONS:
+        return None, "direction must be 'in' or 'out'."
+    timestamp = parse_datetime(str(record.get('timestamp', '')))
+    if timestamp is None:
+        return None, "timestamp must be an ISO 8601 date and time."
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    if timestamp > now + timedelta(seconds=getattr(settings, 'GATE_CLOCK_SKEW_SECONDS', 120)):
+        return None, "timestamp is in the future; check the reader's clock."
+    return GateEvent(line, str(card_id), facility, direction, timestamp), None
+
+
+def ingest_batch(records, device, now=None):
+    """Apply a parsed NDJSON batch of (line, record) pairs from `device`. Returns an IngestResult."""
+    now = now or timezone.now()
+    result = IngestResult(received=len(records))
+
+    events = []
+    for line, record in records:
+        event, reason = parse_event(line, record, device, now)
+        if event is None:
+            result.add(INVALID, line, (record or {}).get('card_id'), reason)
+        else:
+            events.append(event)
+
+    students = card_directory.resolve({event.card_id for event in events})
+    taps = {}
+    for event in events:
+        student_id = students[event.card_id]
+        if student_id is None:
+            result.add(UNKNOWN_CARD, event.line, event.card_id, "No active card with this id.")
+        else:
+            taps.setdefault(event.facility, []).append((student_id, event))
+
+    for facility, facility_taps in taps.items():
+        _apply_taps(facility, facility_taps, result, now)
+    return result
+
+
+def _apply_taps(facility, taps, result, now):
+    model = log_model(facility)
+    taps.sort(key=lambda tap: (tap[1].timestamp, tap[1].line))
+
+    with transaction.atomic():
+        states = {
+            state.student_id: state
+            for state in PresenceState.objects.select_for_update().filter(
+                facility=facility, student_id__in={student_id for student_id, _ in taps},
+            )
+        }
+        new_rows = []   # log rows opened by this batch, in time order
+        open_rows = {}  # student id -> row opened by this batch and not closed yet
+        closed = {}     # id of a row opened before this batch -> its exit time
+        changed = set()
+
+        for student_id, event in taps:
+            state = states.get(student_id)
+            if state is None:
+                state = states[student_id] = PresenceState(student_id=student_id, facility=facility, is_inside=False)
+            if state.since is not None and event.timestamp <= state.since:
+                result.add(STALE)
+                continue
+            if (event.direction == IN) == state.is_inside:
+                if state.since is None:
+                    # An exit from a student never seen entering
+                    result.add(NO_OPEN_ENTRY, event.line, event.card_id, "No open entry to close.")
+                else:
+                    result.add(DUPLICATE)
+                continue
+
+            if event.direction == IN:
+                row = model(student_id=student_id, entry_time=event.timestamp)
+                new_rows.append(row)
+                open_rows[student_id] = row
+            elif student_id in open_rows:
+                open_rows.pop(student_id).exit_time = event.timestamp
+            else:
+                closed[state.last_event_id] = event.timestamp
+
+            state.is_inside, state.since = event.direction == IN, event.timestamp
+            changed.add(student_id)
+            result.add(RECORDED)
+
+        model.objects.bulk_create(new_rows, batch_size=BULK_BATCH_SIZE)
+        _update_rows(model, ['exit_time'], [model(pk=pk, exit_time=exit_time) for pk, exit_time in closed.items()])
+
+        for row in new_rows:
+            # Later rows of the same student overwrite earlier ones: the newest row wins
+            states[row.student_id].last_event_id = row.pk
+        existing, created = [], []
+        for student_id in changed:
+            state = states[student_id]
+            state.updated_at = now
+            (existing if state.pk else created).append(state)
+        _update_rows(PresenceState, ['is_inside', 'since', 'last_event_id', 'updated_at'], existing)
+        # An upsert: another batch may have created the same student's state concurrently
+        PresenceState.objects.bulk_create(
+            created, batch_size=BULK_BATCH_SIZE, update_conflicts=True,
+            unique_fields=['student', 'facility'],
+            update_fields=['is_inside', 'since', 'last_event_id', 'updated_at'],
+        )
+
+
+def _update_rows(model, fields, objects):
+    """
+    UPDATE `fields` of each object by primary key, as one executemany. bulk_update() would
+    build a CASE expression over every row, which costs far more than the update itself.
+    """
+    if not objects:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name) for name in fields]
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(model._meta.db_table),
+        ', '.join(f'{quote(column.column)} = %s' for column in columns),
+        quote(model._meta.pk.column),
+    )
+    params = [
+        [column.get_db_prep_save(getattr(obj, column.attname), connection) for column in columns] + [obj.pk]
+        for obj in objects
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
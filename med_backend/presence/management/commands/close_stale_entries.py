@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from presence.reconcile import STALE_ENTRY_LOGS, close_stale_entries
+
+
+class Command(BaseCommand):
+    help = (
+        'Close library, hostel and campus entries left open longer than STALE_ENTRY_HOURS, '
+        'with a synthetic exit flagged auto_closed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--facility', choices=list(STALE_ENTRY_LOGS), help='Only this facility (default: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Count stale entries without closing them')
+
+    def handle(self, *args, **options):
+        facilities = [options['facility']] if options['facility'] else list(STALE_ENTRY_LOGS)
+        for facility in facilities:
+            report = close_stale_entries(facility, dry_run=options['dry_run'])
+            hours = report.threshold.total_seconds() / 3600
+            line = f"{facility}: {report.found} open entries older than {hours:g}h"
+            if report.oldest_entry:
+                line += f" (oldest {report.oldest_entry:%Y-%m-%d %H:%M})"
+            if not options['dry_run']:
+                line += f", {report.closed} closed"
+            self.stdout.write(self.style.SUCCESS(line))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from presence.authentication import create_device
+from presence.models import GateDevice, PresenceState
+
+
+class Command(BaseCommand):
+    help = 'Register a gate reader and print the key it authenticates with (shown only once).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Unique device name, e.g. main-gate-1')
+        parser.add_argument('--facility', required=True, choices=[value for value, _ in PresenceState.FACILITY_CHOICES])
+
+    def handle(self, *args, **options):
+        if GateDevice.objects.filter(name=options['name']).exists():
+            raise CommandError(f"A device named {options['name']!r} already exists.")
+        device, key = create_device(options['name'], options['facility'])
+        self.stdout.write(self.style.SUCCESS(f"Device {device} registered."))
+        self.stdout.write(f"Authorization: Device {key}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from presence.models import PresenceState
+from presence.services import rebuild_presence
+
+
+class Command(BaseCommand):
+    help = 'Recompute current hostel/campus presence from the entry/exit logs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--facility', choices=[value for value, _ in PresenceState.FACILITY_CHOICES],
+            help='Only rebuild this facility (default: all)',
+        )
+
+    def handle(self, *args, **options):
+        facilities = [options['facility']] if options['facility'] else [value for value, _ in PresenceState.FACILITY_CHOICES]
+        for facility in facilities:
+            count = rebuild_presence(facility)
+            self.stdout.write(self.style.SUCCESS(f"{facility}: {count} presence states rebuilt."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from presence.dwell import DWELL_LOGS, refresh_dwell
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily campus and library dwell rollups (DailyDwell) changed since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--facility', choices=list(DWELL_LOGS), help='Only this facility (default: all)')
+        parser.add_argument('--since', help='Rebuild from this date (YYYY-MM-DD) instead of the last run')
+        parser.add_argument('--engine', choices=['sql', 'python'], help='Force the SQL or the Python computation')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format.')
+        facilities = [options['facility']] if options['facility'] else list(DWELL_LOGS)
+        for facility in facilities:
+            report = refresh_dwell(facility, since=since, engine=options['engine'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{facility}: {report.rows} student-days from {report.start_day} to {report.end_day}, "
+                f"next run from {report.resume_from}"
+            ))
@@ -0,0 +1,104 @@
+import json
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from presence.authentication import create_device
+from presence.ingest import OUTCOMES, card_directory
+from presence.models import AccessCard, PresenceState
+from presence.views import GateEventIngestView
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test gate ingestion: a simulated reader posts NDJSON tap batches through '
+        'GateEventIngestView for throwaway students and cards, rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000, help='Taps to send')
+        parser.add_argument('--students', type=int, default=2000, help='Distinct cards tapping')
+        parser.add_argument('--batch', type=int, default=500, help='Taps per request')
+        parser.add_argument(
+            '--facility', default=PresenceState.CAMPUS,
+            choices=[value for value, _ in PresenceState.FACILITY_CHOICES],
+        )
+        parser.add_argument('--noise', type=float, default=0.05, help='Share of repeated taps and late deliveries')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        facility = options['facility']
+        events = max(1, options['events'])
+        batch_size = max(1, options['batch'])
+
+        with transaction.atomic():
+            password = make_password(None)
+            students = User.objects.bulk_create(
+                User(username=f'gate-sim-{index}', password=password, role='student')
+                for index in range(options['students'])
+            )
+            AccessCard.objects.bulk_create(
+                AccessCard(card_id=f'SIM{student.pk:08d}', student=student) for student in students
+            )
+            card_directory.clear()
+            _, key = create_device('gate-simulator', facility)
+
+            lines = self.taps(rng, students, events, options['noise'], facility)
+            batches = [lines[start:start + batch_size] for start in range(0, len(lines), batch_size)]
+            factory = APIRequestFactory()
+            view = GateEventIngestView.as_view()
+            totals = Counter()
+
+            started = time.perf_counter()
+            for batch in batches:
+                request = factory.post(
+                    '/api/presence/ingest/', '\n'.join(batch), content_type='application/x-ndjson',
+                    HTTP_AUTHORIZATION=f'Device {key}',
+                )
+                response = view(request)
+                if response.status_code != 200:
+                    raise RuntimeError(f'Ingestion failed with {response.status_code}: {response.data}')
+                totals.update({outcome: response.data[outcome] for outcome in OUTCOMES})
+            elapsed = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+        card_directory.clear()
+
+        self.stdout.write(f"Taps:       {len(lines)} in {len(batches)} batches of {batch_size}")
+        self.stdout.write("Outcomes:   " + ', '.join(f"{outcome} {totals[outcome]}" for outcome in OUTCOMES))
+        self.stdout.write(self.style.SUCCESS(
+            f"Throughput: {len(lines) / elapsed:,.0f} taps/s ({elapsed / len(batches) * 1000:.1f} ms per batch)"
+        ))
+
+    def taps(self, rng, students, count, noise, facility):
+        """Alternating in/out taps over the last hour, with repeats and late deliveries mixed in."""
+        clock = timezone.now() - timedelta(hours=1)
+        step = timedelta(hours=1) / count
+        inside = {}
+        lines = []
+        for _ in range(count):
+            clock += step
+            student = rng.choice(students)
+            direction = 'out' if inside.get(student.pk) else 'in'
+            inside[student.pk] = direction == 'in'
+            tap = {'card_id': f'SIM{student.pk:08d}', 'facility': facility, 'direction': direction, 'timestamp': clock.isoformat()}
+            lines.append(json.dumps(tap))
+            if rng.random() < noise:
+                # A second swipe a moment later, or the same tap delivered twice
+                repeat = dict(tap, timestamp=(clock + timedelta(seconds=2)).isoformat()) if rng.random() < 0.5 else tap
+                lines.append(json.dumps(repeat))
+        # Readers buffer and reorder: shuffle within small windows
+        for start in range(0, len(lines), 50):
+            window = lines[start:start + 50]
+            rng.shuffle(window)
+            lines[start:start + 50] = window
+        return lines
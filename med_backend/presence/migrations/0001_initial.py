@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facility', models.CharField(choices=[('hostel', 'Hostel'), ('campus', 'Campus')], max_length=10)),
+                ('is_inside', models.BooleanField(default=False)),
+                ('since', models.DateTimeField(help_text='Time of the entry or exit that set the current state')),
+                ('last_event_id', models.BigIntegerField(blank=True, help_text='Log row of that entry or exit', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presence_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['facility', 'is_inside', 'since'], name='presence_state_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'facility'), name='presence_one_state_per_facility')],
+            },
+        ),
+    ]
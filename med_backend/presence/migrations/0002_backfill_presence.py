@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+FACILITY_LOGS = {
+    'hostel': ('hostel_attendance', 'HostelAttendance'),
+    'campus': ('college_in_out_log', 'CollegeInOutLog'),
+}
+
+
+def backfill(apps, schema_editor):
+    """State from each student's latest log row, as presence.services.rebuild_presence does."""
+    PresenceState = apps.get_model('presence', 'PresenceState')
+    for facility, label in FACILITY_LOGS.items():
+        model = apps.get_model(*label)
+        latest = model.objects.filter(student=OuterRef('student')).order_by('-entry_time', '-id')
+        rows = model.objects.filter(pk=Subquery(latest.values('pk')[:1])).values(
+            'pk', 'student_id', 'entry_time', 'exit_time',
+        )
+        PresenceState.objects.bulk_create([
+            PresenceState(
+                student_id=row['student_id'], facility=facility,
+                is_inside=row['exit_time'] is None,
+                since=row['exit_time'] or row['entry_time'],
+                last_event_id=row['pk'],
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presence', '0001_initial'),
+        ('hostel_attendance', '0002_initial'),
+        ('college_in_out_log', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presence', '0002_backfill_presence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GateDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('facility', models.CharField(choices=[('hostel', 'Hostel'), ('campus', 'Campus')], max_length=10)),
+                ('key_hash', models.CharField(max_length=64, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AccessCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card_id', models.CharField(max_length=64, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('issued_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_cards', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
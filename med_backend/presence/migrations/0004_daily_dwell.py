@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('presence', '0003_gate_devices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwellRefreshMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facility', models.CharField(choices=[('campus', 'Campus'), ('library', 'Library')], max_length=10, unique=True)),
+                ('resume_from', models.DateField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyDwell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facility', models.CharField(choices=[('campus', 'Campus'), ('library', 'Library')], max_length=10)),
+                ('day', models.DateField()),
+                ('seconds', models.PositiveIntegerField(help_text='Overlapping visits counted once')),
+                ('visits', models.PositiveIntegerField(help_text='Visits overlapping the day, after merging overlaps')),
+                ('includes_open', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField()),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_dwell', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['facility', 'day'], name='dwell_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'facility', 'day'), name='dwell_one_row_per_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,109 @@
+# presence/models.py
+
+from django.db import models
+from django.conf import settings
+
+User = settings.AUTH_USER_MODEL
+
+
+class PresenceState(models.Model):
+    """
+    Where a student is right now, per facility: one row per (student, facility), kept in
+    step with the facility's entry/exit log by presence.services in the same transaction.
+    Students without a row have never been logged at that facility.
+    """
+    HOSTEL = 'hostel'
+    CAMPUS = 'campus'
+    FACILITY_CHOICES = [
+        (HOSTEL, 'Hostel'),
+        (CAMPUS, 'Campus'),
+    ]
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='presence_states')
+    facility = models.CharField(max_length=10, choices=FACILITY_CHOICES)
+    is_inside = models.BooleanField(default=False)
+    since = models.DateTimeField(help_text="Time of the entry or exit that set the current state")
+    last_event_id = models.BigIntegerField(null=True, blank=True, help_text="Log row of that entry or exit")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'facility'], name='presence_one_state_per_facility'),
+        ]
+        indexes = [
+            # "Who is out (or in) right now", longest first
+            models.Index(fields=['facility', 'is_inside', 'since'], name='presence_state_idx'),
+        ]
+
+    def __str__(self):
+        where = 'inside' if self.is_inside else 'outside'
+        return f"{self.student.username} {where} {self.facility} since {self.since:%Y-%m-%d %H:%M}"
+
+
+class GateDevice(models.Model):
+    """A turnstile or RFID reader posting tap batches to the ingestion endpoint."""
+    name = models.CharField(max_length=100, unique=True)
+    facility = models.CharField(max_length=10, choices=PresenceState.FACILITY_CHOICES)
+    # sha256 of the device token; the token itself is only shown once, on creation
+    key_hash = models.CharField(max_length=64, unique=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.facility})"
+
+
+class AccessCard(models.Model):
+    """An RFID card issued to a student."""
+    card_id = models.CharField(max_length=64, unique=True)
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='access_cards')
+    is_active = models.BooleanField(default=True)
+    issued_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.card_id} -> {self.student.username}"
+
+
+class DailyDwell(models.Model):
+    """
+    Time a student spent inside a facility on one local day, rolled up from the facility's
+    entry/exit log by presence.dwell. Days without a visit have no row.
+    """
+    CAMPUS = 'campus'
+    LIBRARY = 'library'
+    FACILITY_CHOICES = [
+        (CAMPUS, 'Campus'),
+        (LIBRARY, 'Library'),
+    ]
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_dwell')
+    facility = models.CharField(max_length=10, choices=FACILITY_CHOICES)
+    day = models.DateField()
+    seconds = models.PositiveIntegerField(help_text="Overlapping visits counted once")
+    visits = models.PositiveIntegerField(help_text="Visits overlapping the day, after merging overlaps")
+    # Part of the time comes from an entry still open at the refresh, counted up to then
+    includes_open = models.BooleanField(default=False)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'facility', 'day'], name='dwell_one_row_per_day'),
+        ]
+        indexes = [
+            # Per-day and per-batch reports over a date range
+            models.Index(fields=['facility', 'day'], name='dwell_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} {self.facility} {self.day}: {self.seconds / 3600:.1f}h"
+
+
+class DwellRefreshMark(models.Model):
+    """First day presence.dwell recomputes on its next run, per facility."""
+    facility = models.CharField(max_length=10, choices=DailyDwell.FACILITY_CHOICES, unique=True)
+    resume_from = models.DateField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.facility} from {self.resume_from}"
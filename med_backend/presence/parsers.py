@@ -0,0 +1,29 @@
+# presence/parsers.py
+
+import json
+
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Newline-delimited JSON: one object per line. Returns a list of (line number, object)
+    pairs; a line that is not a JSON object comes back as None so the rest of the batch can
+    still be processed. Blank lines are skipped.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        records = []
+        if stream is None:
+            return records
+        for number, raw in enumerate(stream, start=1):
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            records.append((number, record if isinstance(record, dict) else None))
+        return records
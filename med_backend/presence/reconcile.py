@@ -0,0 +1,88 @@
+# presence/reconcile.py
+
+"""
+Closing entries nobody tapped out of.
+
+An entry left open (a forgotten exit tap) blocks the student's next entry and stays in
+every "currently present" count. close_stale_entries() closes the open rows of a facility
+whose entry is older than STALE_ENTRY_HOURS[facility]:
+
+- the open rows are found with one query on the facility's partial open-entry index
+  (only open rows are indexed, so it stays small however long the log grows)
+- they are closed in bulk with a synthetic exit, entry_time plus the threshold, and
+  auto_closed=True so reports can tell them apart from real exits
+- hostel and campus presence states pointing at a closed row are switched to outside
+
+Run it from cron with `manage.py close_stale_entries`.
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, ExpressionWrapper, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import PresenceState
+from .services import FACILITY_LOGS
+
+# facility -> log model with entry_time, exit_time and auto_closed
+STALE_ENTRY_LOGS = {
+    'library': 'library.Attendance',
+    **FACILITY_LOGS,
+}
+
+DEFAULT_STALE_ENTRY_HOURS = {'library': 12, PresenceState.CAMPUS: 18, PresenceState.HOSTEL: 24 * 7}
+
+CLOSE_BATCH_SIZE = 500
+
+
+@dataclass
+class StaleEntries:
+    facility: str
+    threshold: timedelta
+    found: int = 0
+    closed: int = 0
+    oldest_entry: object = None
+
+
+def stale_threshold(facility):
+    hours = {**DEFAULT_STALE_ENTRY_HOURS, **getattr(settings, 'STALE_ENTRY_HOURS', {})}[facility]
+    return timedelta(hours=hours)
+
+
+def close_stale_entries(facility, now=None, dry_run=False):
+    """Close the facility's open entries older than its threshold. Returns a StaleEntries report."""
+    model = apps.get_model(STALE_ENTRY_LOGS[facility])
+    threshold = stale_threshold(facility)
+    report = StaleEntries(facility, threshold)
+
+    stale = list(
+        model.objects.filter(exit_time__isnull=True, entry_time__lt=(now or timezone.now()) - threshold)
+        .order_by('entry_time')
+        .values_list('id', 'entry_time')
+    )
+    report.found = len(stale)
+    if stale:
+        report.oldest_entry = stale[0][1]
+    if dry_run:
+        return report
+
+    synthetic_exit = ExpressionWrapper(F('entry_time') + threshold, output_field=DateTimeField())
+    ids = [row_id for row_id, _ in stale]
+    with transaction.atomic():
+        for start in range(0, len(ids), CLOSE_BATCH_SIZE):
+            batch = ids[start:start + CLOSE_BATCH_SIZE]
+            # exit_time is re-checked: a real exit may have been recorded since the read
+            report.closed += model.objects.filter(pk__in=batch, exit_time__isnull=True).update(
+                exit_time=synthetic_exit, auto_closed=True,
+            )
+            if facility in FACILITY_LOGS:
+                PresenceState.objects.filter(facility=facility, is_inside=True, last_event_id__in=batch).update(
+                    is_inside=False,
+                    since=Subquery(model.objects.filter(pk=OuterRef('last_event_id')).values('exit_time')[:1]),
+                    updated_at=timezone.now(),
+                )
+    return report
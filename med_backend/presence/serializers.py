@@ -0,0 +1,26 @@
+from rest_framework import serializers
+from users.serializers import UserSimpleSerializer
+from .models import PresenceState
+
+
+class PresenceStateSerializer(serializers.ModelSerializer):
+    student = UserSimpleSerializer(read_only=True)
+
+    class Meta:
+        model = PresenceState
+        fields = ['student', 'facility', 'is_inside', 'since', 'last_event_id']
+
+
+class DwellStudentSerializer(serializers.Serializer):
+    """A student's DailyDwell rows summed over a date range (see DwellStudentListView)."""
+    student_id = serializers.IntegerField()
+    username = serializers.CharField(source='student__username')
+    days_present = serializers.IntegerField()
+    total_hours = serializers.SerializerMethodField()
+    average_hours = serializers.SerializerMethodField()
+
+    def get_total_hours(self, row):
+        return round(row['total'] / 3600, 2)
+
+    def get_average_hours(self, row):
+        return round(row['total'] / row['days_present'] / 3600, 2)
@@ -0,0 +1,109 @@
+# presence/services.py
+
+"""
+Entry and exit recording for the hostel and campus gates.
+
+Each facility keeps its full history in a log model (an entry row, closed by its exit
+time) and its current state in PresenceState. record_entry() and record_exit() validate
+against the state row and write the log row and the state together, in one transaction,
+so a check never scans the log however long it grows:
+
+    SELECT state FOR UPDATE       -- one indexed row, inserted on the first event
+    INSERT / UPDATE log row
+    UPDATE state
+
+Every write to the logs should go through these functions; rebuild_presence() recomputes
+the states from the logs if they ever drift.
+"""
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import PresenceState
+
+# facility -> entry/exit log model
+FACILITY_LOGS = {
+    PresenceState.HOSTEL: 'hostel_attendance.HostelAttendance',
+    PresenceState.CAMPUS: 'college_in_out_log.CollegeInOutLog',
+}
+
+
+class PresenceError(Exception):
+    pass
+
+
+class AlreadyInside(PresenceError):
+    """Entry marked while the student's last entry is still open."""
+
+
+class NotInside(PresenceError):
+    """Exit marked without an open entry."""
+
+
+def log_model(facility):
+    return apps.get_model(FACILITY_LOGS[facility])
+
+
+def _locked_state(student, facility):
+    # Create the row first, so even a student's first entry has a row to lock: two first
+    # entries at once then queue on it instead of both inserting it. The row is rolled back
+    # with the transaction if the entry or exit is refused.
+    state, _ = PresenceState.objects.select_for_update().get_or_create(
+        student=student, facility=facility, defaults={'is_inside': False, 'since': timezone.now()},
+    )
+    return state
+
+
+def record_entry(student, facility, marked_by=None):
+    """Open an entry for `student`; raises AlreadyInside. Returns the log row."""
+    with transaction.atomic():
+        state = _locked_state(student, facility)
+        if state.is_inside:
+            raise AlreadyInside(facility)
+        entry = log_model(facility).objects.create(student=student, marked_by=marked_by)
+        state.is_inside, state.since, state.last_event_id = True, entry.entry_time, entry.pk
+        state.save()
+    return entry
+
+
+def record_exit(student, facility, marked_by=None):
+    """Close the student's open entry; raises NotInside. Returns the log row."""
+    with transaction.atomic():
+        state = _locked_state(student, facility)
+        if not state.is_inside:
+            raise NotInside(facility)
+        entry = log_model(facility).objects.get(pk=state.last_event_id)
+        entry.exit_time = timezone.now()
+        entry.marked_by = marked_by
+        entry.save(update_fields=['exit_time', 'marked_by'])
+        state.is_inside, state.since = False, entry.exit_time
+        state.save()
+    return entry
+
+
+def rebuild_presence(facility):
+    """
+    Recompute every state of `facility` from its latest log row per student. Returns the
+    number of states written.
+    """
+    model = log_model(facility)
+    latest = model.objects.filter(student=OuterRef('student')).order_by('-entry_time', '-id')
+    rows = (
+        model.objects.filter(pk=Subquery(latest.values('pk')[:1]))
+        .values('pk', 'student_id', 'entry_time', 'exit_time')
+    )
+    states = [
+        PresenceState(
+            student_id=row['student_id'], facility=facility,
+            is_inside=row['exit_time'] is None,
+            since=row['exit_time'] or row['entry_time'],
+            last_event_id=row['pk'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        PresenceState.objects.filter(facility=facility).delete()
+        PresenceState.objects.bulk_create(states, batch_size=1000)
+    return len(states)
@@ -0,0 +1,330 @@
+import json
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from django.test import TestCase
+
+from attendance.models import Batch
+from college_in_out_log.models import CollegeInOutLog
+from hostel_attendance.models import HostelAttendance
+from library.models import Attendance
+from users.models import User
+from users.tokens import issue_tokens
+from .authentication import create_device
+from .dwell import compute_dwell, refresh_dwell
+from .ingest import card_directory
+from .reconcile import close_stale_entries
+from .models import AccessCard, DailyDwell, DwellRefreshMark, PresenceState
+from .services import rebuild_presence
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(user).access_token}')
+    return client
+
+
+class PresenceStateTests(TestCase):
+    def setUp(self):
+        self.warden = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        self.students = [
+            User.objects.create_user(username=f'student{i:03}', password='pass123', role='student')
+            for i in range(3)
+        ]
+
+    def test_entry_and_exit_keep_the_state_in_step_with_the_log(self):
+        client = client_for(self.students[0])
+        self.assertEqual(client.post(reverse('hostel-entry')).status_code, 201)
+        state = PresenceState.objects.get(student=self.students[0], facility='hostel')
+        entry = HostelAttendance.objects.get()
+        self.assertEqual((state.is_inside, state.since, state.last_event_id), (True, entry.entry_time, entry.id))
+
+        self.assertEqual(client.post(reverse('hostel-entry')).status_code, 400)
+        self.assertEqual(client.post(reverse('hostel-exit')).status_code, 200)
+        self.assertEqual(client.post(reverse('hostel-exit')).status_code, 400)
+
+        entry.refresh_from_db()
+        state.refresh_from_db()
+        self.assertIsNotNone(entry.exit_time)
+        self.assertEqual((state.is_inside, state.since), (False, entry.exit_time))
+        # Facilities are tracked separately
+        self.assertEqual(client.post(reverse('college-entry')).status_code, 201)
+        self.assertEqual(PresenceState.objects.filter(student=self.students[0]).count(), 2)
+
+    def test_a_refused_first_event_leaves_no_state(self):
+        # The state row a first event locks is only kept if the event is recorded
+        self.assertEqual(client_for(self.students[1]).post(reverse('hostel-exit')).status_code, 400)
+        self.assertFalse(PresenceState.objects.filter(student=self.students[1]).exists())
+
+    def test_who_is_out_and_summary(self):
+        for student in self.students:
+            client_for(student).post(reverse('hostel-entry'))
+        client_for(self.students[1]).post(reverse('hostel-exit'))
+
+        warden = client_for(self.warden)
+        response = warden.get(reverse('presence-list', args=['hostel']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['student']['username'] for row in response.data['results']], ['student001'])
+        response = warden.get(reverse('presence-list', args=['hostel']), {'state': 'in'})
+        self.assertEqual(response.data['count'], 2)
+        response = warden.get(reverse('presence-summary', args=['hostel']))
+        self.assertEqual((response.data['inside'], response.data['outside']), (2, 1))
+
+        self.assertEqual(warden.get(reverse('presence-list', args=['library'])).status_code, 404)
+        self.assertEqual(client_for(self.students[0]).get(reverse('presence-list', args=['hostel'])).status_code, 403)
+
+    def test_rebuild_from_the_logs(self):
+        first, second = self.students[:2]
+        CollegeInOutLog.objects.create(student=first, exit_time='2025-01-01T10:00:00Z')
+        latest = CollegeInOutLog.objects.create(student=first)
+        closed = CollegeInOutLog.objects.create(student=second, exit_time='2025-01-02T10:00:00Z')
+
+        self.assertEqual(rebuild_presence('campus'), 2)
+        states = {state.student_id: state for state in PresenceState.objects.filter(facility='campus')}
+        self.assertEqual((states[first.id].is_inside, states[first.id].last_event_id), (True, latest.id))
+        self.assertEqual((states[second.id].is_inside, states[second.id].last_event_id), (False, closed.id))
+        self.assertEqual(client_for(second).post(reverse('college-exit')).status_code, 400)
+        self.assertEqual(client_for(first).post(reverse('college-exit')).status_code, 200)
+
+
+class GateIngestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        card_directory.clear()
+        self.addCleanup(card_directory.clear)
+        self.students = [
+            User.objects.create_user(username=f'student{i:03}', password='pass123', role='student')
+            for i in range(3)
+        ]
+        for index, student in enumerate(self.students):
+            AccessCard.objects.create(card_id=f'CARD{index}', student=student)
+        self.device, key = create_device('main-gate', 'campus')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Device {key}')
+        self.start = timezone.now() - timedelta(minutes=30)
+
+    def tap(self, card, direction, minute, **extra):
+        return {'card_id': card, 'direction': direction, 'timestamp': (self.start + timedelta(minutes=minute)).isoformat(), **extra}
+
+    def post(self, taps, client=None):
+        body = '\n'.join(tap if isinstance(tap, str) else json.dumps(tap) for tap in taps)
+        return (client or self.client).post(reverse('presence-ingest'), body, content_type='application/x-ndjson')
+
+    def test_batch_is_ordered_deduplicated_and_written_in_bulk(self):
+        response = self.post([
+            self.tap('CARD0', 'out', 5),
+            self.tap('CARD0', 'in', 1),
+            self.tap('CARD0', 'in', 1),             # the same tap twice
+            self.tap('CARD1', 'in', 2),
+            self.tap('CARD1', 'in', 3),             # a second swipe
+            self.tap('CARD2', 'out', 4),            # never entered
+            self.tap('NOPE', 'in', 4),
+            self.tap('CARD2', 'in', 4, facility='hostel'),
+            'not json',
+        ])
+        self.assertEqual(response.status_code, 200)
+        counts = {key: response.data[key] for key in ('received', 'recorded', 'stale', 'duplicate', 'no_open_entry', 'unknown_card', 'invalid')}
+        self.assertEqual(counts, {
+            'received': 9, 'recorded': 3, 'stale': 1, 'duplicate': 1,
+            'no_open_entry': 1, 'unknown_card': 1, 'invalid': 2,
+        })
+        self.assertEqual(sorted(row['line'] for row in response.data['rejected']), [6, 7, 8, 9])
+
+        first = CollegeInOutLog.objects.get(student=self.students[0])
+        self.assertEqual((first.entry_time, first.exit_time), (self.start + timedelta(minutes=1), self.start + timedelta(minutes=5)))
+        states = {state.student_id: state for state in PresenceState.objects.filter(facility='campus')}
+        self.assertFalse(states[self.students[0].id].is_inside)
+        self.assertTrue(states[self.students[1].id].is_inside)
+        self.assertNotIn(self.students[2].id, states)
+
+    def test_later_batches_close_entries_and_retries_are_harmless(self):
+        batch = [self.tap('CARD0', 'in', 1), self.tap('CARD1', 'in', 1)]
+        self.post(batch)
+        self.assertEqual(self.post(batch).data['stale'], 2)
+        self.assertEqual(CollegeInOutLog.objects.count(), 2)
+
+        # A student who marked entry themselves can leave through the gate, and the reverse
+        student = User.objects.create_user(username='student100', password='pass123', role='student')
+        AccessCard.objects.create(card_id='CARD100', student=student)
+        self.assertEqual(client_for(student).post(reverse('college-entry')).status_code, 201)
+
+        response = self.post([self.tap('CARD0', 'out', 10), self.tap('CARD100', 'out', 31)])
+        self.assertEqual(response.data['recorded'], 2)
+        self.assertEqual(CollegeInOutLog.objects.filter(exit_time__isnull=True).count(), 1)
+        self.assertEqual(client_for(self.students[1]).post(reverse('college-exit')).status_code, 200)
+        self.assertFalse(CollegeInOutLog.objects.filter(exit_time__isnull=True).exists())
+
+    def test_new_cards_are_picked_up(self):
+        self.assertEqual(self.post([self.tap('CARD9', 'in', 1)]).data['unknown_card'], 1)
+        AccessCard.objects.create(card_id='CARD9', student=self.students[0])
+        self.assertEqual(self.post([self.tap('CARD9', 'in', 1)]).data['recorded'], 1)
+
+    def test_only_devices_may_post(self):
+        self.assertEqual(self.post([self.tap('CARD0', 'in', 1)], client=client_for(self.students[0])).status_code, 401)
+        stranger = APIClient()
+        stranger.credentials(HTTP_AUTHORIZATION='Device wrong-key')
+        self.assertEqual(self.post([self.tap('CARD0', 'in', 1)], client=stranger).status_code, 401)
+        self.device.is_active = False
+        self.device.save()
+        self.assertEqual(self.post([self.tap('CARD0', 'in', 1)]).status_code, 401)
+
+    def test_simulated_reader(self):
+        out = StringIO()
+        call_command('simulate_gate_reader', events=300, students=20, batch=100, stdout=out)
+        self.assertIn('recorded 300', out.getvalue())
+        self.assertFalse(AccessCard.objects.filter(card_id__startswith='SIM').exists())
+
+
+class StaleEntryTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+        self.now = timezone.now()
+
+    def test_stale_entries_are_closed_with_a_synthetic_exit(self):
+        stale_library = Attendance.objects.create(user=self.student, entry_time=self.now - timedelta(hours=20))
+        fresh_library = Attendance.objects.create(user=self.student, entry_time=self.now - timedelta(hours=1))
+        stale_hostel = HostelAttendance.objects.create(student=self.student, entry_time=self.now - timedelta(days=8))
+        PresenceState.objects.create(
+            student=self.student, facility='hostel', is_inside=True,
+            since=stale_hostel.entry_time, last_event_id=stale_hostel.id,
+        )
+        fresh_campus = CollegeInOutLog.objects.create(student=self.student, entry_time=self.now - timedelta(hours=2))
+
+        out = StringIO()
+        call_command('close_stale_entries', '--dry-run', stdout=out)
+        self.assertIn('library: 1 open entries older than 12h', out.getvalue())
+        self.assertFalse(Attendance.objects.filter(auto_closed=True).exists())
+
+        call_command('close_stale_entries', stdout=StringIO())
+        stale_library.refresh_from_db()
+        self.assertTrue(stale_library.auto_closed)
+        self.assertEqual(stale_library.exit_time, stale_library.entry_time + timedelta(hours=12))
+        fresh_library.refresh_from_db()
+        fresh_campus.refresh_from_db()
+        self.assertIsNone(fresh_library.exit_time)
+        self.assertIsNone(fresh_campus.exit_time)
+
+        stale_hostel.refresh_from_db()
+        state = PresenceState.objects.get(facility='hostel')
+        self.assertEqual((state.is_inside, state.since), (False, stale_hostel.exit_time))
+        self.assertEqual(stale_hostel.exit_time, stale_hostel.entry_time + timedelta(days=7))
+        # The student is no longer stuck
+        self.assertEqual(client_for(self.student).post(reverse('hostel-entry')).status_code, 201)
+        self.assertEqual(close_stale_entries('hostel').found, 0)
+
+    def test_the_open_entry_scan_uses_the_partial_index(self):
+        queryset = Attendance.objects.filter(exit_time__isnull=True, entry_time__lt=self.now)
+        self.assertIn('library_open_age_idx', queryset.explain())
+
+
+def at(day, hour, minute=0):
+    return timezone.make_aware(datetime(2026, 3, day, hour, minute))
+
+
+class DailyDwellTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+        self.a, self.b, self.c = [
+            User.objects.create_user(username=f'student{i:03}', password='pass123', role='student')
+            for i in range(3)
+        ]
+        self.now = at(12, 12)
+        visits = [
+            (self.a, at(10, 22), at(11, 2)),    # across midnight
+            (self.a, at(10, 23), at(10, 23, 30)),  # inside the previous visit
+            (self.a, at(11, 10), at(11, 12)),
+            (self.a, at(11, 11), at(11, 13)),   # overlapping
+            (self.a, at(12, 11), None),         # open for an hour
+            (self.b, at(11, 9), at(11, 10, 30)),
+            (self.c, at(9, 8), None),           # forgotten exit: counted up to the 18h threshold
+        ]
+        self.logs = [
+            CollegeInOutLog.objects.create(student=student, entry_time=entry, exit_time=exit_time)
+            for student, entry, exit_time in visits
+        ]
+
+    def rollup(self):
+        return {
+            (row.student_id, row.day): (row.seconds, row.visits, row.includes_open)
+            for row in DailyDwell.objects.filter(facility='campus')
+        }
+
+    def test_visits_are_clipped_at_midnight_merged_and_capped(self):
+        report = refresh_dwell('campus', now=self.now)
+        self.assertEqual((report.start_day, report.end_day), (date(2026, 3, 9), date(2026, 3, 12)))
+        self.assertEqual(self.rollup(), {
+            (self.a.id, date(2026, 3, 10)): (2 * 3600, 1, False),
+            (self.a.id, date(2026, 3, 11)): (5 * 3600, 2, False),
+            (self.a.id, date(2026, 3, 12)): (3600, 1, True),
+            (self.b.id, date(2026, 3, 11)): (90 * 60, 1, False),
+            (self.c.id, date(2026, 3, 9)): (16 * 3600, 1, True),
+            (self.c.id, date(2026, 3, 10)): (2 * 3600, 1, True),
+        })
+
+    def test_sql_and_python_agree(self):
+        for zone in ('UTC', 'Asia/Kolkata'):
+            with timezone.override(zone):
+                sql = compute_dwell('campus', date(2026, 3, 8), date(2026, 3, 12), now=self.now, engine='sql')
+                python = compute_dwell('campus', date(2026, 3, 8), date(2026, 3, 12), now=self.now, engine='python')
+                self.assertEqual(sorted(sql), sorted(python))
+        Attendance.objects.create(user=self.a, entry_time=at(11, 9), exit_time=at(11, 11))
+        self.assertEqual(
+            compute_dwell('library', date(2026, 3, 11), date(2026, 3, 11), now=self.now, engine='sql'),
+            [(self.a.id, date(2026, 3, 11), 2 * 3600, 1, False)],
+        )
+
+    def test_refresh_is_incremental(self):
+        refresh_dwell('campus', now=self.now)
+        # Two days back, or the day of the oldest visit still open if earlier
+        self.assertEqual(DwellRefreshMark.objects.get(facility='campus').resume_from, date(2026, 3, 10))
+
+        open_visit = self.logs[4]
+        open_visit.exit_time = at(12, 15)
+        open_visit.save()
+        CollegeInOutLog.objects.create(student=self.b, entry_time=at(8, 9), exit_time=at(8, 10))
+        report = refresh_dwell('campus', now=at(12, 18))
+
+        self.assertEqual(report.start_day, date(2026, 3, 10))
+        rollup = self.rollup()
+        self.assertEqual(rollup[self.a.id, date(2026, 3, 12)], (4 * 3600, 1, False))
+        # Before the mark: neither read nor rewritten
+        self.assertNotIn((self.b.id, date(2026, 3, 8)), rollup)
+        self.assertEqual(rollup[self.c.id, date(2026, 3, 9)], (16 * 3600, 1, True))
+
+        out = StringIO()
+        call_command('refresh_dwell', '--facility', 'campus', '--since', '2026-03-08', stdout=out)
+        self.assertIn('campus:', out.getvalue())
+        self.assertEqual(self.rollup()[self.b.id, date(2026, 3, 8)], (3600, 1, False))
+
+    def test_batch_reports_read_the_rollup(self):
+        refresh_dwell('campus', now=self.now)
+        batch = Batch.objects.create(name='MBBS 2026')
+        batch.students.add(self.a, self.b)
+        client = client_for(self.admin)
+        params = {'batch': batch.id, 'start_date': '2026-03-10', 'end_date': '2026-03-12'}
+
+        response = client.get(reverse('presence-dwell-daily', args=['campus']), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['students'], 2)
+        self.assertEqual(
+            [(row['day'], row['students'], row['average_hours']) for row in response.data['days']],
+            [(date(2026, 3, 10), 1, 2.0), (date(2026, 3, 11), 2, 3.25), (date(2026, 3, 12), 1, 1.0)],
+        )
+
+        response = client.get(reverse('presence-dwell-students', args=['campus']), params)
+        self.assertEqual(
+            [(row['username'], row['days_present'], row['total_hours'], row['average_hours'])
+             for row in response.data['results']],
+            [('student000', 3, 8.0, 2.67), ('student001', 1, 1.5, 1.5)],
+        )
+
+        self.assertEqual(client.get(reverse('presence-dwell-daily', args=['hostel'])).status_code, 404)
+        self.assertEqual(
+            client.get(reverse('presence-dwell-daily', args=['campus']), {'start_date': '2025-01-01'}).status_code, 400,
+        )
+        self.assertEqual(client_for(self.a).get(reverse('presence-dwell-daily', args=['campus'])).status_code, 403)
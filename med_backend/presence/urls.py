@@ -0,0 +1,14 @@
+# presence/urls.py
+
+from django.urls import path
+from .views import (
+    DwellDailyView, DwellStudentListView, GateEventIngestView, PresenceListView, PresenceSummaryView,
+)
+
+urlpatterns = [
+    path('ingest/', GateEventIngestView.as_view(), name='presence-ingest'),
+    path('dwell/<str:facility>/', DwellDailyView.as_view(), name='presence-dwell-daily'),
+    path('dwell/<str:facility>/students/', DwellStudentListView.as_view(), name='presence-dwell-students'),
+    path('<str:facility>/', PresenceListView.as_view(), name='presence-list'),
+    path('<str:facility>/summary/', PresenceSummaryView.as_view(), name='presence-summary'),
+]
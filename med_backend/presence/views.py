@@ -0,0 +1,189 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import generics, status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from hostel_attendance.permissions import IsAdminPrincipalOrHiddenSuperuser
+from .authentication import GateDeviceAuthentication, IsGateDevice
+from .ingest import ingest_batch
+from .models import DailyDwell, PresenceState
+from .parsers import NDJSONParser
+from .serializers import DwellStudentSerializer, PresenceStateSerializer
+
+FACILITIES = dict(PresenceState.FACILITY_CHOICES)
+DWELL_FACILITIES = dict(DailyDwell.FACILITY_CHOICES)
+
+
+def unknown_facility(facility, choices=FACILITIES):
+    return Response(
+        {"error": "Unknown facility.", "details": f"Use one of: {', '.join(choices)}"},
+        status=status.HTTP_404_NOT_FOUND,
+    )
+
+
+class PresencePagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class PresenceListView(generics.ListAPIView):
+    """
+    Students currently outside (?state=out, the default) or inside (?state=in) a facility,
+    longest first. Reads PresenceState through its (facility, is_inside, since) index.
+    """
+    serializer_class = PresenceStateSerializer
+    permission_classes = [IsAuthenticated, IsAdminPrincipalOrHiddenSuperuser]
+    pagination_class = PresencePagination
+
+    def list(self, request, *args, **kwargs):
+        if kwargs['facility'] not in FACILITIES:
+            return unknown_facility(kwargs['facility'])
+        if request.query_params.get('state', 'out') not in ('in', 'out'):
+            return Response(
+                {"error": "Invalid state.", "details": "Use state=in or state=out."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return (
+            PresenceState.objects.select_related('student')
+            .filter(
+                facility=self.kwargs['facility'],
+                is_inside=self.request.query_params.get('state', 'out') == 'in',
+            )
+            .order_by('since', 'id')
+        )
+
+
+class PresenceSummaryView(APIView):
+    """How many students are inside and outside a facility right now."""
+    permission_classes = [IsAuthenticated, IsAdminPrincipalOrHiddenSuperuser]
+
+    def get(self, request, facility):
+        if facility not in FACILITIES:
+            return unknown_facility(facility)
+        counts = PresenceState.objects.filter(facility=facility).aggregate(
+            inside=Count('id', filter=Q(is_inside=True)),
+            outside=Count('id', filter=Q(is_inside=False)),
+        )
+        return Response({'facility': facility, **counts})
+
+
+class GateEventIngestView(APIView):
+    """
+    Tap batches from gate readers, as NDJSON (Content-Type: application/x-ndjson), one
+    {"card_id", "facility", "direction": "in"|"out", "timestamp"} object per line.
+    Authenticated with `Authorization: Device <key>`. See presence.ingest.
+    """
+    authentication_classes = [GateDeviceAuthentication]
+    permission_classes = [IsGateDevice]
+    parser_classes = [NDJSONParser]
+
+    def post(self, request):
+        records = request.data
+        limit = getattr(settings, 'GATE_INGEST_MAX_EVENTS', 5000)
+        if len(records) > limit:
+            return Response(
+                {"error": "Batch too large.", "details": f"Send at most {limit} events per request."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        return Response(ingest_batch(records, request.auth).as_dict())
+
+
+class DwellRollupMixin:
+    """
+    DailyDwell rows of a facility (see presence.dwell), filtered by start_date and end_date
+    (YYYY-MM-DD, the last 30 days by default), batch and student_id.
+    """
+    permission_classes = [IsAuthenticated, IsAdminPrincipalOrHiddenSuperuser]
+    default_range_days = 30
+    max_range_days = 366
+
+    def dwell_rows(self, request, facility):
+        """(rows, start_date, end_date), or an error Response as the first item."""
+        if facility not in DWELL_FACILITIES:
+            return unknown_facility(facility, DWELL_FACILITIES), None, None
+        params = request.query_params
+        end_date = parse_date(params.get('end_date') or '') or timezone.localdate()
+        start_date = parse_date(params.get('start_date') or '') or end_date - timedelta(days=self.default_range_days - 1)
+        if start_date > end_date:
+            error = {"error": "start_date cannot be after end_date."}
+        elif (end_date - start_date).days >= self.max_range_days:
+            error = {"error": f"Date range cannot exceed {self.max_range_days} days."}
+        else:
+            error = None
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST), None, None
+
+        rows = DailyDwell.objects.filter(facility=facility, day__range=(start_date, end_date))
+        if params.get('batch'):
+            rows = rows.filter(student__batches=params['batch'])
+        if params.get('student_id'):
+            rows = rows.filter(student_id=params['student_id'])
+        return rows, start_date, end_date
+
+
+class DwellDailyView(DwellRollupMixin, APIView):
+    """
+    Time spent on campus or in the library per day, over the students present that day:
+    how many were present and their average and total hours. Reads the DailyDwell rollup.
+    """
+
+    def get(self, request, facility):
+        rows, start_date, end_date = self.dwell_rows(request, facility)
+        if isinstance(rows, Response):
+            return rows
+        days = (
+            rows.order_by().values('day')
+            .annotate(students=Count('student_id'), average=Avg('seconds'), total=Sum('seconds'))
+            .order_by('day')
+        )
+        overall = rows.aggregate(students=Count('student_id', distinct=True), average=Avg('seconds'))
+        return Response({
+            'facility': facility,
+            'start_date': start_date,
+            'end_date': end_date,
+            'students': overall['students'],
+            'average_hours_per_day': round((overall['average'] or 0) / 3600, 2),
+            'days': [
+                {
+                    'day': row['day'],
+                    'students': row['students'],
+                    'average_hours': round(row['average'] / 3600, 2),
+                    'total_hours': round(row['total'] / 3600, 2),
+                }
+                for row in days
+            ],
+        })
+
+
+class DwellStudentListView(DwellRollupMixin, generics.ListAPIView):
+    """
+    Per-student time on campus or in the library over the range, most hours first:
+    days present, total hours and average hours per day present.
+    """
+    serializer_class = DwellStudentSerializer
+    pagination_class = PresencePagination
+
+    def list(self, request, *args, **kwargs):
+        rows, _, _ = self.dwell_rows(request, kwargs['facility'])
+        if isinstance(rows, Response):
+            return rows
+        self.rows = rows
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return (
+            self.rows.order_by().values('student_id', 'student__username')
+            .annotate(days_present=Count('id'), total=Sum('seconds'))
+            .order_by('-total', 'student_id')
+        )
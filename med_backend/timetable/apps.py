@@ -4,4 +4,10 @@ from django.apps import AppConfig
 
 class TimetableConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'timetable'
\ No newline at end of file
+    name = 'timetable'
+
+    def ready(self):
+        from . import signals  # noqa: F401  Registers weekly timetable rebuild receivers
+
+        from core.cache import invalidate_on_change
+        invalidate_on_change(self.get_model('ClassSchedule'))
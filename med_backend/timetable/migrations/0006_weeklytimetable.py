@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_alter_attendancerecord_unique_together_and_more'),
+        ('timetable', '0005_alter_timetableimage_uploaded_by_timetablefile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyTimetable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.TextField(help_text='Serialized JSON document, served as-is')),
+                ('etag', models.CharField(help_text='SHA-256 of the document, used as a strong ETag', max_length=64)),
+                ('compiled_at', models.DateTimeField(auto_now=True)),
+                ('batch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_timetable', to='attendance.batch')),
+            ],
+        ),
+    ]
@@ -107,4 +107,17 @@ class ClassSession(models.Model):
     period = models.CharField(max_length=50)
 
     def __str__(self):
-        return f"{self.subject.name} on {self.date} for {self.batch.name}"
\ No newline at end of file
+        return f"{self.subject.name} on {self.date} for {self.batch.name}"
+
+class WeeklyTimetable(models.Model):
+    """
+    Precompiled weekly timetable document for a batch.
+    Rebuilt whenever the batch's ClassSchedule rows change, so reads never touch ClassSchedule.
+    """
+    batch = models.OneToOneField(Batch, on_delete=models.CASCADE, related_name='weekly_timetable')
+    document = models.TextField(help_text="Serialized JSON document, served as-is")
+    etag = models.CharField(max_length=64, help_text="SHA-256 of the document, used as a strong ETag")
+    compiled_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Weekly timetable for {self.batch.name} ({self.etag[:8]})"
@@ -1,6 +1,7 @@
 # timetable/permissions.py
 
 from rest_framework import permissions
+from users.capabilities import is_office
 
 
 class IsAdminPrincipalSuperuser(permissions.BasePermission):
@@ -9,11 +10,7 @@ class IsAdminPrincipalSuperuser(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        return (
-            request.user.is_authenticated and (
-                request.user.role in ['admin', 'principal'] or request.user.is_hidden_superuser
-            )
-        )
+        return is_office(request.user)
 
 
 class IsReadOnly(permissions.BasePermission):
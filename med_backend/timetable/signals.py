@@ -0,0 +1,46 @@
+# timetable/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from attendance.models import Batch
+from .models import ClassSchedule
+from .weekly import compile_weekly_timetable, forget
+
+
+def _rebuild_after_commit(*batch_ids):
+    for batch_id in {batch_id for batch_id in batch_ids if batch_id}:
+        transaction.on_commit(lambda batch_id=batch_id: compile_weekly_timetable(batch_id))
+
+
+@receiver(pre_save, sender=ClassSchedule)
+def remember_previous_batch(sender, instance, **kwargs):
+    # A schedule moved to another batch must also be removed from the old batch's document
+    instance._previous_batch_id = None
+    if instance.pk:
+        instance._previous_batch_id = (
+            ClassSchedule.objects.filter(pk=instance.pk).values_list('batch_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ClassSchedule)
+def rebuild_on_schedule_save(sender, instance, **kwargs):
+    _rebuild_after_commit(instance.batch_id, getattr(instance, '_previous_batch_id', None))
+
+
+@receiver(post_delete, sender=ClassSchedule)
+def rebuild_on_schedule_delete(sender, instance, **kwargs):
+    _rebuild_after_commit(instance.batch_id)
+
+
+@receiver(post_save, sender=Batch)
+def rebuild_on_batch_save(sender, instance, created, **kwargs):
+    # The batch name is part of the document
+    if not created:
+        _rebuild_after_commit(instance.id)
+
+
+@receiver(post_delete, sender=Batch)
+def forget_deleted_batch(sender, instance, **kwargs):
+    forget(instance.id)
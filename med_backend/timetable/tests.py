@@ -1,7 +1,12 @@
 from django.test import TestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
-from .models import TimetableImage
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from attendance.models import Batch, ClassSession
+from .models import TimetableImage, ClassSchedule, WeeklyTimetable
+from datetime import time
 import tempfile
 from PIL import Image
 
@@ -27,4 +32,60 @@ class TimetableImageModelTest(TestCase):
         )
         self.assertEqual(image_obj.batch, "MBBS 1st Year A")
         self.assertEqual(image_obj.uploaded_by.username, "admin")
-        self.assertTrue(image_obj.image.name.endswith('.jpg'))
\ No newline at end of file
+        self.assertTrue(image_obj.image.name.endswith('.jpg'))
+
+
+class WeeklyTimetableTests(APITestCase):
+    def setUp(self):
+        self.batch = Batch.objects.create(name="MBBS 1st Year A")
+        self.teacher = CustomUser.objects.create_user(username="teacher", password="pass123", role="teacher")
+        self.student = CustomUser.objects.create_user(username="student", password="pass123", role="student", batch=self.batch)
+        with self.captureOnCommitCallbacks(execute=True):
+            ClassSchedule.objects.create(
+                batch=self.batch, day='Monday', start_time=time(9, 0), end_time=time(10, 0),
+                subject='Anatomy', room='101', teacher=self.teacher
+            )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.student)}')
+        self.url = reverse('weekly-timetable')
+
+    def test_document_is_compiled_on_schedule_write(self):
+        timetable = WeeklyTimetable.objects.get(batch=self.batch)
+        self.assertIn('Anatomy', timetable.document)
+
+    def test_returns_document_with_strong_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{WeeklyTimetable.objects.get(batch=self.batch).etag}"')
+        monday = response.json()['days'][0]
+        self.assertEqual(monday['day'], 'Monday')
+        self.assertEqual(monday['classes'][0]['time'], '09:00 - 10:00')
+
+    def test_matching_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_schedule_change_invalidates_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            ClassSchedule.objects.create(
+                batch=self.batch, day='Tuesday', start_time=time(11, 0), end_time=time(12, 0), subject='Physiology'
+            )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_student_cannot_view_other_batch(self):
+        other = Batch.objects.create(name="MBBS 2nd Year")
+        response = self.client.get(reverse('weekly-timetable-batch', args=[other.id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_teacher_sees_schedules_of_batches_they_teach(self):
+        other_teacher = CustomUser.objects.create_user(username="teacher2", password="pass123", role="teacher")
+        ClassSession.objects.create(batch=self.batch, teacher=other_teacher, date='2025-06-02')
+        ClassSession.objects.create(batch=self.batch, teacher=other_teacher, date='2025-06-03')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(other_teacher)}')
+        response = self.client.get(reverse('class-schedule-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 # Import both ViewSets
-from .views import TimetableImageViewSet, TimetableFileViewSet, BatchListView, ClassScheduleViewSet, BatchCreateView, BatchAssignmentView
+from .views import TimetableImageViewSet, TimetableFileViewSet, BatchListView, ClassScheduleViewSet, BatchCreateView, BatchAssignmentView, WeeklyTimetableView
 
 router = DefaultRouter()
 router.register(r'images', TimetableImageViewSet, basename='timetable-images') # For timetable images
@@ -13,4 +13,6 @@ urlpatterns = [
     path('batches/', BatchListView.as_view(), name='batch-list'), # Existing endpoint for batches
     path('batches/create/', BatchCreateView.as_view(), name='batch-create'), # New endpoint for creating batches
     path('batches/assign/', BatchAssignmentView.as_view(), name='batch-assign'), # New endpoint for assigning students
+    path('weekly/', WeeklyTimetableView.as_view(), name='weekly-timetable'), # Precompiled timetable for own/child's batch
+    path('weekly/<int:batch_id>/', WeeklyTimetableView.as_view(), name='weekly-timetable-batch'), # Precompiled timetable for a batch
 ]
@@ -1,16 +1,23 @@
 from rest_framework import viewsets, permissions, generics
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import status
 # Import all models and serializers
 from .models import TimetableImage, ClassSchedule, TimetableFile
 from .serializers import TimetableImageSerializer, ClassScheduleSerializer, TimetableFileSerializer
 # Import Batch model from attendance app
-from attendance.models import Batch
+from attendance.models import Batch, ClassSession as AttendanceClassSession
+from .weekly import cached_etag, get_weekly_timetable
 # Import Batch Serializer for BatchListView - use the SimpleBatchSerializer defined in timetable/views.py
 from rest_framework import serializers
 from users.models import User
+from users.capabilities import is_office
+from core.cache import cached_view
+from .permissions import IsAdminPrincipalSuperuser
 
 
 # Minimal Batch Serializer for BatchListView (if not already defined in attendance app for this purpose)
@@ -20,17 +27,6 @@ class SimpleBatchSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description']
 
 
-# Permissions (Assuming IsAdminPrincipalSuperuser is defined consistently in a shared permissions file or in relevant app's permissions.py)
-class IsAdminPrincipalSuperuser(permissions.BasePermission):
-    """
-    Custom permission for Admin, Principal, or Hidden Superuser to manage timetables.
-    """
-    def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.role in ['admin', 'principal'] or getattr(request.user, 'is_hidden_superuser', False)
-        )
-
-
 # For ClassSchedule (structured timetable)
 class ClassScheduleViewSet(viewsets.ModelViewSet):
     # Optimize queryset with select_related for batch and teacher
@@ -51,16 +47,16 @@ class ClassScheduleViewSet(viewsets.ModelViewSet):
         if user.role == 'student':
             # Students see schedules for batches they are part of
             return base_queryset.filter(batch__users_in_batch=user)
-        elif user.role == 'parent' and user.child:
+        elif user.role == 'parent' and user.child_id:
             # Parents see schedules for their child's batches
-            return base_queryset.filter(batch__users_in_batch=user.child)
+            return base_queryset.filter(batch__users_in_batch=user.child_id)
         elif user.role == 'teacher':
             # Teachers see all classes they teach, or classes for batches they are associated with.
-            # Here, filtering by classes where the teacher is assigned.
-            return base_queryset.filter(Q(teacher=user) | Q(batch__class_sessions__teacher=user)).distinct()
-            # The Q(batch__class_sessions__teacher=user) part ensures teachers can see all schedules for batches
-            # where they teach at least one class, giving them a broader view if desired.
-        elif user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+            # Batches are resolved with a subquery instead of joining every attendance ClassSession,
+            # so no fan-out and no DISTINCT is needed.
+            taught_batches = AttendanceClassSession.objects.filter(teacher=user).values('batch_id')
+            return base_queryset.filter(Q(teacher=user) | Q(batch_id__in=taught_batches))
+        elif is_office(user):
             # Admin/Principal/Hidden Superuser see all schedules
             return base_queryset
         
@@ -78,6 +74,65 @@ class ClassScheduleViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 
+class WeeklyTimetableView(APIView):
+    """
+    Serves the precompiled weekly timetable for a batch.
+    Responses carry a strong ETag; a matching If-None-Match returns 304 without querying the timetable.
+    Without a batch_id, students get their own batch and parents their child's batch.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, batch_id=None):
+        user = request.user
+        own_batch_id = self.get_own_batch_id(user)
+
+        if batch_id is None:
+            batch_id = own_batch_id
+            if batch_id is None:
+                return Response({"error": "batch_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+        elif user.role in ['student', 'parent'] and batch_id != own_batch_id:
+            raise PermissionDenied("You can only view the timetable of your own batch.")
+
+        client_etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+        # Fast path: answer revalidation from the in-process ETag memo
+        etag = cached_etag(batch_id)
+        if etag and self.etag_matches(etag, client_etags):
+            return self.not_modified(etag)
+
+        timetable = get_weekly_timetable(batch_id)
+        if timetable is None:
+            return Response({"error": "Batch not found."}, status=status.HTTP_404_NOT_FOUND)
+        etag, document = timetable
+        if self.etag_matches(etag, client_etags):
+            return self.not_modified(etag)
+
+        response = HttpResponse(document, content_type='application/json')
+        self.set_cache_headers(response, etag)
+        return response
+
+    def get_own_batch_id(self, user):
+        if user.role == 'student':
+            return user.batch_id
+        if user.role == 'parent' and user.child_id:
+            return User.objects.filter(pk=user.child_id).values_list('batch_id', flat=True).first()
+        return None
+
+    def etag_matches(self, etag, client_etags):
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored (parse_etags keeps them)
+        return '*' in client_etags or any(tag.removeprefix('W/') == quote_etag(etag) for tag in client_etags)
+
+    def not_modified(self, etag):
+        response = HttpResponseNotModified()
+        self.set_cache_headers(response, etag)
+        return response
+
+    def set_cache_headers(self, response, etag):
+        response['ETag'] = quote_etag(etag)
+        # Clients may keep the document but must revalidate it on every use
+        response['Cache-Control'] = 'private, no-cache'
+
+
 # For TimetableFile (multi-format file uploads)
 class TimetableFileViewSet(viewsets.ModelViewSet):
     """
@@ -98,13 +153,13 @@ class TimetableFileViewSet(viewsets.ModelViewSet):
         if user.role == 'student':
             # Students see timetable files for batches they are part of
             return base_queryset.filter(batch__users_in_batch=user)
-        elif user.role == 'parent' and user.child:
+        elif user.role == 'parent' and user.child_id:
             # Parents see timetable files for their child's batches
-            return base_queryset.filter(batch__users_in_batch=user.child)
+            return base_queryset.filter(batch__users_in_batch=user.child_id)
         elif user.role == 'teacher':
             # Teachers can see all timetable files
             return base_queryset
-        elif user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        elif is_office(user):
             # Admin, Principal, Hidden Superuser see all timetable files
             return base_queryset
         
@@ -116,17 +171,13 @@ class TimetableFileViewSet(viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         # Only allow the uploader or admin/principal to update
-        if (self.request.user != serializer.instance.uploaded_by and 
-            self.request.user.role not in ['admin', 'principal'] and 
-            not getattr(self.request.user, 'is_hidden_superuser', False)):
+        if self.request.user.id != serializer.instance.uploaded_by_id and not is_office(self.request.user):
             raise PermissionDenied("Only the uploader or admin/principal can update timetable files.")
         serializer.save()
 
     def perform_destroy(self, instance):
         # Only allow the uploader or admin/principal to delete
-        if (self.request.user != instance.uploaded_by and 
-            self.request.user.role not in ['admin', 'principal'] and 
-            not getattr(self.request.user, 'is_hidden_superuser', False)):
+        if self.request.user.id != instance.uploaded_by_id and not is_office(self.request.user):
             raise PermissionDenied("Only the uploader or admin/principal can delete timetable files.")
         instance.delete()
 
@@ -149,14 +200,14 @@ class TimetableImageViewSet(viewsets.ModelViewSet):
         if user.role == 'student':
             # Students see timetable images for batches they are part of
             return base_queryset.filter(batch__users_in_batch=user)
-        elif user.role == 'parent' and user.child:
+        elif user.role == 'parent' and user.child_id:
             # Parents see timetable images for their child's batches
-            return base_queryset.filter(batch__users_in_batch=user.child)
+            return base_queryset.filter(batch__users_in_batch=user.child_id)
         elif user.role == 'teacher':
             # Teachers might see all timetable images or only those relevant to their batches
             # For simplicity, allowing them to see all uploaded images. Adjust if stricter required.
             return base_queryset
-        elif user.role in ['admin', 'principal'] or getattr(user, 'is_hidden_superuser', False):
+        elif is_office(user):
             # Admin, Principal, Hidden Superuser see all timetable images
             return base_queryset
         
@@ -172,6 +223,10 @@ class BatchListView(generics.ListAPIView):
     serializer_class = SimpleBatchSerializer # Use the SimpleBatchSerializer
     permission_classes = [permissions.IsAuthenticated] # Only authenticated users can access
 
+    @cached_view('batches', models=[Batch])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 class BatchCreateView(generics.CreateAPIView):
     """
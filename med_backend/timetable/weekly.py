@@ -0,0 +1,102 @@
+# timetable/weekly.py
+
+"""
+Precompiled per-batch weekly timetables.
+
+The weekly timetable changes a few times a term but is read thousands of times a day,
+so instead of serializing ClassSchedule rows on every request we compile one JSON
+document per batch whenever its schedule changes and serve that document verbatim
+with a strong ETag.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from attendance.models import Batch
+from .models import ClassSchedule, WeeklyTimetable
+
+# Weekday order used for the document (ClassSchedule.Meta.ordering sorts day names alphabetically)
+WEEKDAYS = [day for day, _ in ClassSchedule.DAYS_OF_WEEK]
+
+# ETags are memoized in the cache so conditional GETs are answered without a DB query.
+# A rebuild overwrites the entry, so with a shared cache backend every worker process
+# serves the new ETag at once; with local memory, other processes see it on expiry.
+def _etag_key(batch_id):
+    return f'timetable:etag:{batch_id}'
+
+
+def _memo_ttl():
+    return getattr(settings, 'TIMETABLE_ETAG_MEMO_SECONDS', 30)
+
+
+def build_document(batch):
+    """Build the weekly timetable document for a batch as a dict."""
+    days = {day: [] for day in WEEKDAYS}
+    schedules = ClassSchedule.objects.filter(batch=batch).select_related('teacher').order_by('start_time', 'id')
+    for schedule in schedules:
+        start = schedule.start_time.strftime('%H:%M')
+        end = schedule.end_time.strftime('%H:%M')
+        days[schedule.day].append({
+            'id': schedule.id,
+            'start_time': start,
+            'end_time': end,
+            'time': f"{start} - {end}",
+            'subject': schedule.subject,
+            'room': schedule.room,
+            'teacher': schedule.teacher_id,
+            'teacher_name': schedule.teacher.username if schedule.teacher else None,
+        })
+    return {
+        'batch': {'id': batch.id, 'name': batch.name},
+        'days': [{'day': day, 'classes': days[day]} for day in WEEKDAYS],
+    }
+
+
+def compile_weekly_timetable(batch_id):
+    """
+    (Re)compile and store the weekly timetable for a batch.
+    Returns the WeeklyTimetable row, or None if the batch no longer exists.
+    """
+    batch = Batch.objects.filter(id=batch_id).first()
+    if batch is None:
+        forget(batch_id)
+        return None
+
+    document = json.dumps(build_document(batch), separators=(',', ':'), sort_keys=True)
+    etag = hashlib.sha256(document.encode('utf-8')).hexdigest()
+    timetable, _ = WeeklyTimetable.objects.update_or_create(
+        batch=batch, defaults={'document': document, 'etag': etag}
+    )
+    remember(batch_id, etag)
+    return timetable
+
+
+def get_weekly_timetable(batch_id):
+    """
+    Return (etag, document) for a batch, compiling it on first access.
+    Returns None if the batch does not exist.
+    """
+    row = WeeklyTimetable.objects.filter(batch_id=batch_id).values_list('etag', 'document').first()
+    if row is None:
+        timetable = compile_weekly_timetable(batch_id)
+        if timetable is None:
+            return None
+        row = (timetable.etag, timetable.document)
+    remember(batch_id, row[0])
+    return row
+
+
+def cached_etag(batch_id):
+    """Return the memoized ETag for a batch, or None if unknown or expired."""
+    return cache.get(_etag_key(batch_id))
+
+
+def remember(batch_id, etag):
+    cache.set(_etag_key(batch_id), etag, _memo_ttl())
+
+
+def forget(batch_id):
+    cache.delete(_etag_key(batch_id))
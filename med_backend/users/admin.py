@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import User, RevokedToken
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -30,4 +30,10 @@ class UserAdmin(BaseUserAdmin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs  # Full access for actual superusers
-        return qs.exclude(is_hidden_superuser=True)
\ No newline at end of file
+        return qs.exclude(is_hidden_superuser=True)
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('token_id', 'user', 'revoked_at', 'expires_at')
+    search_fields = ('token_id', 'user__username')
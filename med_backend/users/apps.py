@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from core.cache import invalidate_on_change
+        invalidate_on_change(self.get_model('User'))
+
+        # Dashboard sections are cached per student (users.dashboard)
+        from .dashboard import SECTIONS
+        for section in SECTIONS:
+            for model, owner in section.sources:
+                invalidate_on_change(model, scope=owner)
@@ -0,0 +1,61 @@
+# users/authentication.py
+
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .capabilities import CAPS_CLAIM, Capability
+from .revocation import is_token_revoked
+from .tokens import TOKEN_VERSION_CLAIM, UNVERSIONED, USER_CLAIMS, current_token_version
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token's claims instead of loading
+    the User row. The only per-request lookup is the user's token version, which is cached.
+
+    The user object has every other field deferred; touching one (e.g. user.email) loads
+    all remaining fields in a single query. Tokens issued before the claims existed fall
+    back to the regular database lookup, and are checked against the token version there
+    (a missing version claim counts as 0).
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        # In-memory denylist check, no query (see users.revocation)
+        if is_token_revoked(validated_token):
+            raise AuthenticationFailed(_("Session has been revoked"), code="session_revoked")
+        return validated_token
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token or any(claim not in validated_token for claim in USER_CLAIMS):
+            user = super().get_user(validated_token)
+            if validated_token.get(TOKEN_VERSION_CLAIM, UNVERSIONED) != user.token_version:
+                raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+            return user
+
+        # simplejwt stores the id claim as a string
+        user_id = self.user_model._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        version = current_token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+        if validated_token[TOKEN_VERSION_CLAIM] != version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        return self.user_from_claims(validated_token, user_id, version)
+
+    def user_from_claims(self, validated_token, user_id, version):
+        values = {field: validated_token[claim] for claim, field in USER_CLAIMS.items()}
+        values.update({'id': user_id, 'is_active': True, 'token_version': version})
+
+        # Model.from_db expects the loaded values in concrete field order
+        fields = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in values]
+        user = self.user_model.from_db(
+            router.db_for_read(self.user_model), fields, [values[name] for name in fields]
+        )
+        user._from_claims = True
+        if CAPS_CLAIM in validated_token:
+            user._capabilities = Capability(validated_token[CAPS_CLAIM])
+        return user
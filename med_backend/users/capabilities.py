@@ -0,0 +1,129 @@
+# users/capabilities.py
+
+"""
+Central role/permission resolution.
+
+A user's access is reduced to a Capability bitset once and memoized on the user object,
+which DRF keeps for the whole request. Views and permission classes test the bitset
+against the named groups below instead of re-deriving
+`user.is_staff or getattr(user, 'is_hidden_superuser', False) or user.role in [...]`.
+
+The groups mirror the checks the views already made:
+- MANAGEMENT: is_staff, hidden superuser, admin or principal
+- FACULTY: MANAGEMENT plus teachers
+- OFFICE: hidden superuser, admin or principal (plain is_staff is not enough)
+
+Issued JWTs carry the bitset in the `caps` claim so clients can adapt their UI without
+another request.
+"""
+
+from enum import IntFlag
+
+from django.db.models import Q
+
+CAPS_CLAIM = 'caps'
+
+
+class Capability(IntFlag):
+    STAFF = 1 << 0
+    HIDDEN_SUPERUSER = 1 << 1
+    ADMIN = 1 << 2
+    PRINCIPAL = 1 << 3
+    TEACHER = 1 << 4
+    STUDENT = 1 << 5
+    PARENT = 1 << 6
+
+
+NONE = Capability(0)
+OFFICE = Capability.HIDDEN_SUPERUSER | Capability.ADMIN | Capability.PRINCIPAL
+MANAGEMENT = OFFICE | Capability.STAFF
+FACULTY = MANAGEMENT | Capability.TEACHER
+
+ROLE_CAPABILITIES = {
+    'admin': Capability.ADMIN,
+    'principal': Capability.PRINCIPAL,
+    'teacher': Capability.TEACHER,
+    'student': Capability.STUDENT,
+    'parent': Capability.PARENT,
+}
+
+
+def compute_capabilities(user):
+    """Derive the capability bitset from the user's flags and role (no memoization)."""
+    if user is None or not user.is_authenticated:
+        return NONE
+    caps = ROLE_CAPABILITIES.get(getattr(user, 'role', None), NONE)
+    if user.is_staff:
+        caps |= Capability.STAFF
+    if getattr(user, 'is_hidden_superuser', False):
+        caps |= Capability.HIDDEN_SUPERUSER
+    return caps
+
+
+def capabilities(user):
+    """Return the user's capability bitset, computing it at most once per user object."""
+    if user is None or not user.is_authenticated:
+        return NONE
+    caps = getattr(user, '_capabilities', None)
+    if caps is None:
+        caps = compute_capabilities(user)
+        user._capabilities = caps
+    return caps
+
+
+def forget_capabilities(user):
+    """Drop the memoized bitset after changing the user's role or flags in place."""
+    user.__dict__.pop('_capabilities', None)
+
+
+def has_any(user, mask):
+    return bool(capabilities(user) & mask)
+
+
+def is_management(user):
+    return has_any(user, MANAGEMENT)
+
+
+def is_office(user):
+    return has_any(user, OFFICE)
+
+
+def is_faculty(user):
+    return has_any(user, FACULTY)
+
+
+def add_capability_claims(token, user):
+    """Stamp a simplejwt token (refresh or access) with the user's capability bitset."""
+    token[CAPS_CLAIM] = int(capabilities(user))
+    return token
+
+
+def scope_q(user, *, student=None, teacher=None, full=MANAGEMENT):
+    """
+    Build one filter clause selecting the rows a user may access, so access is decided by
+    the query instead of loading related objects row by row.
+
+    student: lookup to the student a row belongs to; students match themselves and
+             parents match their child.
+    teacher: lookup to the teacher responsible for a row; teachers match themselves.
+    full:    capabilities that grant access to every row.
+
+    Returns None when the user can see everything, and Q(pk__in=[]) when nothing.
+    """
+    caps = capabilities(user)
+    if caps & full:
+        return None
+    clause = Q(pk__in=[])
+    if teacher and caps & Capability.TEACHER:
+        clause |= Q(**{teacher: user.id})
+    if student and caps & Capability.STUDENT:
+        clause |= Q(**{student: user.id})
+    if student and caps & Capability.PARENT and user.child_id:
+        clause |= Q(**{student: user.child_id})
+    return clause
+
+
+def scope_queryset(queryset, user, **lookups):
+    """Apply scope_q() to a queryset."""
+    clause = scope_q(user, **lookups)
+    return queryset if clause is None else queryset.filter(clause)
@@ -0,0 +1,216 @@
+# users/dashboard.py
+
+"""
+Role dashboards: a student's headline numbers and latest items in one response, in place
+of the six endpoints the home screens used to call on load (/api/users/me/,
+/api/grades/my/, /api/attendance/attendance/my/, /api/payments/my/, /api/leaves/ and
+/api/library/books/my/). Students get their own dashboard, parents their child's.
+
+The response is split into sections, one per domain. Each section runs a fixed number of
+queries however long the student's history is: an aggregate for the headline numbers and
+a LIMITed list for the latest items. The sections do not depend on each other, so on a
+cache miss they run at the same time on a small thread pool (DASHBOARD_WORKERS), each on
+its worker's own database connection. Inside a transaction they run one after the other
+instead, because other connections cannot see its uncommitted rows.
+
+Each section is cached per student. Its key embeds the student's own generations of the
+models it reads (core.cache, scoped by the owner fields in SECTIONS, registered by
+UsersConfig.ready()). A new grade therefore rebuilds only that student's grades section.
+Writes that send no signals (update(), bulk_create()) bump these generations themselves.
+DASHBOARD_CACHE_SECONDS bounds how long numbers that depend on the date, such as overdue
+counts, can go stale.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from attendance.models import AttendanceRecord
+from attendance.serializers import AttendanceRecordSerializer
+from core.cache import generations, get_or_compute, make_key
+from grades.models import Grade
+from grades.serializers import GradeSerializer
+from leaves.ledger import current_balance
+from leaves.models import LeaveBalance, LeaveRequest
+from leaves.serializers import LeaveRequestSerializer
+from library.models import Borrow
+from library.serializers import BorrowSerializer
+from payments.models import Payment
+from payments.serializers import PaymentSerializer
+
+DEFAULT_ITEMS = 5
+MAX_ITEMS = 20
+DEFAULT_WORKERS = 4
+DEFAULT_CACHE_SECONDS = 300
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    # (student, limit, serializer context) -> data
+    build: Callable
+    # (model, attribute holding the student the row belongs to) for each model it reads
+    sources: tuple
+
+    @property
+    def models(self):
+        return [model for model, _ in self.sources]
+
+
+def grades_section(student, limit, context):
+    grades = Grade.objects.filter(student=student)
+    summary = grades.aggregate(count=Count('id'), average_marks=Avg('marks'))
+    latest = grades.select_related('student', 'teacher').order_by('-date_recorded', '-id')[:limit]
+    average = summary['average_marks']
+    return {
+        'count': summary['count'],
+        'average_marks': round(average, 2) if average is not None else None,
+        'latest': GradeSerializer(latest, many=True, context=context).data,
+    }
+
+
+def attendance_section(student, limit, context):
+    # Students only see attendance confirmed by the teacher, as in /attendance/my/
+    records = AttendanceRecord.objects.filter(student=student, is_confirmed=True)
+    counts = records.aggregate(
+        total=Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status, _ in AttendanceRecord.STATUS_CHOICES},
+    )
+    # Excused absences count neither for nor against the student
+    counted = counts['total'] - counts['excused']
+    attended = counts['present'] + counts['late']
+    latest = (
+        records.select_related('student', 'class_session__batch', 'class_session__teacher', 'marked_by')
+        .order_by(Coalesce('class_session__date', 'date').desc(nulls_last=True), '-id')[:limit]
+    )
+    return {
+        **counts,
+        'percentage': round(100 * attended / counted, 1) if counted else None,
+        'latest': AttendanceRecordSerializer(latest, many=True, context=context).data,
+    }
+
+
+def payments_section(student, limit, context):
+    payments = Payment.objects.filter(student=student)
+    pending = Q(status='pending')
+    summary = payments.aggregate(
+        pending=Count('id', filter=pending),
+        overdue=Count('id', filter=pending & Q(due_date__lt=timezone.localdate())),
+        awaiting_verification=Count('id', filter=Q(status='pending_proof')),
+        amount_due=Sum(F('amount') + F('late_fine'), filter=pending),
+    )
+    latest = payments.select_related('student').order_by('-due_date', '-id')[:limit]
+    return {
+        **summary,
+        'amount_due': summary['amount_due'] or 0,
+        'latest': PaymentSerializer(latest, many=True, context=context).data,
+    }
+
+
+def leaves_section(student, limit, context):
+    leaves = LeaveRequest.objects.filter(user=student)
+    summary = leaves.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+    )
+    latest = leaves.select_related('user').order_by('-applied_at', '-id')[:limit]
+    return {
+        **summary,
+        'remaining': max(0, current_balance(student)),
+        'latest': LeaveRequestSerializer(latest, many=True, context=context).data,
+    }
+
+
+def library_section(student, limit, context):
+    borrows = Borrow.objects.filter(user=student, returned=False)
+    summary = borrows.aggregate(
+        borrowed=Count('id'),
+        overdue=Count('id', filter=Q(due_date__lt=timezone.now())),
+    )
+    latest = borrows.select_related('user', 'book').order_by('-borrow_date', '-id')[:limit]
+    return {
+        **summary,
+        'latest': BorrowSerializer(latest, many=True, context=context).data,
+    }
+
+
+SECTIONS = (
+    Section('grades', grades_section, ((Grade, 'student_id'),)),
+    Section('attendance', attendance_section, ((AttendanceRecord, 'student_id'),)),
+    Section('payments', payments_section, ((Payment, 'student_id'),)),
+    Section('leaves', leaves_section, ((LeaveRequest, 'user_id'), (LeaveBalance, 'user_id'))),
+    Section('library', library_section, ((Borrow, 'user_id'),)),
+)
+
+
+def profile(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'full_name': user.get_full_name() or user.username,
+        'role': user.role,
+        'batch': user.batch.name if user.batch_id else None,
+    }
+
+
+def cached_section(section, student, limit, context):
+    """Returns (data, cache outcome) of one section."""
+    namespace = f'dashboard:{section.name}'
+    key = make_key(namespace, (student.pk, limit, generations(section.models, scope=student.pk)))
+    timeout = getattr(settings, 'DASHBOARD_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)
+    return get_or_compute(namespace, key, lambda: section.build(student, limit, context), timeout)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DASHBOARD_WORKERS', DEFAULT_WORKERS),
+                thread_name_prefix='dashboard',
+            )
+        return _pool
+
+
+def _in_worker(function, *args):
+    # Worker threads outlive requests: treat each task like one, connections included
+    close_old_connections()
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+def build_dashboard(student, limit, context):
+    """
+    The sections of `student`'s dashboard, with the latest `limit` items of each.
+    Returns (data, outcomes), outcomes being the cache outcome of each section.
+    """
+    concurrent = (
+        getattr(settings, 'DASHBOARD_WORKERS', DEFAULT_WORKERS) > 1
+        and not transaction.get_connection().in_atomic_block
+    )
+    if concurrent:
+        pool = _executor()
+        futures = [pool.submit(_in_worker, cached_section, section, student, limit, context) for section in SECTIONS]
+        results = [future.result() for future in futures]
+    else:
+        results = [cached_section(section, student, limit, context) for section in SECTIONS]
+
+    data = {'student': profile(student)}
+    outcomes = {}
+    for section, (value, outcome) in zip(SECTIONS, results):
+        data[section.name] = value
+        outcomes[section.name] = outcome
+    return data, outcomes
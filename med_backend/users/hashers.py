@@ -0,0 +1,19 @@
+# users/hashers.py
+
+"""
+PBKDF2 with a configurable work factor.
+
+PASSWORD_HASH_ITERATIONS sets the iteration count. Stored hashes made with a different
+count still verify, and are re-hashed with the configured count on the user's next
+successful login (see User.check_password), so changing the setting needs no migration.
+The algorithm name is Django's, so switching back to the stock hasher is also transparent.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,77 @@
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from users.models import User
+from users.views import LoginView
+
+BENCH_PASSWORD = 'bench-login-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure logins per second on one core: a burst of logins through LoginView against '
+        'throwaway users, rolled back afterwards. Use the result to size workers for the morning burst.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50, help='Number of logins in the burst')
+        parser.add_argument('--users', type=int, default=10, help='Distinct users the burst logs in as')
+        parser.add_argument('--iterations', type=int, help='PBKDF2 iterations (default: PASSWORD_HASH_ITERATIONS)')
+        parser.add_argument('--target', type=float, help='Peak logins per second to size workers for')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations'] or settings.PASSWORD_HASH_ITERATIONS
+        logins = max(1, options['logins'])
+        user_count = max(1, min(options['users'], logins))
+
+        # The rate limiter would stop a burst from one client; this measures login cost only
+        no_limits = override_settings(
+            PASSWORD_HASH_ITERATIONS=iterations,
+            LOGIN_RATE_LIMIT_IP=(logins + 1, 60),
+            LOGIN_RATE_LIMIT_USERNAME=(logins + 1, 60),
+        )
+        with no_limits, transaction.atomic():
+            password = make_password(BENCH_PASSWORD)
+            users = User.objects.bulk_create(
+                User(username=f'bench-login-{index}', password=password, role='student')
+                for index in range(user_count)
+            )
+            view = LoginView.as_view()
+            factory = APIRequestFactory()
+            requests = [
+                factory.post('/api/users/login/', {
+                    'username': users[index % user_count].username,
+                    'password': BENCH_PASSWORD,
+                    'role': 'student',
+                }, format='json', REMOTE_ADDR='198.51.100.1')  # Documentation range, never a real client
+                for index in range(logins)
+            ]
+
+            wall_started, cpu_started = time.perf_counter(), time.process_time()
+            for request in requests:
+                response = view(request)
+                if response.status_code != 200:
+                    raise RuntimeError(f'Login failed with {response.status_code}: {response.data}')
+            wall = time.perf_counter() - wall_started
+            cpu = time.process_time() - cpu_started
+
+            transaction.set_rollback(True)
+
+        per_core = logins / cpu if cpu else float('inf')
+        self.stdout.write(f"PBKDF2 iterations:   {iterations:,}")
+        self.stdout.write(f"Logins:              {logins} ({user_count} users)")
+        self.stdout.write(f"Wall time:           {wall:.2f}s ({logins / wall:.1f} logins/s)")
+        self.stdout.write(f"CPU per login:       {cpu / logins * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Logins/s per core:   {per_core:.1f}"))
+        if options['target']:
+            cores = math.ceil(options['target'] / per_core)
+            self.stdout.write(self.style.SUCCESS(
+                f"Workers for {options['target']:g} logins/s: {cores} (one per core, hashing is CPU-bound)"
+            ))
@@ -1,5 +1,7 @@
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from attendance.models import Batch  # Import Batch model from attendance app
 
 
@@ -41,11 +43,65 @@ class User(AbstractUser):
         help_text="If True, this user is a hidden superuser with unrestricted access."
     )
 
+    # Bumped whenever a field carried in JWT claims changes; tokens with an older version are rejected
+    token_version = models.PositiveIntegerField(default=0)
+
+    # Changes to these invalidate previously issued tokens
+    TOKEN_VERSION_FIELDS = ('username', 'role', 'batch_id', 'child_id', 'is_staff', 'is_hidden_superuser', 'is_active', 'password')
+
     def save(self, *args, **kwargs):
         if self.is_hidden_superuser:
             self.is_superuser = True
             self.is_staff = True
+
+        bumped = False
+        update_fields = kwargs.get('update_fields')
+        watched = [name for name in self.TOKEN_VERSION_FIELDS if name not in self.get_deferred_fields()]
+        if update_fields is not None:
+            watched = [name for name in watched if name in update_fields or name.removesuffix('_id') in update_fields]
+        if not self._state.adding and self.pk and watched:
+            previous = type(self).objects.filter(pk=self.pk).values('token_version', *watched).first()
+            if previous and any(previous[name] != getattr(self, name) for name in watched):
+                self.token_version = previous['token_version'] + 1
+                bumped = True
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'token_version'}
+
         super().save(*args, **kwargs)
 
+        if bumped:
+            from .tokens import forget_token_version
+            forget_token_version(self.pk)
+            transaction.on_commit(lambda: forget_token_version(self.pk))
+
+    def check_password(self, raw_password):
+        def rehash(raw_password):
+            # Same password under new hasher settings: written directly so save() does not
+            # treat it as a password change and revoke the user's other sessions
+            self.set_password(raw_password)
+            self._password = None
+            type(self).objects.filter(pk=self.pk).update(password=self.password)
+
+        return check_password(raw_password, self.password, rehash)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Users built from JWT claims load all deferred fields on first access, not one query per field
+        if fields is not None and getattr(self, '_from_claims', False):
+            deferred = self.get_deferred_fields()
+            if deferred and set(fields) <= deferred:
+                fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+    def __str__(self):
+        return f"{self.username} ({self.role})"
+
+
+class RevokedToken(models.Model):
+    """A revoked login session (the session's refresh-token jti), kept until that token would expire."""
+    token_id = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='revoked_tokens')
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
     def __str__(self):
-        return f"{self.username} ({self.role})"
\ No newline at end of file
+        return f"{self.token_id} (revoked {self.revoked_at:%Y-%m-%d %H:%M})"
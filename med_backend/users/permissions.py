@@ -1,4 +1,5 @@
 from rest_framework.permissions import BasePermission
+from users.capabilities import Capability, has_any
 
 class IsAdminOrPrincipal(BasePermission):
     """
@@ -6,9 +7,5 @@ class IsAdminOrPrincipal(BasePermission):
     """
     
     def has_permission(self, request, view):
-        # Check if user is authenticated
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        # Check if user has admin or principal role
-        return request.user.role in ['admin', 'principal'] 
\ No newline at end of file
+        # Check if user has admin or principal role (unauthenticated users have no capabilities)
+        return has_any(request.user, Capability.ADMIN | Capability.PRINCIPAL)
\ No newline at end of file
@@ -0,0 +1,184 @@
+# users/revocation.py
+
+"""
+Per-session JWT revocation.
+
+Every login starts a session whose id is the refresh token's jti; the id is copied into
+each access token as the `sid` claim. Revoking a session writes a RevokedToken row, which
+lives until the session's refresh token would have expired anyway.
+
+Each process keeps the live rows in memory: a Bloom filter answers the common "not
+revoked" case, and an exact set confirms hits so a false positive never logs anyone out.
+The in-memory copy is refreshed from the database every REVOCATION_SYNC_SECONDS by a
+background thread of each process, so checking a token is O(1) with no query on the
+request path, and a revocation reaches every worker process within that interval (the
+process that revokes it applies it on commit). Only the first check of a process loads the
+table itself, and starts the thread (not needed, and not started, with an in-memory
+SQLite database, which only one process can use). Expired entries are dropped on sync. The
+prune_revoked_tokens command deletes expired rows.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+SESSION_CLAIM = 'sid'
+SYNC_FAILURES_REPORTED = 3
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no deletions; rebuilt when entries expire)."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        # Double hashing: k positions from two independent 64-bit hashes
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class Denylist:
+    """In-memory mirror of the RevokedToken table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresher = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}  # token id -> expires_at
+            self._bloom = BloomFilter(self._capacity())
+            self._synced_until = None
+
+    def _capacity(self):
+        return getattr(settings, 'REVOCATION_BLOOM_CAPACITY', 100_000)
+
+    def _interval(self):
+        return getattr(settings, 'REVOCATION_SYNC_SECONDS', 5)
+
+    def add(self, token_id, expires_at):
+        with self._lock:
+            self._add(token_id, expires_at)
+
+    def _add(self, token_id, expires_at):
+        self._entries[token_id] = expires_at
+        self._bloom.add(token_id)
+
+    def is_revoked(self, token_id):
+        if not token_id:
+            return False
+        self.ensure_loaded()
+        if token_id not in self._bloom:
+            return False
+        expires_at = self._entries.get(token_id)
+        return expires_at is not None and expires_at > timezone.now()
+
+    def ensure_loaded(self):
+        """Load the table on the first check of the process, and keep the refresher running."""
+        if self._synced_until is None:
+            self.sync()
+        refresher = self._refresher
+        if (refresher is None or not refresher.is_alive()) and not self._single_process():
+            # Also restarts it in a forked worker, which inherits no threads
+            with self._lock:
+                if self._refresher is refresher:
+                    self._refresher = threading.Thread(target=self._refresh, name='denylist-sync', daemon=True)
+                    self._refresher.start()
+
+    def _single_process(self):
+        # An in-memory SQLite database (the test database) has one process, which applies
+        # its own revocations on commit
+        connection = connections['default']
+        return connection.vendor == 'sqlite' and connection.is_in_memory_db()
+
+    def _refresh(self):
+        failures = 0
+        while True:
+            time.sleep(self._interval())
+            try:
+                self.sync()
+                failures = 0
+            except Exception:
+                # Keep serving the last copy and retry next round; a briefly locked table is
+                # not worth a report, a sync failing round after round is
+                failures += 1
+                if failures >= SYNC_FAILURES_REPORTED:
+                    logger.exception('Session denylist sync failed %d times in a row', failures)
+            finally:
+                # This thread outlives requests: do not hold a connection between rounds
+                connections.close_all()
+
+    def sync(self):
+        """Pull revocations recorded since the last sync and drop expired entries."""
+        from .models import RevokedToken
+
+        now = timezone.now()
+        with self._lock:
+            rows = RevokedToken.objects.filter(expires_at__gt=now)
+            if self._synced_until is not None:
+                # Re-read a short overlap: a row stamped just before the last sync may have
+                # committed just after it
+                overlap = timedelta(seconds=getattr(settings, 'REVOCATION_SYNC_OVERLAP_SECONDS', 30))
+                rows = rows.filter(revoked_at__gte=self._synced_until - overlap)
+            for token_id, expires_at in rows.values_list('token_id', 'expires_at'):
+                self._add(token_id, expires_at)
+
+            expired = [token_id for token_id, expires_at in self._entries.items() if expires_at <= now]
+            if expired:
+                for token_id in expired:
+                    del self._entries[token_id]
+                # Bloom filters cannot forget, so rebuild from the live entries
+                self._bloom = BloomFilter(max(self._capacity(), len(self._entries)))
+                for token_id in self._entries:
+                    self._bloom.add(token_id)
+
+            self._synced_until = now
+
+
+denylist = Denylist()
+
+
+def session_id(token):
+    """The session a token belongs to: its sid claim, or its own jti for refresh tokens."""
+    return token.get(SESSION_CLAIM) or token.get('jti')
+
+
+def is_token_revoked(token):
+    return denylist.is_revoked(session_id(token))
+
+
+def revoke_session(token_id, user_id=None, expires_at=None):
+    """Revoke one session. Returns the RevokedToken row."""
+    from .models import RevokedToken
+
+    if expires_at is None:
+        expires_at = timezone.now() + settings.SIMPLE_JWT.get('REFRESH_TOKEN_LIFETIME', timedelta(days=7))
+    revoked, _ = RevokedToken.objects.get_or_create(
+        token_id=token_id, defaults={'user_id': user_id, 'expires_at': expires_at}
+    )
+    # This process does not wait for its next sync
+    transaction.on_commit(lambda: denylist.add(revoked.token_id, revoked.expires_at))
+    return revoked
@@ -3,7 +3,7 @@
 from rest_framework import serializers
 from .models import User
 from payments.models import Payment # Assuming Payment model is correctly located
-from leaves.models import LeaveRequest # Assuming LeaveRequest model is correctly located
+from leaves.ledger import current_balance
 from attendance.models import Batch # Import Batch for batch name if needed
 
 
@@ -229,6 +229,5 @@ class UserInfoSerializer(serializers.ModelSerializer):
         return None
 
     def get_leaves_remaining(self, obj):
-        # Ensure LeaveRequest model is correctly imported
-        used = LeaveRequest.objects.filter(user=obj, status='approved').count()
-        return max(0, 20 - used)  # Assuming 20 leaves per user/year
+        # Days left this year, from the leave ledger's balance row
+        return max(0, current_balance(obj))
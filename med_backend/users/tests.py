@@ -1,3 +1,452 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from io import StringIO
+
+from django.contrib.auth.hashers import identify_hasher
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from hidden_superuser.models import LoginHistory
+
+from attendance.models import AttendanceRecord
+from core.cache import metrics
+from grades.models import Grade
+from leaves.calendar import decide_leaves
+from leaves.models import LeaveRequest
+from library.models import Book, Borrow
+from payments.models import Payment
+from .capabilities import (
+    CAPS_CLAIM, Capability, FACULTY, MANAGEMENT, OFFICE, capabilities, is_faculty, is_management,
+    is_office, scope_queryset,
+)
+from core.ratelimit import SlidingWindowLimiter
+from .authentication import ClaimsJWTAuthentication
+from .dashboard import build_dashboard
+from .models import RevokedToken, User
+from .revocation import BloomFilter, denylist
+from .tokens import issue_tokens, revoke_user_tokens
+
+
+class CapabilityTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+        self.parent = User.objects.create_user(username='parent001', password='pass123', role='parent', child=self.student)
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+
+    def test_groups_match_role_checks(self):
+        staff = User.objects.create_user(username='staff001', password='pass123', is_staff=True)
+        hidden = User.objects.create_user(username='hidden001', password='pass123', is_hidden_superuser=True)
+
+        self.assertTrue(is_management(staff))
+        self.assertFalse(is_office(staff))  # Plain is_staff never satisfied the admin/principal/hidden checks
+        self.assertTrue(is_office(hidden))
+        self.assertTrue(is_faculty(self.teacher))
+        self.assertFalse(is_management(self.teacher))
+        self.assertEqual(capabilities(self.student), Capability.STUDENT)
+        self.assertTrue(OFFICE <= MANAGEMENT <= FACULTY)
+
+    def test_capabilities_are_computed_once_per_user_object(self):
+        self.assertTrue(is_office(self.admin))
+        self.admin.role = 'student'
+        self.assertTrue(is_office(self.admin))
+        # A freshly loaded user object resolves again
+        self.assertFalse(is_office(User.objects.get(pk=self.student.pk)))
+
+    def test_scope_queryset_resolves_ownership_in_one_filter(self):
+        own = Payment.objects.create(student=self.student, type='tuition', amount=500, due_date='2025-08-15')
+        other_student = User.objects.create_user(username='student002', password='pass123', role='student')
+        Payment.objects.create(student=other_student, type='tuition', amount=500, due_date='2025-08-15')
+
+        for user in [self.student, self.parent]:
+            with self.assertNumQueries(1):
+                ids = list(scope_queryset(Payment.objects.all(), user, student='student_id', full=OFFICE).values_list('id', flat=True))
+            self.assertEqual(ids, [own.id])
+        self.assertFalse(scope_queryset(Payment.objects.all(), self.teacher, student='student_id', full=OFFICE).exists())
+        self.assertEqual(scope_queryset(Payment.objects.all(), self.admin, student='student_id', full=OFFICE).count(), 2)
+
+    def test_login_tokens_carry_capability_claim(self):
+        response = APIClient().post(reverse('login'), {'username': 'teacher001', 'password': 'pass123', 'role': 'teacher'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data['access'])[CAPS_CLAIM], int(Capability.TEACHER))
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # The first check of a process loads the session denylist; keep that query out of the counts below
+        denylist.reset()
+        denylist.sync()
+        self.addCleanup(denylist.reset)
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student', email='s@example.com')
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_builds_user_from_claims_without_loading_the_row(self):
+        token = issue_tokens(self.student).access_token
+        with self.assertNumQueries(1):  # Token version, cached afterwards
+            self.authenticate(token)
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            self.assertEqual((user.pk, user.role, user.username), (self.student.pk, 'student', 'student001'))
+            self.assertEqual(capabilities(user), Capability.STUDENT)
+        # Touching a field outside the claims loads the rest of the row once
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 's@example.com')
+            self.assertFalse(user.is_superuser)
+
+    def test_changing_a_claim_field_revokes_tokens(self):
+        token = issue_tokens(self.student).access_token
+        self.authenticate(token)
+        self.student.role = 'teacher'
+        self.student.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+        self.assertEqual(self.authenticate(issue_tokens(self.student).access_token).role, 'teacher')
+
+    def test_force_logout_revokes_access_and_refresh_tokens(self):
+        hidden = User.objects.create_user(username='hidden001', password='pass123', is_hidden_superuser=True)
+        refresh = issue_tokens(self.student)
+        login = LoginHistory.objects.create(user=self.student)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(hidden).access_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('hidden-superuser-force-logout', args=[login.id]))
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(refresh.access_token)
+        response = APIClient().post(reverse('token_refresh'), {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_tokens_without_a_version_are_revoked_by_a_bump(self):
+        # Issued before this series: no tv claim, nor any of the user claims
+        refresh = RefreshToken.for_user(self.student)
+        self.assertNotIn('tv', refresh)
+        self.assertEqual(self.authenticate(refresh.access_token).pk, self.student.pk)
+
+        revoke_user_tokens(self.student.pk)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(refresh.access_token)
+        response = APIClient().post(reverse('token_refresh'), {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_issues_access_token_with_fresh_claims(self):
+        refresh = issue_tokens(self.student)
+        User.objects.filter(pk=self.student.pk).update(batch=None, email='new@example.com')
+        response = APIClient().post(reverse('token_refresh'), {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data['access'])
+        self.assertEqual(access['role'], 'student')
+        self.assertEqual(access['tv'], self.student.token_version)
+
+
+class SessionRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        denylist.reset()
+        self.addCleanup(cache.clear)
+        self.addCleanup(denylist.reset)
+        self.admin = User.objects.create_user(username='admin001', password='pass123', role='admin')
+
+    def login(self):
+        response = APIClient().post(reverse('login'), {'username': 'admin001', 'password': 'pass123', 'role': 'admin'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_me(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client.get('/api/users/me/')
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        keys = [f'session-{i}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f'other-{i}' in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_logout_revokes_only_the_current_session(self):
+        first, second = self.login(), self.login()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {first["access"]}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post(reverse('logout')).status_code, 200)
+
+        self.assertEqual(self.get_me(first['access']).status_code, 401)
+        self.assertEqual(APIClient().post(reverse('token_refresh'), {'refresh': first['refresh']}).status_code, 401)
+        self.assertEqual(self.get_me(second['access']).status_code, 200)
+        self.assertFalse(LoginHistory.objects.get(session_id=AccessToken(first['access'])['sid']).is_active)
+
+    def test_force_logout_of_a_recorded_session(self):
+        tokens = self.login()
+        hidden = User.objects.create_user(username='hidden001', password='pass123', is_hidden_superuser=True)
+        record = LoginHistory.objects.get(user=self.admin)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(hidden).access_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('hidden-superuser-force-logout', args=[record.id]))
+        self.assertEqual(self.get_me(tokens['access']).status_code, 401)
+        self.assertEqual(self.get_me(self.login()['access']).status_code, 200)
+
+    def test_revocations_from_other_processes_arrive_on_sync(self):
+        denylist.sync()
+        RevokedToken.objects.create(token_id='elsewhere', expires_at=timezone.now() + timedelta(hours=1))
+        self.assertFalse(denylist.is_revoked('elsewhere'))  # Until the next sync
+        with self.assertNumQueries(1):
+            denylist.sync()
+        with self.assertNumQueries(0):
+            self.assertTrue(denylist.is_revoked('elsewhere'))
+
+    def test_only_the_first_check_queries(self):
+        with self.assertNumQueries(1):
+            self.assertFalse(denylist.is_revoked('any'))
+        # Later syncs run on the refresher thread (none with the in-memory test database)
+        with self.assertNumQueries(0):
+            self.assertFalse(denylist.is_revoked('any'))
+
+    def test_expired_entries_are_dropped(self):
+        denylist.add('old', timezone.now() - timedelta(seconds=1))
+        denylist.sync()
+        self.assertFalse(denylist.is_revoked('old'))
+        self.assertNotIn('old', denylist._entries)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, LOGIN_RATE_LIMIT_IP=(5, 60), LOGIN_RATE_LIMIT_USERNAME=(3, 300))
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student')
+
+    def login(self, password='pass123', ip='10.0.0.1', username='student001'):
+        return APIClient(REMOTE_ADDR=ip).post(reverse('login'), {'username': username, 'password': password, 'role': 'student'})
+
+    def test_failed_logins_lock_the_username(self):
+        for index in range(3):
+            self.assertEqual(self.login('wrong', ip=f'10.0.0.{index}').status_code, 401)
+        response = self.login(ip='10.0.0.9')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Other usernames are unaffected
+        User.objects.create_user(username='student002', password='pass123', role='student')
+        self.assertEqual(self.login(ip='10.0.0.9', username='student002').status_code, 200)
+
+    def test_successful_login_clears_failures(self):
+        self.login('wrong')
+        self.login('wrong')
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 401)
+
+    def test_every_attempt_counts_against_the_ip(self):
+        for _ in range(5):
+            self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(ip='10.0.0.2').status_code, 200)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_clients_behind_the_proxy_have_their_own_budget(self):
+        def login(forwarded_for):
+            return APIClient(REMOTE_ADDR='10.0.0.254', HTTP_X_FORWARDED_FOR=forwarded_for).post(
+                reverse('login'), {'username': 'student001', 'password': 'pass123', 'role': 'student'},
+            )
+
+        for _ in range(5):
+            self.assertEqual(login('203.0.113.7').status_code, 200)
+        self.assertEqual(login('203.0.113.7').status_code, 429)
+        # Another client through the same proxy; a forged leftmost entry does not help
+        self.assertEqual(login('203.0.113.8').status_code, 200)
+        self.assertEqual(login('198.51.100.1, 203.0.113.7').status_code, 429)
+
+    def test_sliding_window_weights_the_previous_window(self):
+        limiter = SlidingWindowLimiter('test', 10, 60)
+        current, previous, _ = limiter._slots('key', 90.0)  # Halfway through the second window
+        cache.set(previous, 10)
+        cache.set(current, 4)
+        self.assertEqual(limiter._estimate('key', 90.0)[0], 9)
+
+    def stored_iterations(self):
+        password = User.objects.get(pk=self.student.pk).password
+        return identify_hasher(password).safe_summary(password)['iterations']
+
+    def test_login_rehashes_to_the_configured_iterations(self):
+        tokens = self.login().data
+        self.assertEqual(self.stored_iterations(), 1000)
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.assertEqual(self.login(ip='10.0.0.2').status_code, 200)
+        self.assertEqual(self.stored_iterations(), 2000)
+        # Re-hashing the same password does not revoke existing sessions
+        self.assertEqual(User.objects.get(pk=self.student.pk).token_version, self.student.token_version)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(client.get('/api/users/me/').status_code, 200)
+
+    def test_bench_login_reports_throughput_and_rolls_back(self):
+        out = StringIO()
+        call_command('bench_login', logins=4, users=2, target=100, stdout=out)
+        self.assertIn('Logins/s per core', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench-login-').exists())
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # The first check of a process loads the session denylist; keep that query out of the counts below
+        denylist.reset()
+        denylist.sync()
+        self.addCleanup(denylist.reset)
+        self.teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        self.student = User.objects.create_user(username='student001', password='pass123', role='student', first_name='Asha')
+        self.other = User.objects.create_user(username='student002', password='pass123', role='student')
+        self.parent = User.objects.create_user(username='parent001', password='pass123', role='parent', child=self.student)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(user).access_token}')
+        return client
+
+    def add_history(self, student, count):
+        for index in range(count):
+            Grade.objects.create(student=student, teacher=self.teacher, subject=f'Unit {index}', marks=60 + index, grade='B')
+            Payment.objects.create(student=student, type=f'fee {index}', amount=100, due_date='2025-08-15')
+            LeaveRequest.objects.create(
+                user=student, start_date=date(2025, 9, 1 + index), end_date=date(2025, 9, 1 + index), reason='ill',
+            )
+            book = Book.objects.create(title=f'Book {index}', author='A', isbn=f'isbn-{student.pk}-{index}', total_copies=2)
+            Borrow.objects.create(user=student, book=book, due_date=timezone.now() - timedelta(days=index - 1))
+            AttendanceRecord.objects.create(
+                student=student, date=date(2025, 9, 1 + index), subject='Anatomy',
+                status='absent' if index % 2 else 'present', is_confirmed=True,
+            )
+
+    def test_student_dashboard_summarises_every_section(self):
+        self.add_history(self.student, 3)
+
+        response = self.client_for(self.student).get(reverse('student-dashboard'), {'limit': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['student']['full_name'], 'Asha')
+        self.assertEqual(response.data['grades']['count'], 3)
+        self.assertEqual(len(response.data['grades']['latest']), 2)
+        self.assertEqual(response.data['payments']['pending'], 3)
+        self.assertEqual(response.data['leaves']['pending'], 3)
+        self.assertEqual(response.data['leaves']['remaining'], 20)
+        self.assertEqual(response.data['library']['borrowed'], 3)
+        self.assertEqual(response.data['library']['overdue'], 2)
+        self.assertEqual(response.data['attendance']['absent'], 1)
+        self.assertEqual(response.data['attendance']['percentage'], 66.7)
+        self.assertEqual(response.data['attendance']['latest'][0]['id'], AttendanceRecord.objects.latest('date').id)
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.add_history(self.student, 2)
+        self.add_history(self.other, 8)
+        counts = []
+        for user in [self.student, self.other]:
+            client = self.client_for(user)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(reverse('student-dashboard')).status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+        # Cached: only the student's profile is read
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_for(self.student).get(reverse('student-dashboard'))
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(queries), 1)
+
+    def test_a_change_invalidates_only_its_owner_and_section(self):
+        student_client, other_client = self.client_for(self.student), self.client_for(self.other)
+        student_client.get(reverse('student-dashboard'))
+        other_client.get(reverse('student-dashboard'))
+        metrics.reset()
+
+        Grade.objects.create(student=self.student, teacher=self.teacher, subject='Physiology', marks=70, grade='B')
+
+        self.assertEqual(student_client.get(reverse('student-dashboard')).data['grades']['count'], 1)
+        self.assertEqual(other_client.get(reverse('student-dashboard'))['X-Cache'], 'HIT')
+        stats = metrics.snapshot()
+        self.assertEqual(stats['dashboard:grades']['miss'], 1)
+        self.assertEqual(stats['dashboard:payments']['miss'], 0)
+
+    def test_writes_without_signals_invalidate_the_dashboard(self):
+        year = timezone.localdate().year
+        record = AttendanceRecord.objects.create(
+            student=self.student, date=date(year, 1, 6), subject='Anatomy', status='absent', is_confirmed=True,
+        )
+        leave = LeaveRequest.objects.create(
+            user=self.student, start_date=date(year, 1, 5), end_date=date(year, 1, 7), reason='ill',
+        )
+        client = self.client_for(self.student)
+        self.assertEqual(client.get(reverse('student-dashboard')).data['attendance']['absent'], 1)
+
+        # One update() of the requests, the attendance and the balance each
+        self.assertEqual(decide_leaves([leave], 'approved'), ([leave.id], []))
+
+        data = client.get(reverse('student-dashboard')).data
+        self.assertEqual(data['attendance']['excused'], 1)
+        self.assertEqual(data['attendance']['latest'][0]['id'], record.id)
+        self.assertEqual(data['attendance']['latest'][0]['excused_by_leave'], leave.id)
+        self.assertEqual(data['leaves']['approved'], 1)
+        self.assertEqual(data['leaves']['remaining'], 17)
+
+    def test_parent_dashboard_shows_the_child(self):
+        self.add_history(self.student, 1)
+
+        response = self.client_for(self.parent).get(reverse('parent-dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['parent']['username'], 'parent001')
+        self.assertEqual(response.data['student']['id'], self.student.id)
+        self.assertEqual(response.data['grades']['count'], 1)
+
+    def test_parent_dashboard_of_a_deleted_child(self):
+        client = self.client_for(self.parent)
+        self.student.delete()
+        response = client.get(reverse('parent-dashboard'))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error'], 'Student not found.')
+
+    def test_dashboards_are_role_specific(self):
+        self.assertEqual(self.client_for(self.parent).get(reverse('student-dashboard')).status_code, 403)
+        self.assertEqual(self.client_for(self.student).get(reverse('parent-dashboard')).status_code, 403)
+        orphan = User.objects.create_user(username='parent002', password='pass123', role='parent')
+        self.assertEqual(self.client_for(orphan).get(reverse('parent-dashboard')).status_code, 404)
+        response = self.client_for(self.student).get(reverse('student-dashboard'), {'limit': 'all'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConcurrentDashboardTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @override_settings(DASHBOARD_WORKERS=3)
+    def test_sections_built_on_the_thread_pool_match_inline(self):
+        teacher = User.objects.create_user(username='teacher001', password='pass123', role='teacher')
+        student = User.objects.create_user(username='student001', password='pass123', role='student')
+        Grade.objects.create(student=student, teacher=teacher, subject='Anatomy', marks=80, grade='A')
+
+        pooled, outcomes = build_dashboard(student, 5, {})
+        cache.clear()
+        with transaction.atomic():
+            inline, _ = build_dashboard(student, 5, {})
+
+        self.assertEqual(set(outcomes.values()), {'miss'})
+        self.assertEqual(pooled['grades']['count'], 1)
+        self.assertEqual(pooled, inline)
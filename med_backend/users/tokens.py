@@ -0,0 +1,122 @@
+# users/tokens.py
+
+"""
+JWT issuing with the claims the permission checks need, and per-user token versions.
+
+Tokens carry role, batch_id, child_id, the staff/hidden-superuser flags, the capability
+bitset and the user's token_version, so users.authentication.ClaimsJWTAuthentication can
+build request.user without loading the User row.
+
+Bumping User.token_version invalidates every token issued before the bump. This happens
+automatically when a claim field, the password or is_active changes (see User.save), and
+explicitly through revoke_user_tokens(), e.g. on a forced logout. Tokens without the
+version claim count as version 0 and are refused once the user's version moved past it.
+The current version of
+each user is kept in the cache so checking it does not cost a query per request.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .capabilities import add_capability_claims
+from .revocation import SESSION_CLAIM, is_token_revoked
+
+TOKEN_VERSION_CLAIM = 'tv'
+# Tokens issued before versions existed carry no claim: they belong to version 0, the
+# column default, and stop working at the user's first bump like any other
+UNVERSIONED = 0
+
+# User fields copied into tokens, keyed by claim name
+USER_CLAIMS = {
+    'username': 'username',
+    'role': 'role',
+    'batch_id': 'batch_id',
+    'child_id': 'child_id',
+    'staff': 'is_staff',
+    'hidden': 'is_hidden_superuser',
+}
+
+
+def _version_cache_key(user_id):
+    return f'users:token_version:{user_id}'
+
+
+def _version_cache_seconds():
+    return getattr(settings, 'TOKEN_VERSION_CACHE_SECONDS', 30)
+
+
+def current_token_version(user_id):
+    """Return the user's current token version (None if the user no longer exists or is inactive)."""
+    key = _version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        from .models import User
+        row = User.objects.filter(pk=user_id).values_list('token_version', 'is_active').first()
+        # -1 never matches a token, so deleted and inactive users are cached as revoked
+        version = row[0] if row and row[1] else -1
+        cache.set(key, version, _version_cache_seconds())
+    return None if version < 0 else version
+
+
+def remember_token_version(user_id, version):
+    cache.set(_version_cache_key(user_id), version, _version_cache_seconds())
+
+
+def forget_token_version(user_id):
+    cache.delete(_version_cache_key(user_id))
+
+
+def revoke_user_tokens(user_id):
+    """Invalidate every token issued to a user so far."""
+    from .models import User
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    forget_token_version(user_id)
+    # Drop the entry again after commit so a concurrent request cannot re-cache the old version
+    transaction.on_commit(lambda: forget_token_version(user_id))
+
+
+def add_user_claims(token, user):
+    for claim, field in USER_CLAIMS.items():
+        token[claim] = getattr(user, field)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return add_capability_claims(token, user)
+
+
+def issue_tokens(user):
+    """
+    Return a refresh token for the user; its access tokens inherit every claim.
+    The refresh token's jti doubles as the session id used for revocation.
+    """
+    refresh = add_user_claims(RefreshToken.for_user(user), user)
+    refresh[SESSION_CLAIM] = refresh['jti']
+    return refresh
+
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refuses refresh tokens issued before the user's last token-version bump, and issues the
+    new access token with claims read fresh from the database.
+    """
+
+    def validate(self, attrs):
+        from .models import User
+
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}, is_active=True).first()
+        if user is None or refresh.payload.get(TOKEN_VERSION_CLAIM, UNVERSIONED) != user.token_version:
+            raise InvalidToken("Token has been revoked.")
+        if is_token_revoked(refresh):
+            raise InvalidToken("Session has been revoked.")
+
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        add_user_claims(access, user)
+        data['access'] = str(access)
+        return data
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import RegisterView, LoginView, MyInfoView, list_users, AssignBatchView  
+from .views import RegisterView, LoginView, LogoutView, MyInfoView, list_users, AssignBatchView, StudentDashboardView, ParentDashboardView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -8,8 +8,11 @@ from rest_framework_simplejwt.views import (
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('me/', MyInfoView.as_view()), 
+    path('dashboard/student/', StudentDashboardView.as_view(), name='student-dashboard'),
+    path('dashboard/parent/', ParentDashboardView.as_view(), name='parent-dashboard'),
     path('list/', list_users, name='list-users'),
     path('assign-batch/', AssignBatchView.as_view(), name='assign-batch'),
 ]
\ No newline at end of file
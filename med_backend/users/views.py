@@ -2,15 +2,25 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import api_view, permission_classes
 from users.serializers import UserSerializer
 from django.contrib.auth import authenticate
 from attendance.models import Batch
 from rest_framework_simplejwt.views import TokenRefreshView
+from django.conf import settings
+from django.utils import timezone
+from hidden_superuser.models import LoginHistory
+from core.cache import CACHE_STATUS_HEADER, cached_queryset, cached_view
+from core.ratelimit import SlidingWindowLimiter, client_ip
+from leaves.models import LeaveBalance
+from payments.models import Payment
 
 from .serializers import UserSerializer, UserInfoSerializer
 from .models import User
+from .capabilities import Capability, has_any, is_office
+from .dashboard import DEFAULT_ITEMS, MAX_ITEMS, build_dashboard, profile
+from .tokens import issue_tokens
+from .revocation import SESSION_CLAIM, revoke_session, session_id
 
 
 class RegisterView(generics.CreateAPIView):
@@ -29,7 +39,7 @@ class RegisterView(generics.CreateAPIView):
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             # Check if authenticated user has permission
-            if request.user.role not in ['admin', 'principal', 'hidden_superuser']:
+            if not has_any(request.user, Capability.ADMIN | Capability.PRINCIPAL):
                 return Response({
                     "error": "Only admin or principal users can create admin, principal, or teacher accounts."
                 }, status=status.HTTP_403_FORBIDDEN)
@@ -47,6 +57,13 @@ class RegisterView(generics.CreateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def login_limiters():
+    return (
+        SlidingWindowLimiter('login-ip', *settings.LOGIN_RATE_LIMIT_IP),
+        SlidingWindowLimiter('login-user', *settings.LOGIN_RATE_LIMIT_USERNAME),
+    )
+
+
 class LoginView(generics.GenericAPIView):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
@@ -60,10 +77,24 @@ class LoginView(generics.GenericAPIView):
             return Response({"error": "Username, password, and role are required."},
                             status=status.HTTP_400_BAD_REQUEST)
 
+        # Throttled before authenticate(): refusing an attempt is far cheaper than hashing its password
+        ip_limiter, username_limiter = login_limiters()
+        ip = client_ip(request) or 'unknown'
+        username_key = username.strip().lower()
+        retry_after = max(ip_limiter.retry_after(ip), username_limiter.retry_after(username_key))
+        if retry_after:
+            return Response({
+                "error": "Too many login attempts.",
+                "details": f"Try again in {retry_after} seconds.",
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(retry_after)})
+        ip_limiter.hit(ip)
+
         user = authenticate(request, username=username, password=password)
 
         if user is None:
+            username_limiter.hit(username_key)
             return Response({"error": "Invalid credentials."}, status=status.HTTP_401_UNAUTHORIZED)
+        username_limiter.reset(username_key)
 
         # Hidden superuser login bypasses role check, giving full access
         if getattr(user, 'is_hidden_superuser', False):
@@ -72,7 +103,20 @@ class LoginView(generics.GenericAPIView):
             if user.role != role:
                 return Response({"error": "Role mismatch. You are logged in as a different role."}, status=status.HTTP_401_UNAUTHORIZED)
 
-        refresh = RefreshToken.for_user(user)
+        # Tokens carry role, batch, child, flags, capabilities and token version, so later
+        # requests authenticate without loading the user row
+        refresh = issue_tokens(user)
+
+        # Admin, principal and hidden superuser sessions are listed in the login history,
+        # where each one can be force-logged-out on its own
+        if is_office(user):
+            LoginHistory.objects.create(
+                user=user,
+                session_id=refresh[SESSION_CLAIM],
+                ip_address=client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            )
+
         return Response({
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -83,13 +127,35 @@ class LoginView(generics.GenericAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class LogoutView(APIView):
+    """Ends the current session: its refresh token and every access token issued from it stop working."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        sid = session_id(request.auth)
+        revoke_session(sid, user_id=request.user.id)
+        LoginHistory.objects.filter(session_id=sid, is_active=True).update(is_active=False, logout_time=timezone.now())
+        return Response({"message": "Logged out successfully."}, status=status.HTTP_200_OK)
+
+
+def info_owners(request):
+    """Users whose payments and leave balance /me/ shows: the user, and a parent's child."""
+    return sorted({request.user.pk, request.user.child_id} - {None})
+
+
 class MyInfoView(APIView):
     permission_classes = [IsAuthenticated]
 
+    # Fees come from payments, leaves remaining from the leave balance, both scoped to their
+    # owners (registered by UsersConfig.ready() for the dashboard)
+    @cached_view(
+        'my-info', models=[User, Batch], per_user=True,
+        owned_models=[Payment, LeaveBalance], owners=info_owners,
+    )
     def get(self, request):
         # Optimize queryset for N+1 queries using select_related for related FKs
-        # and prefetch_related for reverse FKs (like payments, leave_requests, parents)
-        user_queryset = User.objects.filter(pk=request.user.pk).select_related('batch', 'child').prefetch_related('parents', 'leave_requests', 'payments')
+        # and prefetch_related for reverse FKs (like payments, parents)
+        user_queryset = User.objects.filter(pk=request.user.pk).select_related('batch', 'child').prefetch_related('parents', 'payments')
         user_obj = user_queryset.first() 
 
         if user_obj:
@@ -99,6 +165,57 @@ class MyInfoView(APIView):
         return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
 
+def dashboard_response(request, student_id, viewer_key=None):
+    """
+    The dashboard of `student_id` (users.dashboard), with ?limit= latest items per section.
+    With `viewer_key`, the requesting user's profile is added under that key.
+    """
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_ITEMS))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_ITEMS:
+        return Response({
+            "error": "Invalid limit",
+            "details": f"limit must be a whole number from 1 to {MAX_ITEMS}."
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    # request.user only carries its token's claims: the viewer is loaded with the student
+    users = User.objects.select_related('batch').in_bulk({student_id, request.user.pk})
+    if student_id not in users:
+        # The token may name a child deleted since it was issued
+        return Response({"error": "Student not found."}, status=status.HTTP_404_NOT_FOUND)
+    data, outcomes = build_dashboard(users[student_id], limit, {'request': request})
+    if viewer_key:
+        data = {viewer_key: profile(users[request.user.pk]), **data}
+    response = Response(data)
+    response[CACHE_STATUS_HEADER] = 'HIT' if all(outcome != 'miss' for outcome in outcomes.values()) else 'MISS'
+    return response
+
+
+class StudentDashboardView(APIView):
+    """A student's grades, attendance, payments, leaves and library loans in one request."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'student':
+            return Response({"error": "Only students have a student dashboard."}, status=status.HTTP_403_FORBIDDEN)
+        return dashboard_response(request, request.user.pk)
+
+
+class ParentDashboardView(APIView):
+    """The student dashboard of a parent's child, plus the parent's own profile."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if user.role != 'parent':
+            return Response({"error": "Only parents have a parent dashboard."}, status=status.HTTP_403_FORBIDDEN)
+        if user.child_id is None:
+            return Response({"error": "No child is linked to this account."}, status=status.HTTP_404_NOT_FOUND)
+        return dashboard_response(request, user.child_id, viewer_key='parent')
+
+
 class AssignBatchView(APIView):
     """
     API view to assign users to batches.
@@ -146,14 +263,16 @@ class AssignBatchView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+@cached_queryset('users-by-role', models=[User])
+def users_with_role(role=None):
+    users = User.objects.all()
+    return users.filter(role=role) if role else users
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_users(request):
-    role = request.query_params.get('role')
-    if role:
-        users = User.objects.filter(role=role)
-    else:
-        users = User.objects.all()
+    users = users_with_role(request.query_params.get('role'))
     serializer = UserSerializer(users, many=True)
     return Response(serializer.data)
 